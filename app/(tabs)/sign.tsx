@@ -1,8 +1,9 @@
 import { ResizeMode, Video } from "expo-av";
 import Constants from "expo-constants";
+import * as ImageManipulator from "expo-image-manipulator";
 import * as ImagePicker from "expo-image-picker";
 import { LinearGradient } from "expo-linear-gradient";
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
 import {
   ActivityIndicator,
   Alert,
@@ -13,6 +14,7 @@ import {
   View,
 } from "react-native";
 import { SafeAreaView } from "react-native-safe-area-context";
+import { useOnDeviceSign } from "@/hooks/use-on-device-sign";
 
 // ✅ Safe server URL resolver
 const getServerUrl = () => {
@@ -30,11 +32,40 @@ const getServerUrl = () => {
 
 const SERVER_URL = getServerUrl();
 
+// Below this calibrated confidence an on-device result is re-checked by the server
+const ON_DEVICE_MIN_CONFIDENCE = 0.8;
+
+type SignResult = { label: string; confidence: number; source: "device" | "server" };
+
+// Input geometry advertised by the server's /capabilities endpoint
+type Capabilities = { input: { width: number; height: number } };
+
 export default function Sign() {
   const [imageUri, setImageUri] = useState<string | null>(null);
   const [videoUri, setVideoUri] = useState<string | null>(null);
-  const [result, setResult] = useState<{ label: string; confidence: number } | null>(null);
+  const [result, setResult] = useState<SignResult | null>(null);
   const [loading, setLoading] = useState<boolean>(false);
+  const [onDeviceEnabled, setOnDeviceEnabled] = useState<boolean>(true);
+  const onDevice = useOnDeviceSign(SERVER_URL);
+  const [capabilities, setCapabilities] = useState<Capabilities | null>(null);
+
+  useEffect(() => {
+    fetch(`${SERVER_URL}/capabilities`)
+      .then((res) => (res.ok ? res.json() : null))
+      .then(setCapabilities)
+      .catch(() => setCapabilities(null));
+  }, []);
+
+  // The server only looks at a small square; downscale before uploading instead of sending the full photo
+  const downscaleForUpload = async (uri: string) => {
+    if (!capabilities) return uri;
+    const { width, height } = capabilities.input;
+    const resized = await ImageManipulator.manipulateAsync(uri, [{ resize: { width, height } }], {
+      compress: 0.9,
+      format: ImageManipulator.SaveFormat.JPEG,
+    });
+    return resized.uri;
+  };
 
   // ✅ Pick Image
   const pickImage = async (fromGallery = false) => {
@@ -58,10 +89,29 @@ export default function Sign() {
       const uri = res.assets[0].uri;
       setImageUri(uri);
       setVideoUri(null);
-      await sendFile(uri, "image");
+      await detectImage(uri);
     }
   };
 
+  // ✅ Classify on device; only upload when the local model is unsure or unavailable
+  const detectImage = async (uri: string) => {
+    if (onDeviceEnabled && onDevice.available) {
+      try {
+        setLoading(true);
+        setResult(null);
+        const local = await onDevice.classify(uri);
+        if (local && local.confidence >= ON_DEVICE_MIN_CONFIDENCE) {
+          setResult({ label: local.label, confidence: local.confidence, source: "device" });
+          setLoading(false);
+          return;
+        }
+      } catch (err) {
+        console.warn("On-device inference failed, using server:", err);
+      }
+    }
+    await sendFile(uri, "image");
+  };
+
   // ✅ Pick Video
   const pickVideo = async (fromGallery = false) => {
     const perm = await ImagePicker.requestCameraPermissionsAsync();
@@ -95,9 +145,10 @@ export default function Sign() {
       setLoading(true);
       setResult(null);
 
+      const uploadUri = type === "image" ? await downscaleForUpload(uri) : uri;
       const formData = new FormData();
       formData.append("file", {
-        uri,
+        uri: uploadUri,
         type: type === "image" ? "image/jpeg" : "video/mp4",
         name: type === "image" ? "sign.jpg" : "sign.mp4",
       } as any);
@@ -112,7 +163,7 @@ export default function Sign() {
       );
 
       const data = await response.json();
-      setResult(data);
+      setResult({ ...data, source: "server" });
     } catch (err) {
       console.error("Error sending file:", err);
       Alert.alert("Error", "Failed to detect sign");
@@ -147,6 +198,18 @@ export default function Sign() {
             </TouchableOpacity>
           </View>
 
+          {/* On-device toggle (only when the native TFLite runtime and a published model are available) */}
+          {onDevice.available && (
+            <TouchableOpacity
+              onPress={() => setOnDeviceEnabled(!onDeviceEnabled)}
+              className="bg-gray-700 rounded-xl px-5 py-2"
+            >
+              <Text className="text-white font-semibold text-base">
+                📱 On-device recognition: {onDeviceEnabled ? "ON" : "OFF"}
+              </Text>
+            </TouchableOpacity>
+          )}
+
           {/* VIDEO Section */}
           <View className="w-11/12 m-6 bg-gray-800 rounded-2xl border border-gray-900 items-center">
             <Text className="text-white font-bold text-2xl m-4 mt-6">VIDEO</Text>
@@ -183,7 +246,8 @@ export default function Sign() {
           {result && (
             <Text className="text-white text-lg text-center mt-4">
               ✅ Sign: {result.label} {"\n"}
-              📊 Confidence: {(result.confidence * 100).toFixed(1)}%
+              📊 Confidence: {(result.confidence * 100).toFixed(1)}% {"\n"}
+              {result.source === "device" ? "📱 On-device" : "🌐 Server"}
             </Text>
           )}
         </ScrollView>
@@ -1,73 +1,104 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, g, request, jsonify, send_file, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
 import speech_recognition as sr
-import pyttsx3
 import os
 import tempfile
 import requests
 import json
-from langdetect import detect, DetectorFactory
+from langdetect import detect, detect_langs, DetectorFactory
 from langdetect.lang_detect_exception import LangDetectException
 from typing import Dict, List, Tuple, Optional
 import logging
+import time
+import base64
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from deep_translator import GoogleTranslator, MyMemoryTranslator
 import pandas as pd
 import gdown
+from speech_engines import RecognitionService
+from audio_pipeline import AudioFormatError, audio_duration, ingest_audio, split_on_silence
+from language_id import LANGID_MAX_BATCH, LanguageIdentifier
+from tts_service import DEFAULT_RATE, MAX_RATE, MIN_RATE, TTS_MAX_CHARS, TTSService
+from sign_dictionary import SignDictionary
+from phrase_table import PhraseTables, PhraseTranslator
+import metrics
+import uploads
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upload limits per route: checked against Content-Length before the body is read (admit_request),
+# and enforced by Werkzeug while the body is read for chunked uploads
+UPLOAD_LIMITS = {
+    '/transcribe': uploads.MAX_AUDIO_UPLOAD_BYTES,
+    '/speech-translate': uploads.MAX_AUDIO_UPLOAD_BYTES,
+    '/sign-translate': uploads.MAX_VIDEO_UPLOAD_BYTES,
+}
+
+class LimitedRequest(Request):
+    @property
+    def max_content_length(self):
+        """The route's upload limit, else the app-wide MAX_CONTENT_LENGTH"""
+        if self.url_rule is not None and self.url_rule.rule in UPLOAD_LIMITS:
+            return UPLOAD_LIMITS[self.url_rule.rule] or None
+        return super().max_content_length
+
 app = Flask(__name__)
+app.request_class = LimitedRequest
+app.config['MAX_CONTENT_LENGTH'] = max(UPLOAD_LIMITS.values()) or None
 # Enable CORS for all origins and methods
 CORS(app, origins="*", methods=["GET", "POST", "OPTIONS"], allow_headers=["*"])
 
 # Initialize language detection
 DetectorFactory.seed = 0  # For consistent results
+language_identifier = LanguageIdentifier()
+
+# Initialize speech recognition and text-to-speech
+recognition_service = RecognitionService()
+recognition_service.preload()
+tts_service = TTSService()  # owns the TTS engine on its own worker thread
 
-# Initialize speech recognition and text-to-speech (like your old program)
-recognizer = sr.Recognizer()
-engine = pyttsx3.init()
-voices = engine.getProperty('voices')
-engine.setProperty('voice', voices[0].id)  # 0-2 range for different voices
-voicespeed = 150  # setting speed
-engine.setProperty('rate', voicespeed)
+# Text-to-sign clip index over sign_videos/ (kept in sync by a polling thread). Under the debug
+# reloader this file also runs in the watching parent, which serves nothing; only the serving
+# child (WERKZEUG_RUN_MAIN) polls and transcodes
+sign_dictionary = SignDictionary()
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    sign_dictionary.start()
 
 # Initialize translators
 deep_translator = GoogleTranslator()
 
-def speak(audio):
-    """Text-to-speech function like your old program"""
-    engine.say(audio)
-    engine.runAndWait()
+def takeCommand(audio, language='en', engine_name=None):
+    """Speech recognition function like your old program, but adapted for uploaded audio.
 
-def takeCommand(audio_file_path):
-    """Speech recognition function like your old program, but adapted for file input"""
+    Takes 16 kHz mono sr.AudioData from the ingestion pipeline and returns the
+    recognition result dict from the engine that handled it, or None if
+    recognition failed.
+    """
     try:
-        logger.info("Recognising...")
-        # Use speech_recognition to process the audio file
-        with sr.AudioFile(audio_file_path) as source:
-            audio = recognizer.record(source)
-            query = recognizer.recognize_google(audio, language='en-us')
-            logger.info(f"Recognized: {query}")
-            return query
+        logger.debug("Recognising...")
+        result = recognition_service.recognize(audio, language, engine_name)
+        logger.debug("Recognized (%s): %s", result['engine'], result['text'])
+        return result
     except Exception as e:
         logger.error(f"Recognition error: {e}")
-        return "---"
+        return None
 
 class LanguageDetector:
-    """Language detection using langdetect library"""
+    """Language detection using the script shortcut + n-gram index, with langdetect kept for comparison"""
     
-    def __init__(self):
+    def __init__(self, identifier: LanguageIdentifier = None):
         self.confidence_threshold = 0.7
+        self.identifier = identifier or language_identifier
     
     def detect_language_langdetect(self, text: str) -> Tuple[str, float]:
         """Detect language using langdetect library"""
         try:
-            # Get language probabilities
-            detector = DetectorFactory.create()
-            detector.append(text)
-            probabilities = detector.get_probabilities()
+            # Get language probabilities (creates a new detector per call)
+            probabilities = detect_langs(text)
             
             if probabilities:
                 # Get the most likely language
@@ -79,30 +110,13 @@ class LanguageDetector:
         
         return None, 0.0
     
-    def detect_language_combined(self, text: str) -> Dict[str, any]:
-        """Language detection using langdetect"""
-        results = {}
-        
-        # LangDetect detection
-        langdetect_lang, langdetect_conf = self.detect_language_langdetect(text)
-        if langdetect_lang and langdetect_conf > self.confidence_threshold:
-            results['langdetect'] = {
-                'language': langdetect_lang,
-                'confidence': langdetect_conf,
-                'method': 'langdetect'
-            }
-        
-        # Return results
-        if results:
-            # Use the method with higher confidence
-            best_method = max(results.keys(), key=lambda k: results[k]['confidence'])
-            best_result = results[best_method]
-            
+    def _format_result(self, result: Dict[str, any]) -> Dict[str, any]:
+        if result['language'] != 'unknown' and result['confidence'] > self.confidence_threshold:
             return {
-                'detected_language': best_result['language'],
-                'confidence': best_result['confidence'],
-                'method': best_result['method'],
-                'all_results': results
+                'detected_language': result['language'],
+                'confidence': result['confidence'],
+                'method': result['method'],
+                'all_results': {result['method']: result}
             }
         
         return {
@@ -111,11 +125,22 @@ class LanguageDetector:
             'method': 'none',
             'all_results': {}
         }
+    
+    def detect_language_combined(self, text: str) -> Dict[str, any]:
+        """Language detection for a single text"""
+        with metrics.stage("detect_language"):
+            return self._format_result(self.identifier.detect(text))
+    
+    def detect_language_batch(self, texts: List[str]) -> List[Dict[str, any]]:
+        """Language detection for many texts in one model pass"""
+        with metrics.stage("detect_language_batch"):
+            return [self._format_result(result) for result in self.identifier.detect_batch(texts)]
 
 class TranslationEngine:
     """Multi-engine translation with context awareness"""
     
-    def __init__(self):
+    def __init__(self, phrase_tables: PhraseTables = None):
+        self.phrase_translator = PhraseTranslator(phrase_tables or PhraseTables())
         self.supported_languages = {
             # Major Global Languages
             'en': 'English', 'es': 'Spanish', 'fr': 'French', 'de': 'German',
@@ -164,17 +189,12 @@ class TranslationEngine:
                             context: str = None) -> Dict[str, any]:
         """Translate using Google Translate API"""
         try:
-            # Add context hint if provided
-            if context and context in self.context_hints:
-                enhanced_text = f"{self.context_hints[context]} {text}"
-            else:
-                enhanced_text = text
-            
-            # Use deep_translator for better reliability
-            if source_lang == 'auto':
-                translated = deep_translator.translate(text=enhanced_text, target=target_lang)
-            else:
-                translated = deep_translator.translate(text=enhanced_text, source=source_lang, target=target_lang)
+            # The context picks the domain glossary (phrase_table.py); it is not sent upstream
+            with metrics.stage("translate_google"):
+                if source_lang == 'auto':
+                    translated = deep_translator.translate(text=text, target=target_lang)
+                else:
+                    translated = deep_translator.translate(text=text, source=source_lang, target=target_lang)
             
             return {
                 "success": True,
@@ -197,8 +217,9 @@ class TranslationEngine:
                                context: str = None) -> Dict[str, any]:
         """Translate using MyMemory Translator (fallback)"""
         try:
-            translator = MyMemoryTranslator(source=source_lang, target=target_lang)
-            translated = translator.translate(text)
+            with metrics.stage("translate_mymemory"):
+                translator = MyMemoryTranslator(source=source_lang, target=target_lang)
+                translated = translator.translate(text)
             
             return {
                 "success": True,
@@ -219,7 +240,14 @@ class TranslationEngine:
     
     def translate_text_enhanced(self, text: str, target_lang: str, source_lang: str = 'auto',
                                context: str = None, use_fallback: bool = True) -> Dict[str, any]:
-        """Enhanced translation with multiple engines and fallback"""
+        """Enhanced translation: local phrase tables first, then multiple engines with fallback"""
+        return self.phrase_translator.translate(
+            text, target_lang, source_lang, context,
+            lambda remaining, source: self.translate_remote(remaining, target_lang, source, context, use_fallback))
+    
+    def translate_remote(self, text: str, target_lang: str, source_lang: str = 'auto',
+                         context: str = None, use_fallback: bool = True) -> Dict[str, any]:
+        """Translate with the remote engines: Google first, MyMemory as fallback"""
         results = {}
         
         # Try Google Translate first
@@ -294,15 +322,35 @@ class SpeechTranscriber:
     def __init__(self):
         self.language_detector = LanguageDetector()
     
-    def transcribe_audio_enhanced(self, audio_file_path: str) -> Dict[str, any]:
+    def transcribe_audio_enhanced(self, audio_bytes: bytes, language: str = 'en',
+                                  engine_name: str = None) -> Dict[str, any]:
         """Enhanced transcription with speech_recognition and language detection"""
         results = {}
         
-        # Use speech_recognition like your old program
+        # Decode in memory, then use speech_recognition like your old program
         try:
-            transcribed_text = takeCommand(audio_file_path)
+            audio, audio_info = ingest_audio(audio_bytes)
+            results['audio'] = audio_info
+            for stage_name, seconds in audio_info["timings"].items():
+                metrics.record_stage(f"audio_{stage_name}", seconds)
+            if not audio.frame_data:
+                return {
+                    "success": False,
+                    "error": "Speech recognition failed - audio is silent",
+                    "all_results": results
+                }
+            
+            recognition = takeCommand(audio, language, engine_name)
+            if recognition:
+                audio_info["timings"]["recognize"] = recognition["processing_time"]
             
-            if transcribed_text and transcribed_text != "---":
+            if recognition and recognition["text"]:
+                transcribed_text = recognition["text"]
+                results[recognition["engine"]] = {
+                    "audio_duration": recognition["audio_duration"],
+                    "processing_time": recognition["processing_time"],
+                    "real_time_factor": recognition["real_time_factor"]
+                }
                 # Detect language from transcribed text
                 language_info = self.language_detector.detect_language_combined(transcribed_text)
                 
@@ -310,7 +358,7 @@ class SpeechTranscriber:
                     "success": True,
                     "transcribed_text": transcribed_text,
                     "confidence": 0.95,  # speech_recognition doesn't provide confidence
-                    "method": "speech_recognition",
+                    "method": recognition["engine"],
                     "language_detection": language_info,
                     "all_results": results
                 }
@@ -321,6 +369,13 @@ class SpeechTranscriber:
                     "all_results": results
                 }
                 
+        except AudioFormatError as e:
+            logger.error(f"Audio decoding error: {e}")
+            return {
+                "success": False,
+                "error": f"Unsupported audio: {str(e)}",
+                "all_results": results
+            }
         except Exception as e:
             logger.error(f"Speech recognition error: {e}")
             return {
@@ -329,9 +384,208 @@ class SpeechTranscriber:
                 "all_results": results
             }
 
+# Segments of one /speech-translate upload queued on the shared recognizer pool at a time, so a long
+# upload cannot starve concurrent /transcribe requests
+SPEECH_SEGMENTS_IN_FLIGHT = int(os.environ.get("SPEECH_SEGMENTS_IN_FLIGHT", 2))
+
+class SpeechTranslationPipeline:
+    """Speech -> text -> translated text (-> speech) with overlapping stages.
+
+    Audio is split at pauses and up to max_in_flight segments at a time are
+    queued on the recognizer pool. As each segment's text arrives (in order)
+    its translation is started on a separate I/O pool, so upstream translation
+    of early segments overlaps recognition of later ones. Results are yielded
+    as events.
+    """
+    
+    def __init__(self, transcriber: SpeechTranscriber, translation_engine: TranslationEngine,
+                 max_translate_workers: int = 4, max_in_flight: int = SPEECH_SEGMENTS_IN_FLIGHT):
+        self.transcriber = transcriber
+        self.translation_engine = translation_engine
+        self.max_in_flight = max(1, max_in_flight)
+        self.translate_executor = ThreadPoolExecutor(max_workers=max_translate_workers,
+                                                     thread_name_prefix="translate")
+    
+    def _timed_translate(self, text: str, target_lang: str, source_lang: str, context: str):
+        start = time.perf_counter()
+        result = self.translation_engine.translate_text_enhanced(text, target_lang, source_lang, context)
+        return result, time.perf_counter() - start
+    
+    def run(self, audio, audio_info: Dict[str, any], target_lang: str, source_lang: str = 'auto',
+            language: str = 'en', engine_name: str = None, context: str = None,
+            synthesize: bool = False, voice: str = None, segments: List = None):
+        """Generator of event dicts: segments, recognize, translate, tts, done.
+
+        segments are the voiced parts of audio from split_on_silence; they are
+        split here when not given.
+        """
+        wall_start = time.perf_counter()
+        stage_times = {stage: seconds for stage, seconds in audio_info["timings"].items()}
+        
+        if segments is None:
+            start = time.perf_counter()
+            segments = split_on_silence(audio)
+            stage_times["segment"] = time.perf_counter() - start
+        yield {"event": "segments", "count": len(segments), "audio": audio_info}
+        
+        recognize_futures, translate_futures = deque(), []
+        try:
+            # Segment i + max_in_flight is queued once segment i's result is taken
+            for segment in segments[:self.max_in_flight]:
+                recognize_futures.append(recognition_service.submit(segment, language, engine_name))
+            transcripts = []
+            stage_times["recognize"] = 0.0
+            for i in range(len(segments)):
+                recognition = recognize_futures.popleft().result()
+                if i + self.max_in_flight < len(segments):
+                    recognize_futures.append(recognition_service.submit(
+                        segments[i + self.max_in_flight], language, engine_name))
+                stage_times["recognize"] += recognition["processing_time"]
+                text = recognition["text"]
+                yield {"event": "recognize", "segment": i, "text": text, "engine": recognition["engine"],
+                       "processing_time": recognition["processing_time"]}
+                if text:
+                    transcripts.append(text)
+                    translate_futures.append((i, self.translate_executor.submit(
+                        self._timed_translate, text, target_lang, source_lang, context)))
+            
+            transcribed_text = " ".join(transcripts)
+            start = time.perf_counter()
+            language_info = self.transcriber.language_detector.detect_language_combined(transcribed_text)
+            stage_times["detect_language"] = time.perf_counter() - start
+            yield {"event": "language", "language_detection": language_info}
+            
+            translations = []
+            stage_times["translate"] = 0.0
+            for i, future in translate_futures:
+                result, seconds = future.result()
+                stage_times["translate"] += seconds
+                translated = result.get("translated_text", "") if result["success"] else ""
+                translations.append(translated)
+                yield {"event": "translate", "segment": i, "success": result["success"],
+                       "translated_text": translated, "translation_method": result.get("translation_method"),
+                       "processing_time": seconds}
+        finally:
+            # After a failed recognition or a client disconnect (GeneratorExit), drop queued work
+            # so an abandoned stream does not hold the shared pools
+            for future in recognize_futures:
+                future.cancel()
+            for _, future in translate_futures:
+                future.cancel()
+        
+        translated_text = " ".join(t for t in translations if t)
+        
+        if synthesize and len(translated_text) > TTS_MAX_CHARS:
+            yield {"event": "tts", "success": False,
+                   "error": f"Translation is longer than {TTS_MAX_CHARS} characters; not synthesized"}
+        elif synthesize and translated_text:
+            start = time.perf_counter()
+            speech, cache_hit = tts_service.synthesize(translated_text, voice)
+            stage_times["tts"] = time.perf_counter() - start
+            yield {"event": "tts", "success": True, "mimetype": "audio/wav", "cache_hit": cache_hit,
+                   "audio_base64": base64.b64encode(speech).decode("ascii")}
+        
+        yield {
+            "event": "done",
+            "success": bool(transcripts),
+            "transcribed_text": transcribed_text,
+            "translated_text": translated_text,
+            "target_language": target_lang,
+            "timings": {
+                "stages": stage_times,
+                "wall": time.perf_counter() - wall_start
+            }
+        }
+
 # Initialize the services
 transcriber = SpeechTranscriber()
 translation_engine = TranslationEngine()
+speech_translation_pipeline = SpeechTranslationPipeline(transcriber, translation_engine)
+
+# Scrape-time gauges: cache hit ratios and queue depths
+metrics.register_gauge("chatterbridge_cache_hit_ratio", "Cache hits / lookups",
+                       metrics.hit_ratio(lambda: language_identifier.cache.hits,
+                                         lambda: language_identifier.cache.misses), cache="language_id")
+metrics.register_gauge("chatterbridge_cache_hit_ratio", "Cache hits / lookups",
+                       metrics.hit_ratio(lambda: tts_service.cache.hits,
+                                         lambda: tts_service.cache.misses), cache="tts")
+metrics.register_gauge("chatterbridge_cache_bytes", "Bytes held in a cache",
+                       lambda: tts_service.cache.size, cache="tts")
+metrics.register_gauge("chatterbridge_queue_depth", "Jobs waiting for a worker",
+                       lambda: recognition_service.executor._work_queue.qsize(), queue="recognize")
+metrics.register_gauge("chatterbridge_queue_depth", "Jobs waiting for a worker",
+                       lambda: speech_translation_pipeline.translate_executor._work_queue.qsize(), queue="translate")
+metrics.register_gauge("chatterbridge_queue_depth", "Jobs waiting for a worker",
+                       lambda: tts_service.jobs.qsize(), queue="tts")
+for tier in ("local", "partial", "upstream"):
+    metrics.register_gauge("chatterbridge_translation_requests", "Translations by the tier that served them",
+                           lambda tier=tier: translation_engine.phrase_translator.counts[tier], tier=tier)
+
+# Admission control for the recognition routes: bounded concurrency plus a bounded wait list,
+# so bursts get a fast 429/503 with Retry-After instead of piling up on the recognizer pool
+SPEECH_MAX_CONCURRENT = int(os.environ.get("SPEECH_MAX_CONCURRENT", 4))
+SPEECH_MAX_QUEUE = int(os.environ.get("SPEECH_MAX_QUEUE", 16))
+speech_admission = uploads.AdmissionController("speech", SPEECH_MAX_CONCURRENT, SPEECH_MAX_QUEUE)
+uploads.register_admission_gauges(speech_admission)
+ADMITTED_ROUTES = {'/transcribe', '/speech-translate'}
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def admit_request():
+    """Reject oversized uploads by header, then wait for a recognition slot; runs before the body is read"""
+    if request.method != 'POST' or request.url_rule is None:
+        return None
+    rule = request.url_rule.rule
+    if rule in UPLOAD_LIMITS:
+        uploads.check_content_length(request.headers.get('Content-Length'), UPLOAD_LIMITS[rule])
+    if rule in ADMITTED_ROUTES:
+        speech_admission.acquire()
+        g.admitted_at = time.perf_counter()
+    return None
+
+@app.teardown_request
+def release_admission(exc):
+    # Streamed responses tear down once the stream is finished, so the slot covers the whole pipeline
+    start = g.pop('admitted_at', None)
+    if start is not None:
+        speech_admission.release(time.perf_counter() - start)
+
+def rejection_response(e: uploads.Rejected):
+    response = jsonify({"success": False, "error": str(e)})
+    response.status_code = e.status
+    response.headers.update(e.headers())
+    return response
+
+def read_audio_upload(audio_file) -> bytes:
+    """Upload bytes within the audio byte limit, checked against MAX_AUDIO_SECONDS before decoding"""
+    audio_bytes = uploads.read_upload(audio_file.stream, uploads.MAX_AUDIO_UPLOAD_BYTES)
+    uploads.check_duration(audio_duration(audio_bytes), uploads.MAX_AUDIO_SECONDS)
+    return audio_bytes
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses are measured up to the first byte
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(endpoint, response.status_code, time.perf_counter() - start, service="speech")
+    return response
+
+@app.errorhandler(uploads.Rejected)
+def handle_rejected(e):
+    return rejection_response(e)
+
+@app.errorhandler(413)
+def payload_too_large(e):
+    """Body over MAX_CONTENT_LENGTH, found while reading it"""
+    return jsonify({
+        "success": False,
+        "error": "Upload too large",
+        "message": f"The limit is {request.max_content_length / uploads.MB:g} MB"
+    }), 413
 
 # Global error handler to ensure JSON responses
 @app.errorhandler(Exception)
@@ -371,26 +625,41 @@ def health_check():
         "message": "Enhanced Speech Recognition & Translation Server is running",
         "features": [
             "Speech Recognition (like your old program)",
-            "Text-to-Speech with pyttsx3",
+            "Text-to-Speech with a cached synthesis worker",
             "Automatic language detection",
             "Multi-engine translation",
-            "Context-aware translation",
+            "Context-aware translation with local phrase tables and glossaries",
             "Global language support",
             "Enhanced Indian language support"
         ],
         "models_available": {
             "speech_recognition": True,
-            "pyttsx3": True,
+            "speech_engines": recognition_service.available_engines(),
+            "tts_engine": tts_service.backend_name,
+            "sign_clips": sign_dictionary.stats()["clips"],
+            "phrase_tables": translation_engine.phrase_translator.tables.stats()["tables"],
             "langdetect": True,
+            "language_id": "fasttext" if language_identifier.fasttext_model is not None else "ngram",
             "google_translate": True,
             "mymemory_translate": True
         },
         "language_support": {
             "total_languages": len(translation_engine.supported_languages),
             "indian_languages": len(translation_engine.indian_languages)
-        }
+        },
+        "admission": speech_admission.stats()
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+@app.route('/translation-stats', methods=['GET'])
+def translation_stats():
+    """Share of translations served by the local phrase tables and the upstream latency saved"""
+    return jsonify({"success": True, **translation_engine.phrase_translator.stats()})
+
 @app.route('/languages', methods=['GET'])
 def get_supported_languages():
     """Get list of supported languages"""
@@ -427,15 +696,16 @@ def transcribe_audio():
                 "error": "No file selected"
             }), 400
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-            audio_file.save(temp_file.name)
-            temp_file_path = temp_file.name
+        language = request.form.get('language', 'en')
+        engine_name = request.form.get('engine')
+        
+        # Read the upload into memory (bounded); the container is sniffed from the bytes
+        audio_bytes = read_audio_upload(audio_file)
         
         try:
             # Enhanced transcription with language detection
-            logger.info(f"Processing audio file: {temp_file_path}")
-            result = transcriber.transcribe_audio_enhanced(temp_file_path)
+            logger.debug("Processing audio upload: %s (%d bytes)", audio_file.filename, len(audio_bytes))
+            result = transcriber.transcribe_audio_enhanced(audio_bytes, language, engine_name)
             
             if result["success"]:
                 response_data = {
@@ -446,7 +716,7 @@ def transcribe_audio():
                     "language_detection": result["language_detection"],
                     "all_results": result.get("all_results", {})
                 }
-                logger.info(f"Transcription successful: {result['transcribed_text'][:50]}...")
+                logger.debug("Transcription successful: %.50s...", result['transcribed_text'])
                 return jsonify(response_data)
             else:
                 logger.error(f"Transcription failed: {result.get('error', 'Unknown error')}")
@@ -462,15 +732,11 @@ def transcribe_audio():
                 "success": False,
                 "error": f"Transcription processing failed: {str(e)}"
             }), 500
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                try:
-                    os.unlink(temp_file_path)
-                    logger.info(f"Cleaned up temp file: {temp_file_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to clean up temp file {temp_file_path}: {e}")
                 
+    except uploads.UploadRejected as e:
+        return rejection_response(e)
+    except RequestEntityTooLarge:
+        raise  # answered by payload_too_large
     except Exception as e:
         logger.error(f"Transcription endpoint error: {str(e)}")
         return jsonify({
@@ -526,7 +792,7 @@ def translate_text():
             }), 400
         
         # Perform translation
-        logger.info(f"Translating text to {target_lang} with context: {context}")
+        logger.debug("Translating text to %s with context: %s", target_lang, context)
         result = translation_engine.translate_text_enhanced(
             text, target_lang, source_lang, context, use_fallback
         )
@@ -540,9 +806,10 @@ def translate_text():
                 "target_language": result["target_language"],
                 "translation_method": result["translation_method"],
                 "context_used": result.get("context_used"),
+                "phrase_table": result.get("phrase_table"),
                 "all_results": result.get("all_results", {})
             }
-            logger.info(f"Translation successful: {result['translated_text'][:50]}...")
+            logger.debug("Translation successful: %.50s...", result['translated_text'])
             return jsonify(response_data)
         else:
             logger.error(f"Translation failed: {result.get('error', 'Unknown error')}")
@@ -613,9 +880,36 @@ def translate_batch():
 
 @app.route('/detect-language', methods=['POST'])
 def detect_language_text():
-    """Detect language from text input"""
+    """Detect language from text input (single `text` or a `texts` array)"""
     try:
         data = request.get_json()
+        if data and 'texts' in data:
+            texts = data['texts']
+            if not isinstance(texts, list) or not texts:
+                return jsonify({
+                    "success": False,
+                    "error": "`texts` must be a non-empty list"
+                }), 400
+            if len(texts) > LANGID_MAX_BATCH:
+                return jsonify({
+                    "success": False,
+                    "error": f"At most {LANGID_MAX_BATCH} texts per request"
+                }), 400
+            invalid = [i for i, text in enumerate(texts) if not isinstance(text, str) or not text.strip()]
+            if invalid:
+                return jsonify({
+                    "success": False,
+                    "error": f"`texts` items must be non-empty strings (invalid at {invalid[:10]})"
+                }), 400
+            detections = transcriber.language_detector.detect_language_batch(texts)
+            return jsonify({
+                "success": True,
+                "results": [
+                    {"text": text, "language_detection": detection}
+                    for text, detection in zip(texts, detections)
+                ]
+            })
+        
         if not data or 'text' not in data:
             return jsonify({
                 "success": False,
@@ -623,6 +917,11 @@ def detect_language_text():
             }), 400
         
         text = data['text']
+        if not isinstance(text, str):
+            return jsonify({
+                "success": False,
+                "error": "`text` must be a string"
+            }), 400
         language_info = transcriber.language_detector.detect_language_combined(text)
         
         return jsonify({
@@ -638,12 +937,147 @@ def detect_language_text():
             "error": f"Language detection failed: {str(e)}"
         }), 500
 
+@app.route('/speech-translate', methods=['POST', 'OPTIONS'])
+def speech_translate():
+    """Transcribe, detect, translate and optionally speak an upload in one request.
+
+    Streams newline-delimited JSON events as each stage finishes, ending with a
+    "done" event that carries the full texts and per-stage timings.
+    """
+    # Handle preflight OPTIONS request
+    if request.method == 'OPTIONS':
+        response = jsonify({"status": "ok"})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Methods', 'POST')
+        return response
+    
+    if 'audio' not in request.files or request.files['audio'].filename == '':
+        return jsonify({
+            "success": False,
+            "error": "No audio file provided"
+        }), 400
+    
+    target_lang = request.form.get('target_language')
+    if not target_lang or target_lang not in translation_engine.supported_languages:
+        return jsonify({
+            "success": False,
+            "error": f"Unsupported target language: {target_lang}"
+        }), 400
+    
+    try:
+        audio, audio_info = ingest_audio(read_audio_upload(request.files['audio']))
+    except AudioFormatError as e:
+        return jsonify({
+            "success": False,
+            "error": f"Unsupported audio: {str(e)}"
+        }), 400
+    
+    # Silent uploads are rejected before streaming starts, as /transcribe does
+    start = time.perf_counter()
+    segments = split_on_silence(audio)
+    audio_info["timings"]["segment"] = time.perf_counter() - start
+    if not segments:
+        return jsonify({
+            "success": False,
+            "error": "Speech recognition failed - audio is silent"
+        }), 400
+    
+    events = speech_translation_pipeline.run(
+        audio, audio_info, target_lang,
+        source_lang=request.form.get('source_language', 'auto'),
+        language=request.form.get('language', 'en'),
+        engine_name=request.form.get('engine'),
+        context=request.form.get('context'),
+        synthesize=request.form.get('tts', 'false').lower() in ('1', 'true', 'yes'),
+        voice=request.form.get('voice'),
+        segments=segments
+    )
+    
+    def generate():
+        try:
+            for event in events:
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Speech translation pipeline error: {e}")
+            yield json.dumps({"event": "error", "success": False, "error": str(e)}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/text-to-speech', methods=['POST', 'OPTIONS'])
+def text_to_speech():
+    """Synthesize text to WAV audio and stream it back"""
+    # Handle preflight OPTIONS request
+    if request.method == 'OPTIONS':
+        response = jsonify({"status": "ok"})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Methods', 'POST')
+        return response
+    
+    try:
+        data = request.get_json()
+        if not data or not data.get('text'):
+            return jsonify({
+                "success": False,
+                "error": "No text provided"
+            }), 400
+        
+        text = data['text']
+        if not isinstance(text, str):
+            return jsonify({
+                "success": False,
+                "error": "Text must be a string"
+            }), 400
+        if len(text) > TTS_MAX_CHARS:
+            return jsonify({
+                "success": False,
+                "error": f"Text is longer than {TTS_MAX_CHARS} characters"
+            }), 400
+        voice = data.get('voice')
+        try:
+            rate = int(data.get('rate', DEFAULT_RATE))
+        except (TypeError, ValueError):
+            return jsonify({
+                "success": False,
+                "error": "Rate must be an integer (words per minute)"
+            }), 400
+        if not MIN_RATE <= rate <= MAX_RATE:
+            return jsonify({
+                "success": False,
+                "error": f"Rate must be between {MIN_RATE} and {MAX_RATE} words per minute"
+            }), 400
+        
+        audio, cache_hit = tts_service.synthesize(text, voice, rate)
+        response = Response(tts_service.stream(audio), mimetype='audio/wav')
+        response.headers['Content-Length'] = str(len(audio))
+        response.headers['X-TTS-Cache'] = 'hit' if cache_hit else 'miss'
+        response.headers['X-TTS-Engine'] = tts_service.backend_name
+        return response
+        
+    except Exception as e:
+        logger.error(f"Text-to-speech error: {e}")
+        return jsonify({
+            "success": False,
+            "error": f"Text-to-speech failed: {str(e)}"
+        }), 500
+
+@app.route('/get-voices', methods=['GET'])
+def get_voices():
+    """List the voices available to the TTS engine (loaded once at startup)"""
+    return jsonify({
+        "success": True,
+        "engine": tts_service.backend_name,
+        "voices": tts_service.voices,
+        "cache": tts_service.cache.stats()
+    })
+
 def download_sign_videos(csv_path="ISL_Dictionary_words.csv", output_dir="sign_videos"):
     df = pd.read_csv(csv_path)
     os.makedirs(output_dir, exist_ok=True)
     for _, row in df.iterrows():
-        sign = row["Folder Name"].strip()
-        link = row["Link"].strip()
+        sign = str(row["label"]).strip()
+        link = str(row["video_path"]).strip()
         sign_folder = os.path.join(output_dir, sign)
         os.makedirs(sign_folder, exist_ok=True)
         # Extract Google Drive ID
@@ -670,6 +1104,38 @@ def download_sign_dataset():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/text-to-sign', methods=['POST', 'OPTIONS'])
+def text_to_sign():
+    """Playlist of sign clips for (English) text: dictionary signs, else fingerspelling"""
+    if request.method == 'OPTIONS':
+        response = jsonify({"status": "ok"})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Methods', 'POST')
+        return response
+
+    data = request.get_json(silent=True) or {}
+    text = (data.get('text') or '').strip()
+    if not text:
+        return jsonify({"success": False, "error": "No text provided"}), 400
+    with metrics.stage("sign_lookup"):
+        result = sign_dictionary.lookup(text)
+    return jsonify({"success": True, **result})
+
+@app.route('/sign-clips/<clip_id>.mp4', methods=['GET'])
+def sign_clip(clip_id):
+    """Serve a clip from /text-to-sign (low-bitrate rendition when ready); supports Range requests"""
+    path = sign_dictionary.clip_file(clip_id)
+    if path is None:
+        return jsonify({"success": False, "error": "Unknown clip"}), 404
+    # Clip ids change with the file, so clients may cache them; conditional=True answers Range with 206
+    return send_file(os.path.abspath(path), mimetype="video/mp4", conditional=True, max_age=3600)
+
+@app.route('/sign-index', methods=['GET'])
+def sign_index_stats():
+    """Clip index size, pending renditions and last refresh time"""
+    return jsonify({"success": True, **sign_dictionary.stats()})
+
 @app.route('/sign-translate', methods=['POST'])
 def sign_translate():
     """
@@ -682,12 +1148,16 @@ def sign_translate():
     if video_file.filename == '':
         return jsonify({"success": False, "error": "No file selected"}), 400
     with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_file:
-        video_file.save(temp_file.name)
         temp_file_path = temp_file.name
     try:
+        with open(temp_file_path, 'wb') as out:
+            uploads.copy_upload(video_file.stream, out, uploads.MAX_VIDEO_UPLOAD_BYTES)
+        uploads.check_video(temp_file_path, uploads.MAX_SEGMENT_VIDEO_SECONDS)
         # Dummy logic: just return filename as translation
         translation = os.path.basename(video_file.filename)
         return jsonify({"success": True, "translation": translation})
+    except uploads.UploadRejected as e:
+        return rejection_response(e)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
     finally:
@@ -703,11 +1173,16 @@ if __name__ == '__main__':
     print("- POST /translate - Translate text with context")
     print("- POST /translate-batch - Batch translation")
     print("- POST /detect-language - Language detection from text")
+    print("- POST /speech-translate - Speech to translated text/speech (streamed)")
+    print("- POST /text-to-speech - Synthesize speech (WAV)")
+    print("- GET  /get-voices - List available TTS voices")
     print("- POST /download-sign-dataset - Download sign language dataset")
+    print("- POST /text-to-sign - Text to a playlist of sign clips")
+    print("- GET  /sign-clips/<id>.mp4 - Sign clip (Range requests supported)")
     print("- POST /sign-translate - Translate Indian Sign Language video")
     print("Features:")
     print("- Speech Recognition (speech_recognition)")
-    print("- Text-to-Speech (pyttsx3)")
+    print("- Text-to-Speech (espeak / pyttsx3, cached)")
     print("- Automatic language detection")
     print("- Multi-engine translation (Google + MyMemory)")
     print("- Context-aware translation")
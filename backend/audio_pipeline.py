@@ -0,0 +1,290 @@
+"""
+In-memory audio ingestion for /transcribe.
+
+Uploads are sniffed by their leading bytes rather than the filename, decoded
+without touching disk, then downmixed, resampled to 16 kHz mono int16 and
+trimmed of leading/trailing silence before being handed to a recognizer.
+WAV is decoded with the standard library; FLAC/OGG/AIFF use soundfile and
+compressed containers (m4a/AAC, mp3, webm, 3gp) use PyAV when installed.
+"""
+
+import io
+import time
+import wave
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import speech_recognition as sr
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+try:
+    import av
+except ImportError:
+    av = None
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+SILENCE_THRESHOLD_DB = -40.0  # relative to the clip's peak frame
+SILENCE_FRAME_MS = 20
+SILENCE_PADDING_MS = 100
+SEGMENT_MIN_SILENCE_MS = 300
+SEGMENT_MAX_SECONDS = 15.0
+
+
+class AudioFormatError(ValueError):
+    """Raised when an upload can't be identified or decoded"""
+
+
+def sniff_format(data: bytes) -> str:
+    """Identify the container from its magic bytes"""
+    head = data[:16]
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[4:8] == b"ftyp":
+        return "mp4"  # m4a / AAC / 3gp share the ISO base media container
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[:4] == b"caff":
+        return "caf"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[:6] == b"#!AMR\n":
+        return "amr"
+    raise AudioFormatError("Unrecognized audio format")
+
+
+def audio_duration(data: bytes) -> Optional[float]:
+    """Length in seconds read from the container header without decoding; None if unknown"""
+    try:
+        fmt = sniff_format(data)
+    except AudioFormatError:
+        return None
+    if fmt == "wav":
+        try:
+            with wave.open(io.BytesIO(data), "rb") as wav:
+                # Streamed recordings often leave a placeholder frame count; trust the payload size
+                frames = min(wav.getnframes(), len(data) // (wav.getnchannels() * wav.getsampwidth()))
+                return frames / wav.getframerate()
+        except (wave.Error, EOFError):
+            pass
+    if fmt in ("wav", "aiff", "flac", "ogg") and soundfile is not None:
+        try:
+            return soundfile.info(io.BytesIO(data)).duration
+        except RuntimeError:
+            pass
+    if av is not None:
+        try:
+            with av.open(io.BytesIO(data)) as container:
+                if container.duration:
+                    return container.duration / av.time_base
+        except Exception as e:
+            logger.warning(f"Could not probe {fmt} duration: {e}")
+    return None
+
+
+def _decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        # Widen 24-bit little-endian samples into the top of an int32
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        wide = np.zeros((packed.shape[0], 4), dtype=np.uint8)
+        wide[:, 1:] = packed
+        samples = wide.view("<i4").ravel().astype(np.float32) / 2147483648.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise AudioFormatError(f"Unsupported WAV sample width: {width}")
+    return samples.reshape(-1, channels), rate
+
+
+def _decode_soundfile(data: bytes) -> Tuple[np.ndarray, int]:
+    samples, rate = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return samples, rate
+
+
+def _decode_av(data: bytes) -> Tuple[np.ndarray, int]:
+    chunks = []
+    rate = None
+    with av.open(io.BytesIO(data)) as container:
+        stream = container.streams.audio[0]
+        rate = stream.codec_context.sample_rate
+        for frame in container.decode(stream):
+            array = frame.to_ndarray()
+            if frame.format.is_planar:
+                array = array.T  # (channels, samples) -> (samples, channels)
+            else:
+                array = array.reshape(-1, len(frame.layout.channels))
+            if array.dtype.kind == "i":
+                array = array.astype(np.float32) / float(np.iinfo(array.dtype).max + 1)
+            chunks.append(array.astype(np.float32, copy=False))
+    if not chunks:
+        raise AudioFormatError("No audio frames found")
+    return np.concatenate(chunks), rate
+
+
+def decode_audio(data: bytes, fmt: str) -> Tuple[np.ndarray, int]:
+    """Decode to float32 samples shaped (frames, channels) plus the sample rate"""
+    if fmt == "wav":
+        try:
+            return _decode_wav(data)
+        except (wave.Error, EOFError):
+            pass  # float or extensible WAV, let the libraries handle it
+    if fmt in ("wav", "aiff", "flac", "ogg") and soundfile is not None:
+        try:
+            return _decode_soundfile(data)
+        except RuntimeError as e:
+            logger.warning(f"soundfile could not decode {fmt}: {e}")
+    if av is not None:
+        return _decode_av(data)
+    raise AudioFormatError(f"No decoder available for {fmt} audio (install soundfile or av)")
+
+
+def to_mono(samples: np.ndarray) -> np.ndarray:
+    if samples.ndim == 1:
+        return samples
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1)
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Linear-interpolation resampler with a box pre-filter when downsampling"""
+    if rate == target_rate or samples.size == 0:
+        return samples
+    if rate > target_rate:
+        # Cheap anti-aliasing: average over the decimation ratio before interpolating
+        width = int(rate // target_rate)
+        if width > 1:
+            kernel = np.ones(width, dtype=np.float32) / width
+            samples = np.convolve(samples, kernel, mode="same")
+    out_len = int(round(samples.size * target_rate / rate))
+    positions = np.arange(out_len, dtype=np.float64) * (rate / target_rate)
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def trim_silence(samples: np.ndarray, rate: int = TARGET_SAMPLE_RATE,
+                 threshold_db: float = SILENCE_THRESHOLD_DB) -> np.ndarray:
+    """Drop leading and trailing frames quieter than threshold_db below the loudest frame"""
+    frame = int(rate * SILENCE_FRAME_MS / 1000)
+    n_frames = samples.size // frame
+    if n_frames == 0:
+        return samples
+    energy = np.sqrt(np.mean(samples[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    peak = energy.max()
+    if peak <= 0:
+        return samples[:0]
+    voiced = np.flatnonzero(energy >= peak * (10 ** (threshold_db / 20)))
+    pad = int(rate * SILENCE_PADDING_MS / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(samples.size, (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+def ingest_audio(data: bytes, trim: bool = True) -> Tuple[sr.AudioData, Dict[str, any]]:
+    """Turn uploaded bytes into 16 kHz mono int16 AudioData with per-stage stats"""
+    timings = {}
+
+    start = time.perf_counter()
+    fmt = sniff_format(data)
+    timings["sniff"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    samples, rate = decode_audio(data, fmt)
+    timings["decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mono = resample(to_mono(samples), rate)
+    timings["resample"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if trim:
+        mono = trim_silence(mono)
+    pcm = to_int16(mono)
+    timings["trim"] = time.perf_counter() - start
+
+    audio = sr.AudioData(pcm.tobytes(), TARGET_SAMPLE_RATE, 2)
+    info = {
+        "format": fmt,
+        "input_sample_rate": rate,
+        "input_channels": samples.shape[1],
+        "input_bytes": len(data),
+        "output_bytes": len(audio.frame_data),
+        "duration": pcm.size / TARGET_SAMPLE_RATE,
+        "timings": timings
+    }
+    return audio, info
+
+
+def split_on_silence(audio: sr.AudioData, min_silence_ms: int = SEGMENT_MIN_SILENCE_MS,
+                     max_segment_seconds: float = SEGMENT_MAX_SECONDS,
+                     threshold_db: float = SILENCE_THRESHOLD_DB) -> List[sr.AudioData]:
+    """Cut 16 kHz int16 audio at pauses so segments can be recognized independently.
+
+    Cuts go in the middle of every silent run of at least min_silence_ms; segments
+    longer than max_segment_seconds are additionally split at their quietest frame.
+    Empty or all-zero audio has no voiced segments and gives an empty list.
+    """
+    samples = np.frombuffer(audio.frame_data, dtype=np.int16)
+    rate = audio.sample_rate
+    frame = int(rate * SILENCE_FRAME_MS / 1000)
+    n_frames = samples.size // frame
+    if n_frames == 0:
+        return [audio] if np.any(samples) else []
+
+    frames = samples[:n_frames * frame].reshape(n_frames, frame).astype(np.float32)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    if energy.max() <= 0:
+        return []
+    silent = energy < energy.max() * (10 ** (threshold_db / 20))
+
+    # Find runs of silent frames via edges of the padded boolean mask
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    min_run = max(1, min_silence_ms // SILENCE_FRAME_MS)
+    cuts = [(start + end) // 2 for start, end in zip(run_starts, run_ends)
+            if end - start >= min_run and start > 0 and end < n_frames]
+
+    bounds = [0] + cuts + [n_frames]
+    max_frames = int(max_segment_seconds * 1000 / SILENCE_FRAME_MS)
+    split_bounds = [0]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        while end - start > max_frames:
+            window = energy[start + max_frames // 2:start + max_frames]
+            cut = start + max_frames // 2 + int(np.argmin(window))
+            split_bounds.append(cut)
+            start = cut
+        split_bounds.append(end)
+
+    segments = []
+    for start, end in zip(split_bounds[:-1], split_bounds[1:]):
+        chunk = samples[start * frame:(end * frame if end < n_frames else samples.size)]
+        if silent[start:end].all():
+            continue
+        segments.append(sr.AudioData(chunk.tobytes(), rate, audio.sample_width))
+    return segments
@@ -0,0 +1,66 @@
+"""
+Audio ingestion benchmark: per-stage timings and bytes handed to the recognizer.
+
+Builds typical phone recordings in memory (44.1/48 kHz stereo WAV, plus AAC in
+an m4a container when PyAV is installed) and runs them through ingest_audio.
+
+    python benchmarks/bench_audio_pipeline.py --seconds 2 5 10
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_pipeline import av, ingest_audio  # noqa: E402
+from benchmarks.fixtures import encode_m4a, encode_wav, synth_speechlike  # noqa: E402
+
+
+def bench_case(name, data, repeats):
+    stage_times = {}
+    for _ in range(repeats):
+        _, info = ingest_audio(data)
+        for stage, seconds in info["timings"].items():
+            stage_times.setdefault(stage, []).append(seconds)
+    stages_ms = {stage: round(min(values) * 1000, 3) for stage, values in stage_times.items()}
+    return {
+        "case": name,
+        "format": info["format"],
+        "input_bytes": info["input_bytes"],
+        "output_bytes": info["output_bytes"],
+        "byte_reduction": round(info["input_bytes"] / max(1, info["output_bytes"]), 2),
+        "trimmed_duration": round(info["duration"], 3),
+        "stages_ms": stages_ms,
+        "total_ms": round(sum(stages_ms.values()), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for seconds in args.seconds:
+        for rate in (44100, 48000):
+            samples = synth_speechlike(seconds, rate, 2)
+            cases = [(f"wav_{rate}_stereo_{seconds:g}s", encode_wav(samples, rate))]
+            if av is not None:
+                cases.append((f"m4a_{rate}_stereo_{seconds:g}s", encode_m4a(samples, rate)))
+            for name, data in cases:
+                result = bench_case(name, data, args.repeats)
+                results.append(result)
+                stages = "  ".join(f"{k} {v:.2f}ms" for k, v in result["stages_ms"].items())
+                print(f"{name:<28} {result['input_bytes']:>9}B -> {result['output_bytes']:>8}B  {stages}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Inference mode benchmark for the sign models: Keras predict() (the old serving
+path) against serving.CompiledModel fixed-shape functions, with and without
+XLA and bfloat16, at several batch sizes.
+
+Per model, variant and batch size reports p50 latency, throughput (items/s),
+speedup over predict(), startup compile + warmup time and the max absolute
+difference from predict()'s output.
+
+    python benchmarks/bench_inference.py --intra-op-threads 4 --json results/inference.json
+    python benchmarks/bench_inference.py --variants predict graph graph_bf16 --models backbone
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from benchmarks.common import measure, write_json  # noqa: E402
+from benchmarks.fixtures import make_sign_models  # noqa: E402
+
+VARIANTS = {
+    # name: (precision, jit_compile); predict is the Keras baseline
+    "predict": None,
+    "graph": ("float32", False),
+    "graph_bf16": ("bfloat16", False),
+    "xla": ("float32", True),
+    "xla_bf16": ("bfloat16", True),
+}
+BATCH_SIZES = {"backbone": [1, 4, 10, 32], "head": [1, 8, 32], "image": [1, 8, 32]}
+
+
+def load_models(model_dir):
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model  # type: ignore
+    from preprocessing import IMG_SIZE, with_uint8_input
+
+    backbone = tf.keras.applications.MobileNetV2(input_shape=(IMG_SIZE, IMG_SIZE, 3), include_top=False,
+                                                 pooling="avg", weights=None)
+    head = load_model(os.path.join(model_dir, "sign_model_weights.keras"))
+    image = with_uint8_input(load_model(os.path.join(model_dir, "sign_image_model.keras")))
+    return {"backbone": with_uint8_input(backbone), "head": head, "image": image}
+
+
+def sample_input(model, batch, rng):
+    shape = (batch,) + tuple(model.input_shape[1:])
+    if str(model.inputs[0].dtype) == "uint8":
+        return rng.integers(0, 256, shape, dtype=np.uint8)
+    return rng.random(shape, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", help="directory with trained .keras models (stand-ins generated if omitted)")
+    parser.add_argument("--models", nargs="+", choices=sorted(BATCH_SIZES), default=sorted(BATCH_SIZES))
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--intra-op-threads", type=int, default=0, help="0 = TensorFlow default")
+    parser.add_argument("--inter-op-threads", type=int, default=0, help="0 = TensorFlow default")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    import serving
+    serving.configure_threads(args.intra_op_threads, args.inter_op_threads)
+    model_dir = args.model_dir or make_sign_models(tempfile.mkdtemp(prefix="cb-inference-"))
+    models = load_models(model_dir)
+    rng = np.random.default_rng(0)
+    bf16_native = serving.cpu_supports_bf16()
+
+    results = {}
+    for model_name in args.models:
+        model = models[model_name]
+        batches = BATCH_SIZES[model_name]
+        inputs = {b: sample_input(model, b, rng) for b in batches}
+        reference = {b: model.predict(inputs[b], verbose=0) for b in batches}
+        baseline = {}
+        for variant in args.variants:
+            if VARIANTS[variant] is None:
+                runner, compile_s = model, 0.0
+            else:
+                precision, jit_compile = VARIANTS[variant]
+                start = time.perf_counter()
+                runner = serving.CompiledModel(model, batches, precision, jit_compile)
+                runner.warmup()
+                compile_s = time.perf_counter() - start
+            for batch in batches:
+                x = inputs[batch]
+                timing = measure(lambda: runner.predict(x, verbose=0), args.repeats, 1)
+                throughput = batch / (timing["p50_ms"] / 1000)
+                if variant == "predict":
+                    baseline[batch] = timing["p50_ms"]
+                entry = {
+                    "latency": timing,
+                    "items_per_sec": round(throughput, 1),
+                    "compile_s": round(compile_s, 2),
+                    "max_abs_diff": float(np.abs(runner.predict(x, verbose=0) - reference[batch]).max()),
+                }
+                if batch in baseline:
+                    entry["speedup_vs_predict"] = round(baseline[batch] / timing["p50_ms"], 2)
+                results[f"{model_name}.{variant}.batch_{batch}"] = entry
+                print(f"{model_name:<9} {variant:<11} batch {batch:>3}   p50 {timing['p50_ms']:>9.2f} ms   "
+                      f"{throughput:>9.1f} items/s   x{entry.get('speedup_vs_predict', 0):>6.2f}   "
+                      f"compile {compile_s:>6.2f} s   max diff {entry['max_abs_diff']:.2e}")
+
+    if args.json:
+        write_json(args.json, "inference", {"bf16_native": bf16_native,
+                                            "intra_op_threads": args.intra_op_threads,
+                                            "inter_op_threads": args.inter_op_threads,
+                                            "results": results})
+
+
+if __name__ == "__main__":
+    main()
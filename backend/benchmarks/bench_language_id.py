@@ -0,0 +1,127 @@
+"""
+Language identification benchmark: accuracy and latency vs per-call langdetect.
+
+Covers the Indian languages in TranslationEngine.indian_languages (plus English
+as a Latin-script control) with short, everyday utterances - the kind of text
+/transcribe produces.
+
+    python benchmarks/bench_language_id.py --repeats 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langdetect import DetectorFactory, detect_langs  # noqa: E402
+from langdetect.lang_detect_exception import LangDetectException  # noqa: E402
+from language_id import LanguageIdentifier  # noqa: E402
+
+SAMPLES = {
+    'hi': ["मेरा नाम राहुल है।", "आज मौसम बहुत अच्छा है।", "क्या आप मेरी मदद कर सकते हैं?"],
+    'mr': ["माझे नाव राहुल आहे.", "आज हवामान खूप छान आहे.", "तुम्ही मला मदत करू शकता का?"],
+    'ne': ["मेरो नाम राहुल हो।", "आज मौसम धेरै राम्रो छ।", "के तपाईं मलाई मद्दत गर्न सक्नुहुन्छ?"],
+    'sa': ["मम नाम राहुलः अस्ति।", "अद्य वातावरणं सुन्दरम् अस्ति।", "भवान् मम साहाय्यं कर्तुं शक्नोति वा?"],
+    'bn': ["আমার নাম রাহুল।", "আজ আবহাওয়া খুব ভালো।", "আপনি কি আমাকে সাহায্য করতে পারেন?"],
+    'as': ["মোৰ নাম ৰাহুল।", "আজি বতৰ বৰ ভাল।", "আপুনি মোক সহায় কৰিব পাৰিবনে?"],
+    'ta': ["என் பெயர் ராகுல்.", "இன்று வானிலை மிகவும் நன்றாக உள்ளது.", "நீங்கள் எனக்கு உதவ முடியுமா?"],
+    'te': ["నా పేరు రాహుల్.", "ఈ రోజు వాతావరణం చాలా బాగుంది.", "మీరు నాకు సహాయం చేయగలరా?"],
+    'kn': ["ನನ್ನ ಹೆಸರು ರಾಹುಲ್.", "ಇಂದು ಹವಾಮಾನ ತುಂಬಾ ಚೆನ್ನಾಗಿದೆ.", "ನೀವು ನನಗೆ ಸಹಾಯ ಮಾಡಬಹುದೇ?"],
+    'gu': ["મારું નામ રાહુલ છે.", "આજે હવામાન ખૂબ સરસ છે.", "શું તમે મને મદદ કરી શકો?"],
+    'ml': ["എന്റെ പേര് രാഹുൽ.", "ഇന്ന് കാലാവസ്ഥ വളരെ നല്ലതാണ്.", "നിങ്ങൾക്ക് എന്നെ സഹായിക്കാമോ?"],
+    'pa': ["ਮੇਰਾ ਨਾਮ ਰਾਹੁਲ ਹੈ।", "ਅੱਜ ਮੌਸਮ ਬਹੁਤ ਵਧੀਆ ਹੈ।", "ਕੀ ਤੁਸੀਂ ਮੇਰੀ ਮਦਦ ਕਰ ਸਕਦੇ ਹੋ?"],
+    'or': ["ମୋ ନାମ ରାହୁଲ।", "ଆଜି ପାଣିପାଗ ବହୁତ ଭଲ।", "ଆପଣ ମୋତେ ସାହାଯ୍ୟ କରିପାରିବେ କି?"],
+    'ur': ["میرا نام راہول ہے۔", "آج موسم بہت اچھا ہے۔", "کیا آپ میری مدد کر سکتے ہیں؟"],
+    'dv': ["އަހަރެންގެ ނަމަކީ ރާހުލް.", "މިއަދު މޫސުން ވަރަށް ރަނގަޅު.", "ތިބާއަށް އަހަރެންނަށް އެހީތެރިވެދެވޭތޯ؟"],
+    'si': ["මගේ නම රාහුල්.", "අද කාලගුණය ඉතා හොඳයි.", "ඔබට මට උදව් කළ හැකිද?"],
+    'en': ["My name is Rahul.", "The weather is very nice today.", "Can you help me please?"],
+}
+
+
+def langdetect_detect(text):
+    try:
+        return detect_langs(text)[0].lang
+    except LangDetectException:
+        return 'unknown'
+
+
+def timed(fn, items, repeats):
+    """Median per-item latency in microseconds plus the last outputs"""
+    per_item = []
+    outputs = []
+    for _ in range(repeats):
+        outputs = []
+        for item in items:
+            start = time.perf_counter()
+            outputs.append(fn(item))
+            per_item.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(per_item), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    DetectorFactory.seed = 0
+    texts = [text for lang in SAMPLES for text in SAMPLES[lang]]
+    labels = [lang for lang in SAMPLES for _ in SAMPLES[lang]]
+
+    start = time.perf_counter()
+    identifier = LanguageIdentifier(cache_size=0)
+    load_ms = (time.perf_counter() - start) * 1000
+    langdetect_detect("warm up")  # langdetect loads its profiles lazily
+
+    ld_us, ld_out = timed(langdetect_detect, texts, args.repeats)
+    fast_us, fast_out = timed(lambda t: identifier.detect(t)['language'], texts, args.repeats)
+
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        identifier.detect_batch(texts)
+    batch_us = (time.perf_counter() - start) * 1e6 / (args.repeats * len(texts))
+
+    cached = LanguageIdentifier(cache_size=len(texts))
+    cached.detect_batch(texts)
+    cached_us, _ = timed(lambda t: cached.detect(t)['language'], texts, args.repeats)
+
+    per_language = {}
+    for lang, ld, fast in zip(labels, ld_out, fast_out):
+        stats = per_language.setdefault(lang, {"n": 0, "langdetect": 0, "fast": 0})
+        stats["n"] += 1
+        stats["langdetect"] += ld == lang
+        stats["fast"] += fast == lang
+
+    print(f"{'lang':<6}{'langdetect':>12}{'fast':>8}")
+    for lang, stats in per_language.items():
+        print(f"{lang:<6}{stats['langdetect']:>10}/{stats['n']}{stats['fast']:>6}/{stats['n']}")
+
+    results = {
+        "samples": len(texts),
+        "accuracy": {
+            "langdetect": round(sum(a == b for a, b in zip(ld_out, labels)) / len(texts), 4),
+            "fast": round(sum(a == b for a, b in zip(fast_out, labels)) / len(texts), 4)
+        },
+        "latency_us": {
+            "langdetect": round(ld_us, 1),
+            "fast_single": round(fast_us, 1),
+            "fast_batched": round(batch_us, 1),
+            "fast_cached": round(cached_us, 1)
+        },
+        "index_load_ms": round(load_ms, 1),
+        "per_language": per_language
+    }
+    print(f"accuracy   langdetect {results['accuracy']['langdetect']:.2%}   fast {results['accuracy']['fast']:.2%}")
+    print("latency us " + "  ".join(f"{k} {v}" for k, v in results["latency_us"].items()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
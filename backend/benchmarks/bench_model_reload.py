@@ -0,0 +1,198 @@
+"""
+Hot model reload benchmark: what clients see while the sign server swaps versions.
+
+Worker threads keep /detect-sign and /detect-frames busy while new versions
+are published into MODEL_DIR (model_registry.py). Requests are tagged with
+the X-Model-Version that answered them and sorted into phases:
+
+- steady: before the first publish
+- swap: while a new version loads and warms up in the background
+- after: once every request is answered by the new version
+- canary: a further version serving --canary-percent of requests next to the
+  active one (per-version model latency from /models), then promoted
+- broken: a version with a corrupt model file, which must be rejected while
+  the active version keeps serving
+
+Reported: status counts (any non-200 is a dropped request), latency per
+phase, publish-to-serving time, and the restart cold start the swap replaces.
+
+    python benchmarks/bench_model_reload.py --workers 4 --phase-seconds 5 --canary-percent 25
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from benchmarks.common import summarize_ms, write_json  # noqa: E402
+from benchmarks.fixtures import make_jpeg, make_sign_models  # noqa: E402
+
+
+class Traffic:
+    """Closed-loop clients alternating image and frame-tensor requests, each with distinct bytes"""
+
+    def __init__(self, app, workers: int, max_frames: int):
+        self.app = app
+        self.jpeg = make_jpeg(640, 360)
+        self.tensor_bytes = max_frames * 128 * 128 * 3
+        self.records = []  # (start, seconds, status, version)
+        self.lock = threading.Lock()
+        self.running = True
+        self.threads = [threading.Thread(target=self._run, args=(i,), daemon=True) for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self, worker):
+        from fastapi.testclient import TestClient
+
+        client = TestClient(self.app)
+        rng = np.random.default_rng(worker)
+        n = 0
+        while self.running:
+            n += 1
+            start = time.perf_counter()
+            if n % 2:
+                # Trailing bytes make each upload unique (JPEG decoders ignore them), so the cache never answers
+                files = {"file": ("sign.jpg", self.jpeg + rng.bytes(8), "image/jpeg")}
+                response = client.post("/detect-sign", files=files)
+            else:
+                files = {"tensor": ("clip.bin", rng.bytes(self.tensor_bytes), "application/octet-stream")}
+                response = client.post("/detect-frames", files=files)
+            with self.lock:
+                self.records.append((start, time.perf_counter() - start, response.status_code,
+                                     response.headers.get("X-Model-Version")))
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join()
+
+    def window(self, begin: float, end: float):
+        with self.lock:
+            return [r for r in self.records if begin <= r[0] < end]
+
+
+def summarize(records):
+    if not records:
+        return {"n": 0}
+    result = summarize_ms([r[1] for r in records])
+    statuses, versions = {}, {}
+    for _, _, status, version in records:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        versions[version] = versions.get(version, 0) + 1
+    result.update({"statuses": statuses, "versions": versions})
+    return result
+
+
+def wait_for(condition, timeout: float, interval: float = 0.05) -> float:
+    start = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError("condition not reached")
+        time.sleep(interval)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--phase-seconds", type=float, default=5)
+    parser.add_argument("--poll-seconds", type=float, default=0.25, help="model watcher interval")
+    parser.add_argument("--canary-percent", type=float, default=25, help="0 skips the canary phase")
+    parser.add_argument("--timeout", type=float, default=300, help="longest wait for a version to load")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cb-reload-")
+    model_dir = os.path.join(workdir, "models")
+    os.environ["MODEL_DIR"] = model_dir
+    os.environ["MODEL_POLL_SECONDS"] = str(args.poll_seconds)
+    # New versions are built before traffic starts, so building them does not compete for the CPU
+    base = make_sign_models(os.path.join(workdir, "base"))
+    sources = {name: make_sign_models(os.path.join(workdir, name)) for name in ("v2", "v3")}
+    with open(os.path.join(make_sign_models(os.path.join(workdir, "v4")), "sign_image_model.keras"), "wb") as f:
+        f.write(b"not a model")
+    sources["v4"] = os.path.join(workdir, "v4")
+
+    from benchmarks.servers import load_sign_app
+    start = time.perf_counter()
+    server = load_sign_app(base)
+    cold_start = time.perf_counter() - start
+    from model_registry import publish
+    registry = server.model_registry
+    results = {"cold_start_seconds": round(cold_start, 2), "workers": args.workers,
+               "initial_version": registry.active.version}
+
+    traffic = Traffic(server.app, args.workers, registry.active.max_frames)
+    t0 = time.perf_counter()
+    time.sleep(args.phase_seconds)
+
+    # Swap: publish v2 and wait until it is installed
+    t_publish = time.perf_counter()
+    publish(sources["v2"], model_dir, "v2")
+    swap_seconds = wait_for(lambda: registry.active.version == "v2", args.timeout)
+    t_swapped = time.perf_counter()
+    time.sleep(args.phase_seconds)
+    t_after = time.perf_counter()
+    results.update({
+        "publish_to_serving_seconds": round(swap_seconds, 2),
+        "load_seconds": registry.active.load_seconds,
+        "steady": summarize(traffic.window(t0, t_publish)),
+        "swap": summarize(traffic.window(t_publish, t_swapped)),
+        "after": summarize(traffic.window(t_swapped, t_after)),
+    })
+
+    if args.canary_percent > 0:
+        registry.canary_percent = args.canary_percent
+        publish(sources["v3"], model_dir, "v3")
+        wait_for(lambda: registry.canary is not None, args.timeout)
+        t_canary = time.perf_counter()
+        time.sleep(args.phase_seconds)
+        stats = registry.stats()
+        results["canary"] = summarize(traffic.window(t_canary, time.perf_counter()))
+        results["canary"]["models"] = {role: {k: stats[role][k] for k in ("version", "requests", "model_p50_ms",
+                                                                          "model_p99_ms")}
+                                       for role in ("active", "canary")}
+        registry.promote()
+
+    active = registry.active.version
+    t_broken = time.perf_counter()
+    publish(sources["v4"], model_dir, "v4")
+    wait_for(lambda: any(version == "v4" for version, _ in registry.failed), args.timeout)
+    time.sleep(args.poll_seconds * 4)
+    results["broken"] = summarize(traffic.window(t_broken, time.perf_counter()))
+    results["broken"]["still_serving"] = registry.active.version
+    results["broken"]["kept_active"] = registry.active.version == active
+
+    traffic.stop()
+    wait_for(lambda: not registry.retiring, args.timeout)
+    results["total"] = summarize(traffic.records)
+    results["dropped"] = sum(1 for r in traffic.records if r[2] != 200)
+    results["events"] = registry.stats()["events"]
+
+    print(f"cold start {results['cold_start_seconds']:.1f} s; publish -> serving "
+          f"{results['publish_to_serving_seconds']:.1f} s (load + warm-up {results['load_seconds']:.1f} s)")
+    for phase in ("steady", "swap", "after", "canary", "broken"):
+        r = results.get(phase)
+        if r and r["n"]:
+            print(f"{phase:<8} n {r['n']:>5}  p50 {r['p50_ms']:>8.1f} ms  p99 {r['p99_ms']:>8.1f} ms  "
+                  f"statuses {r['statuses']}  versions {r['versions']}")
+    if "canary" in results:
+        for role, m in results["canary"]["models"].items():
+            print(f"  {role:<7} {m['version']:<6} requests {m['requests']:>5}  model p50 {m['model_p50_ms']} ms  "
+                  f"p99 {m['model_p99_ms']} ms")
+    print(f"dropped requests: {results['dropped']} of {results['total']['n']}; "
+          f"broken version rejected, still serving {results['broken']['still_serving']}")
+
+    if args.json:
+        write_json(args.json, "model_reload", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Phrase-table translation tier benchmark: share served locally and latency saved.
+
+Replays a mix of /translate requests against the speech server twice, once
+with the phrase tables (phrase_table.py) and once with an empty table
+directory, with upstream translation faked at a fixed latency:
+
+- phrase: everyday accessibility phrases fully covered by the tables
+- glossary: sentences with medical glossary terms (context "medical"); the
+  terms are kept out of the upstream call and enforced in the output
+- free: text with no table phrases, always translated upstream
+
+Reported: latency per kind with and without the tables, the local share and
+token coverage from /translation-stats, its latency-saved estimate, and the
+total time actually saved over the run.
+
+    python benchmarks/bench_phrase_table.py --requests 300 --translate-latency-ms 80 --mix 60 20 20
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from benchmarks.common import summarize_ms, write_json  # noqa: E402
+from benchmarks.servers import load_speech_app  # noqa: E402
+
+WORKLOAD = {
+    "phrase": [
+        ("Thank you!", None), ("Please wait.", None), ("Hello, how are you?", None),
+        ("I do not understand, please repeat.", None), ("I am deaf. I use sign language.", None),
+        ("I need help!", None), ("Where is the toilet?", None), ("Can you write it down, please?", None),
+    ],
+    "glossary": [
+        ("The doctor will see you after the blood test", "medical"),
+        ("Do you have an allergy to this medicine?", "medical"),
+        ("Please ask the nurse for a sign language interpreter", "medical"),
+        ("How long have you had the fever and the pain?", "medical"),
+    ],
+    "free": [
+        ("The meeting has been moved to Thursday afternoon", None),
+        ("Could you tell me which platform the next train leaves from", None),
+        ("My phone battery died on the way here", None),
+        ("The library closes early on public holidays", None),
+    ],
+}
+
+
+def replay(client, requests):
+    latencies = {kind: [] for kind in WORKLOAD}
+    start = time.perf_counter()
+    for kind, (text, context) in requests:
+        t = time.perf_counter()
+        response = client.post("/translate", json={"text": text, "target_language": "hi", "source_language": "en",
+                                                   "context": context})
+        latencies[kind].append(time.perf_counter() - t)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--translate-latency-ms", type=float, default=80)
+    parser.add_argument("--mix", type=float, nargs=3, default=[60, 20, 20], metavar=("PHRASE", "GLOSSARY", "FREE"),
+                        help="relative share of each request kind")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    server = load_speech_app(0.0, args.translate_latency_ms / 1000)
+    from phrase_table import PhraseTables, PhraseTranslator
+
+    rng = np.random.default_rng(0)
+    kinds = list(WORKLOAD)
+    weights = np.array(args.mix) / sum(args.mix)
+    requests = []
+    for kind in rng.choice(kinds, size=args.requests, p=weights):
+        items = WORKLOAD[kind]
+        requests.append((kind, items[rng.integers(len(items))]))
+
+    client = server.app.test_client()
+    engine = server.translation_engine
+    tables = engine.phrase_translator.tables
+
+    results = {"requests": args.requests, "translate_latency_ms": args.translate_latency_ms,
+               "mix": dict(zip(kinds, args.mix))}
+    for label, phrase_tables in (("upstream_only", PhraseTables(tempfile.mkdtemp(prefix="cb-phrases-"))),
+                                 ("phrase_table", tables)):
+        engine.phrase_translator = PhraseTranslator(phrase_tables)
+        total, latencies = replay(client, requests)
+        results[label] = {"total_seconds": round(total, 2),
+                          **{kind: summarize_ms(samples) for kind, samples in latencies.items() if samples}}
+    stats = client.get("/translation-stats").get_json()
+    results["stats"] = {k: stats[k] for k in ("local", "partial", "upstream", "gap_fallbacks", "local_share",
+                                              "token_coverage", "local_mean_ms", "upstream_mean_ms",
+                                              "latency_saved_seconds")}
+    results["saved_seconds"] = round(results["upstream_only"]["total_seconds"]
+                                     - results["phrase_table"]["total_seconds"], 2)
+
+    print(f"{args.requests} requests, upstream {args.translate_latency_ms:.0f} ms, mix {results['mix']}")
+    for kind in kinds:
+        base, tier = results["upstream_only"].get(kind), results["phrase_table"].get(kind)
+        if base and tier:
+            print(f"{kind:<9} p50 {base['p50_ms']:>7.1f} -> {tier['p50_ms']:>7.1f} ms   "
+                  f"p99 {base['p99_ms']:>7.1f} -> {tier['p99_ms']:>7.1f} ms")
+    s = results["stats"]
+    print(f"served locally {s['local']} ({s['local_share']:.0%}), partial {s['partial']}, upstream {s['upstream']}; "
+          f"token coverage {s['token_coverage']:.0%}, gap fallbacks {s['gap_fallbacks']}")
+    print(f"latency saved: {results['saved_seconds']:.2f} s measured "
+          f"({results['upstream_only']['total_seconds']:.2f} -> {results['phrase_table']['total_seconds']:.2f} s), "
+          f"{s['latency_saved_seconds']} s estimated by /translation-stats")
+
+    if args.json:
+        write_json(args.json, "phrase_table", results)
+
+
+if __name__ == "__main__":
+    main()
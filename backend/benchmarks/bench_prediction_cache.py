@@ -0,0 +1,121 @@
+"""
+Prediction / embedding cache benchmark for the sign server.
+
+Replays a request stream where a fraction of uploads repeat earlier ones
+(client retries and popular reference clips, Zipf-weighted), and where some
+videos are near-duplicates: the same frames re-encoded with a different GOP,
+so the bytes differ but the perceptual frame hashes mostly match.
+
+Each stream is run with no caching, with the prediction cache, and with both
+caches, reporting latency, hit ratios and total wall time.
+
+    python benchmarks/bench_prediction_cache.py --repeat-ratio 0.4 --requests 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from benchmarks.common import summarize_ms, write_json  # noqa: E402
+from benchmarks.fixtures import make_jpeg, make_video  # noqa: E402
+from benchmarks.servers import load_sign_app  # noqa: E402
+
+CONFIGS = {
+    "no_cache": (0, 0),
+    "prediction_cache": (1024, 0),
+    "prediction_and_embedding_cache": (1024, 32 * 1024 * 1024),
+}
+
+
+def request_stream(n_requests, repeat_ratio, new_upload, rng):
+    """Yield uploads; with probability repeat_ratio re-send a Zipf-weighted earlier one"""
+    seen = []
+    for _ in range(n_requests):
+        if seen and rng.random() < repeat_ratio:
+            weights = 1.0 / np.arange(1, len(seen) + 1)
+            yield seen[rng.choice(len(seen), p=weights / weights.sum())]
+        else:
+            upload = new_upload(len(seen))
+            seen.append(upload)
+            yield upload
+
+
+def replay(server, client, endpoint, uploads, config):
+    server.prediction_cache.max_entries, server.embedding_cache.max_bytes = CONFIGS[config]
+    for cache in (server.prediction_cache, server.embedding_cache):
+        cache.clear()
+        cache.hits = cache.misses = 0
+
+    latencies = []
+    start = time.perf_counter()
+    for filename, data, content_type in uploads:
+        t = time.perf_counter()
+        response = client.post(endpoint, files={"file": (filename, data, content_type)})
+        latencies.append(time.perf_counter() - t)
+        assert response.status_code == 200, response.text
+    result = summarize_ms(latencies)
+    result["wall_s"] = round(time.perf_counter() - start, 3)
+    result["prediction_cache"] = server.prediction_cache.stats()
+    result["embedding_cache"] = server.embedding_cache.stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat-ratio", type=float, default=0.4, help="fraction of requests re-sending an upload")
+    parser.add_argument("--near-duplicate-ratio", type=float, default=0.3,
+                        help="fraction of new videos that re-encode an earlier clip")
+    parser.add_argument("--requests", type=int, default=200, help="image requests (video gets a fifth)")
+    parser.add_argument("--model-dir", help="directory with trained .keras models and label files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    server = load_sign_app(args.model_dir)
+    from fastapi.testclient import TestClient
+    client = TestClient(server.app)
+    workdir = tempfile.mkdtemp(prefix="cb-cache-")
+
+    def new_image(i):
+        return (f"{i}.jpg", make_jpeg(640, 480, seed=i), "image/jpeg")
+
+    video_rng = np.random.default_rng(args.seed + 1)
+
+    def new_video(i):
+        # A near-duplicate re-encodes an earlier clip's frames with another GOP
+        seed = int(video_rng.integers(0, i)) if i and video_rng.random() < args.near_duplicate_ratio else i
+        path = make_video(os.path.join(workdir, f"{i}.mp4"), 2, 30, 640, 360, gop=30 + 7 * i, seed=seed)
+        with open(path, "rb") as f:
+            return (f"{i}.mp4", f.read(), "video/mp4")
+
+    streams = {
+        "detect_sign": list(request_stream(args.requests, args.repeat_ratio, new_image,
+                                           np.random.default_rng(args.seed))),
+        "detect_video": list(request_stream(max(5, args.requests // 5), args.repeat_ratio, new_video,
+                                            np.random.default_rng(args.seed))),
+    }
+
+    results = {}
+    for endpoint, uploads in streams.items():
+        for config in CONFIGS:
+            name = f"{endpoint}.{config}"
+            results[name] = r = replay(server, client, f"/{endpoint.replace('_', '-')}", uploads, config)
+            print(f"{name:<48} p50 {r['p50_ms']:>9.2f} ms   mean {r['mean_ms']:>9.2f} ms   wall {r['wall_s']:>7.2f} s   "
+                  f"prediction hits {r['prediction_cache']['hits']:>4}   embedding hits {r['embedding_cache']['hits']:>4}")
+
+    if args.json:
+        write_json(args.json, "prediction_cache", {
+            "repeat_ratio": args.repeat_ratio,
+            "near_duplicate_ratio": args.near_duplicate_ratio,
+            "runs": results
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Frame preprocessing micro-benchmark: the previous per-frame path
+(cvtColor -> resize -> astype(float32) / 255) against the shared kernel in
+preprocessing.py (resize -> in-place cvtColor into a preallocated uint8 clip,
+normalization deferred to the graph or fused over the clip).
+
+Reports time per frame, bytes allocated per frame (tracemalloc sees numpy and
+OpenCV outputs) and an estimate of the bytes each path reads and writes.
+
+    python benchmarks/bench_preprocessing.py --sizes 640x360 1280x720 1920x1080
+"""
+
+import os
+import sys
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import cv2  # noqa: E402
+
+from benchmarks.common import measure, write_json  # noqa: E402
+from benchmarks.fixtures import synth_frame  # noqa: E402
+from preprocessing import IMG_SIZE, allocate_clip, normalize, preprocess_frame  # noqa: E402
+
+
+def legacy_preprocess_frame(frame):
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    frame = cv2.resize(frame, (IMG_SIZE, IMG_SIZE))
+    frame = frame.astype("float32") / 255.0
+    return frame
+
+
+def legacy_clip(frames):
+    return np.stack([legacy_preprocess_frame(f) for f in frames])
+
+
+def kernel_clip(frames, out):
+    for i, f in enumerate(frames):
+        preprocess_frame(f, out[i])
+    return out
+
+
+def allocated_bytes(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def traffic(width, height, n):
+    """Approximate bytes read + written by each path for n frames"""
+    full, small = width * height * 3, IMG_SIZE * IMG_SIZE * 3
+    legacy = n * (
+        2 * full            # cvtColor over the full frame
+        + full + small      # resize
+        + small + 4 * small  # astype float32
+        + 2 * 4 * small     # / 255.0 into a new array
+    ) + 2 * 4 * small * n   # np.stack into the batch
+    kernel_graph = n * (full + small + 2 * small)  # resize into the slot + in-place swap
+    kernel_fused = kernel_graph + n * (small + 4 * small)  # + one fused normalize pass
+    return {"legacy": legacy, "kernel_uint8": kernel_graph, "kernel_fused_normalize": kernel_fused}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["640x360", "1280x720", "1920x1080"])
+    parser.add_argument("--frames", type=int, default=10, help="frames per clip")
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        frames = [synth_frame(width, height, seed=i) for i in range(args.frames)]
+        out = allocate_clip(args.frames)
+        normalized = np.empty(out.shape, dtype=np.float32)
+
+        assert np.allclose(legacy_clip(frames), normalize(kernel_clip(frames, out)), atol=1e-6)
+
+        paths = {
+            "legacy": lambda: legacy_clip(frames),
+            "kernel_uint8": lambda: kernel_clip(frames, out),
+            "kernel_fused_normalize": lambda: normalize(kernel_clip(frames, out), normalized),
+        }
+        estimated = traffic(width, height, args.frames)
+        for name, fn in paths.items():
+            stats = measure(fn, args.repeats)
+            stats["us_per_frame"] = round(stats["p50_ms"] * 1000 / args.frames, 2)
+            stats["allocated_bytes_per_frame"] = allocated_bytes(fn) // args.frames
+            stats["traffic_bytes_per_frame"] = estimated[name] // args.frames
+            results[f"{size}.{name}"] = stats
+            print(f"{size:<10} {name:<24} {stats['us_per_frame']:>9.1f} us/frame   "
+                  f"alloc {stats['allocated_bytes_per_frame']:>9} B/frame   "
+                  f"traffic ~{stats['traffic_bytes_per_frame'] / 1e6:>6.2f} MB/frame")
+
+    if args.json:
+        write_json(args.json, "preprocessing", {"frames_per_clip": args.frames, "img_size": IMG_SIZE,
+                                                "paths": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Continuous-signing segmentation benchmark: videos of back-to-back synthetic
+clips (one "sign" per --clip-seconds) of increasing length, segmented with
+/detect-video's mode=segment pipeline (segmentation.video_posteriors).
+
+Per length reports wall time, split into decode, backbone and head, time
+per second of video (flat = linear scaling), frames embedded and
+windows scored. For lengths up to --naive-max-seconds it also times the naive
+approach of embedding every window's frames separately, which is what
+repeated /detect-video clip calls per window would cost in backbone work.
+
+    python benchmarks/bench_segmentation.py --lengths 10 30 60 120 --json results/segmentation.json
+"""
+
+import os
+import sys
+import time
+import functools
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from benchmarks.common import write_json  # noqa: E402
+from benchmarks.fixtures import make_signing_video  # noqa: E402
+from benchmarks.servers import load_sign_app  # noqa: E402
+from segmentation import (SEGMENT_HOP, SEGMENT_WINDOW_SECONDS, stream_frames, window_starts,  # noqa: E402
+                          video_posteriors)
+
+
+def timed(fn, totals, key):
+    """Wrap fn so its wall time accumulates into totals[key]"""
+    def wrapper(x):
+        start = time.perf_counter()
+        result = fn(x)
+        totals[key] += time.perf_counter() - start
+        return result
+    return wrapper
+
+
+def naive_seconds(models, path, window_seconds, hop):
+    """Backbone + head per window, re-embedding overlapping frames every time"""
+    rate = models.max_frames / window_seconds
+    frames = np.concatenate([chunk.copy() for _, chunk in stream_frames(path, rate, models.max_frames)])
+    start = time.perf_counter()
+    for s in window_starts(len(frames), models.max_frames, hop):
+        features = models.base_model.predict(frames[s:s + models.max_frames], verbose=0)
+        models.video_model.predict(features[np.newaxis], verbose=0)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", help="directory with trained .keras models and label files")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[10, 30, 60, 120], help="video seconds")
+    parser.add_argument("--clip-seconds", type=float, default=2.0, help="length of each synthetic sign")
+    parser.add_argument("--window-seconds", type=float, default=SEGMENT_WINDOW_SECONDS)
+    parser.add_argument("--hop", type=int, default=SEGMENT_HOP)
+    parser.add_argument("--naive-max-seconds", type=float, default=30)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    server = load_sign_app(args.model_dir)
+    models = server.model_registry.active
+    workdir = tempfile.mkdtemp(prefix="cb-segment-")
+
+    results = {}
+    for seconds in args.lengths:
+        n_clips = max(1, int(round(seconds / args.clip_seconds)))
+        path = make_signing_video(os.path.join(workdir, f"{seconds:g}s.mp4"),
+                                  [(args.clip_seconds, seed) for seed in range(n_clips)],
+                                  args.fps, args.width, args.height)
+        totals = {"backbone": 0.0, "head": 0.0}
+        start = time.perf_counter()
+        result = video_posteriors(path, timed(functools.partial(server.embed_frames, models), totals, "backbone"),
+                                  timed(functools.partial(server.classify_windows, models), totals, "head"),
+                                  models.max_frames, models.video_temperature, args.window_seconds, args.hop)
+        wall = time.perf_counter() - start
+        entry = {
+            "video_seconds": seconds,
+            "wall_ms": round(wall * 1000, 1),
+            # Decode and backbone interleave in one pass; decode is the remainder
+            "decode_ms": round((wall - totals["head"] - totals["backbone"]) * 1000, 1),
+            "backbone_ms": round(totals["backbone"] * 1000, 1),
+            "head_ms": round(totals["head"] * 1000, 1),
+            "compute_per_video_second_ms": round(wall / seconds * 1000, 1),
+            "frames_embedded": int(len(result["times"])),
+            "windows": int(result["windows"]),
+            "naive_backbone_frames": int(result["windows"]) * models.max_frames,
+        }
+        if seconds <= args.naive_max_seconds:
+            naive = naive_seconds(models, path, args.window_seconds, args.hop)
+            entry["naive_model_ms"] = round(naive * 1000, 1)
+            entry["shared_speedup"] = round(naive / (totals["backbone"] + totals["head"]), 2)
+        results[f"{seconds:g}s"] = entry
+        print(f"{seconds:>6g}s video   wall {entry['wall_ms']:>9.1f} ms   "
+              f"({entry['compute_per_video_second_ms']:>6.1f} ms per video s)   decode {entry['decode_ms']:>8.1f}   backbone {entry['backbone_ms']:>8.1f}   "
+              f"head {entry['head_ms']:>7.1f}   frames {entry['frames_embedded']:>4}   windows {entry['windows']:>4}"
+              + (f"   naive model {entry['naive_model_ms']:>8.1f} ms (x{entry['shared_speedup']})"
+                 if "naive_model_ms" in entry else ""))
+
+    if args.json:
+        write_json(args.json, "segmentation", {"window_seconds": args.window_seconds, "hop": args.hop,
+                                               "clip_seconds": args.clip_seconds, "lengths": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmarks for each stage of the sign server (main.py).
+
+Stages: JPEG decode, preprocess_frame, read_clip (per video length / GOP),
+MobileNetV2 backbone per frame, LSTM head, image model, and the full
+/detect-sign and /detect-video requests through the ASGI app.
+
+    python benchmarks/bench_sign_stages.py --json results/sign.json
+    python benchmarks/bench_sign_stages.py --model-dir /path/with/trained/models
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import cv2  # noqa: E402
+
+from benchmarks.common import measure, write_json  # noqa: E402
+from benchmarks.fixtures import make_jpeg, make_video  # noqa: E402
+from benchmarks.servers import load_sign_app  # noqa: E402
+from preprocessing import allocate_clip, preprocess_frame, read_clip, pad_features  # noqa: E402
+
+VIDEO_CASES = [
+    # (seconds, fps, width, height, gop)
+    (2, 30, 640, 360, 30),
+    (5, 30, 640, 360, 30),
+    (5, 30, 1280, 720, 30),
+    (5, 30, 1280, 720, 250),
+    (10, 30, 1280, 720, 30),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", help="directory with trained .keras models and label files")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    server = load_sign_app(args.model_dir)
+    models = server.model_registry.active
+    workdir = tempfile.mkdtemp(prefix="cb-bench-")
+    results = {}
+
+    jpeg = make_jpeg(1280, 720)
+    buffer = np.frombuffer(jpeg, dtype=np.uint8)
+    frame = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    results["jpeg_decode_720p"] = measure(lambda: cv2.imdecode(buffer, cv2.IMREAD_COLOR), args.repeats)
+    single = allocate_clip(1)
+    results["preprocess_frame_720p"] = measure(lambda: preprocess_frame(frame, single[0]), args.repeats * 5)
+
+    clip = np.repeat(single, models.max_frames, axis=0)
+    results["backbone_1_frame"] = measure(lambda: models.base_model.predict(single, verbose=0), args.repeats)
+    results[f"backbone_{models.max_frames}_frames"] = measure(lambda: models.base_model.predict(clip, verbose=0),
+                                                             args.repeats)
+    results["image_model_1_image"] = measure(lambda: models.image_model.predict(single, verbose=0), args.repeats)
+
+    features = models.base_model.predict(single, verbose=0)
+    head_input = np.expand_dims(pad_features(features, models.max_frames), axis=0)
+    results["lstm_head"] = measure(lambda: models.video_model.predict(head_input, verbose=0), args.repeats)
+
+    for seconds, fps, width, height, gop in VIDEO_CASES:
+        name = f"{seconds}s_{width}x{height}_gop{gop}"
+        path = make_video(os.path.join(workdir, f"{name}.mp4"), seconds, fps, width, height, gop)
+        results[f"read_clip_{name}"] = measure(lambda: read_clip(path, models.max_frames), max(3, args.repeats // 2), 1)
+        results[f"read_clip_{name}"]["file_bytes"] = os.path.getsize(path)
+
+    from fastapi.testclient import TestClient
+    client = TestClient(server.app)
+    results["request_detect_sign"] = measure(
+        lambda: client.post("/detect-sign", files={"file": ("sign.jpg", jpeg, "image/jpeg")}), args.repeats)
+    with open(os.path.join(workdir, f"5s_1280x720_gop30.mp4"), "rb") as f:
+        video = f.read()
+    results["request_detect_video_5s_720p"] = measure(
+        lambda: client.post("/detect-video", files={"file": ("sign.mp4", video, "video/mp4")}),
+        max(3, args.repeats // 2), 1)
+
+    for name, stats in results.items():
+        print(f"{name:<40} p50 {stats['p50_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms")
+
+    if args.json:
+        write_json(args.json, "sign_stages", results)
+
+
+if __name__ == "__main__":
+    main()
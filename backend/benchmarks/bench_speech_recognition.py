@@ -0,0 +1,122 @@
+"""
+Speech recognition benchmark: real-time factor and throughput per engine.
+
+Runs every WAV in --fixtures through each available engine, first one clip at
+a time (latency / RTF) and then all clips concurrently on the
+RecognitionService worker pool (throughput in audio seconds per wall second).
+
+Without --fixtures, synthetic speech-like clips (1, 3, 5 and 10 s of harmonics,
+benchmarks.fixtures.make_wav) are generated in a temp directory. They contain no words, so only timing is measured; accuracy
+needs real recordings passed with --fixtures.
+
+    python benchmarks/bench_speech_recognition.py --engines vosk,whisper --language en
+    python benchmarks/bench_speech_recognition.py --fixtures ~/recordings/en
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr  # noqa: E402
+from speech_engines import RecognitionService, audio_duration  # noqa: E402
+from benchmarks.fixtures import make_wav  # noqa: E402
+
+
+def ensure_fixtures(fixture_dir=None):
+    """WAVs in fixture_dir, or synthetic clips in a temp directory when none is given"""
+    if fixture_dir:
+        paths = sorted(glob.glob(os.path.join(fixture_dir, "*.wav")))
+        if not paths:
+            raise SystemExit(f"No .wav files in {fixture_dir}")
+        return paths
+    fixture_dir = tempfile.mkdtemp(prefix="cb-speech-")
+    for seconds in (1, 3, 5, 10):
+        with open(os.path.join(fixture_dir, f"synth_{seconds}s.wav"), "wb") as f:
+            f.write(make_wav(seconds))
+    return sorted(glob.glob(os.path.join(fixture_dir, "*.wav")))
+
+
+def load_clips(paths):
+    clips = []
+    for path in paths:
+        with sr.AudioFile(path) as source:
+            clips.append((os.path.basename(path), sr.Recognizer().record(source)))
+    return clips
+
+
+def bench_engine(service, engine_name, clips, language, repeats):
+    per_clip = []
+    for name, audio in clips:
+        timings = []
+        for _ in range(repeats):
+            result = service.recognize(audio, language, engine_name)
+            timings.append(result["processing_time"])
+        best = min(timings)
+        duration = audio_duration(audio)
+        per_clip.append({
+            "clip": name,
+            "audio_seconds": round(duration, 3),
+            "best_seconds": round(best, 4),
+            "rtf": round(best / duration, 4) if duration else None,
+            "text": result["text"]
+        })
+
+    # Concurrent pass over the worker pool
+    total_audio = sum(audio_duration(audio) for _, audio in clips) * repeats
+    start = time.perf_counter()
+    futures = [service.submit(audio, language, engine_name) for _, audio in clips for _ in range(repeats)]
+    for future in futures:
+        future.result()
+    wall = time.perf_counter() - start
+
+    return {
+        "engine": engine_name,
+        "language": language,
+        "workers": service.executor._max_workers,
+        "clips": per_clip,
+        "mean_rtf": round(sum(c["rtf"] for c in per_clip) / len(per_clip), 4),
+        "throughput_audio_sec_per_sec": round(total_audio / wall, 2) if wall else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default="vosk,whisper", help="comma separated engine names")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--fixtures", help="directory of speech WAVs (default: synthetic clips, timing only)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    engine_names = [name.strip() for name in args.engines.split(",") if name.strip()]
+    service = RecognitionService(engine_names, max_workers=args.workers)
+    service.preload([args.language])
+    clips = load_clips(ensure_fixtures(args.fixtures))
+
+    results = []
+    for engine_name in engine_names:
+        if service.select_engine(args.language, engine_name) is None:
+            print(f"skip {engine_name}: not installed or no model for '{args.language}'")
+            continue
+        result = bench_engine(service, engine_name, clips, args.language, args.repeats)
+        results.append(result)
+        print(f"{engine_name:>8}  mean RTF {result['mean_rtf']:.3f}  "
+              f"throughput {result['throughput_audio_sec_per_sec']}x real time "
+              f"({result['workers']} workers)")
+        for clip in result["clips"]:
+            print(f"          {clip['clip']:<20} {clip['audio_seconds']:>6.2f}s  RTF {clip['rtf']:.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
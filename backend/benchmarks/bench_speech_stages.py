@@ -0,0 +1,75 @@
+"""
+Micro-benchmarks for each stage of the speech server (app.py).
+
+Upstream translation and speech recognition are replaced by local fakes with a
+configurable latency, so the numbers isolate the server's own overhead.
+
+    python benchmarks/bench_speech_stages.py --translate-latency-ms 80 --json results/speech.json
+"""
+
+import os
+import io
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import measure, write_json  # noqa: E402
+from benchmarks.fixtures import make_wav  # noqa: E402
+from benchmarks.servers import load_speech_app  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recognize-latency-ms", type=float, default=50)
+    parser.add_argument("--translate-latency-ms", type=float, default=80)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    server = load_speech_app(args.recognize_latency_ms / 1000, args.translate_latency_ms / 1000)
+    from audio_pipeline import ingest_audio, split_on_silence
+
+    results = {}
+    wavs = {seconds: make_wav(seconds, 44100, 2) for seconds in (2, 5, 10)}
+    for seconds, data in wavs.items():
+        results[f"ingest_audio_{seconds}s_44k_stereo"] = measure(lambda: ingest_audio(data), args.repeats)
+    audio, _ = ingest_audio(wavs[10])
+    results["split_on_silence_10s"] = measure(lambda: split_on_silence(audio), args.repeats)
+
+    detector = server.transcriber.language_detector
+    texts = ["hello how are you", "मेरा नाम राहुल है।", "Bonjour tout le monde", "நீங்கள் எனக்கு உதவ முடியுமா?"]
+    server.language_identifier.cache.maxsize = 0  # measure the model, not the memo cache
+    results["detect_language_uncached"] = measure(lambda: [detector.detect_language_combined(t) for t in texts],
+                                                  args.repeats)
+    results["detect_language_batch_uncached"] = measure(lambda: detector.detect_language_batch(texts), args.repeats)
+
+    engine = server.translation_engine
+    # Not in the phrase tables, so this measures the upstream path (bench_phrase_table.py covers the local tier)
+    sentence = "the meeting starts at noon"
+    results["translate_text_enhanced"] = measure(lambda: engine.translate_text_enhanced(sentence, "hi"),
+                                                 max(3, args.repeats // 2))
+    results["batch_translate_10"] = measure(lambda: engine.batch_translate([sentence] * 10, "hi"), 3, 1)
+
+    client = server.app.test_client()
+    wav = wavs[5]
+    results["request_transcribe_5s"] = measure(
+        lambda: client.post("/transcribe", data={"audio": (io.BytesIO(wav), "speech.wav")}),
+        max(3, args.repeats // 2))
+    results["request_speech_translate_10s"] = measure(
+        lambda: client.post("/speech-translate", data={"audio": (io.BytesIO(wavs[10]), "speech.wav"),
+                                                       "target_language": "hi"}).get_data(),
+        max(3, args.repeats // 4), 1)
+
+    for name, stats in results.items():
+        print(f"{name:<40} p50 {stats['p50_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms")
+
+    if args.json:
+        write_json(args.json, "speech_stages", {
+            "upstream_latency_ms": {"recognize": args.recognize_latency_ms, "translate": args.translate_latency_ms},
+            "stages": results
+        })
+
+
+if __name__ == "__main__":
+    main()
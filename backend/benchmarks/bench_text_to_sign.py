@@ -0,0 +1,103 @@
+"""
+Text-to-sign benchmark: index build and incremental refresh over a synthetic
+sign_videos/ tree, and /text-to-sign + /sign-clips request latency through
+app.py's Flask test client.
+
+The tree has --words dictionary entries (placeholder files; renditions are off)
+plus A-Z letter clips, and one real mp4 to time Range requests against.
+
+    python benchmarks/bench_text_to_sign.py --words 5000 --json results/text_to_sign.json
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import measure, write_json  # noqa: E402
+from benchmarks.fixtures import make_video  # noqa: E402
+
+SENTENCES = [
+    "Hello, how are you?",
+    "Good morning, my name is Priya.",
+    "I am going to the hospital tomorrow because my mother is sick.",
+    "Thank you for helping the children with their homework.",
+    "Where is the nearest bus stop?",
+    "We ate dinner with our friends and watched a movie.",
+]
+VOCABULARY = ["hello", "how", "you", "good morning", "my", "name", "i", "go", "hospital", "tomorrow", "because",
+              "mother", "sick", "thank you", "for", "help", "child", "with", "their", "homework", "where",
+              "near", "bus stop", "we", "eat", "dinner", "our", "friend", "and", "watch", "movie"]
+
+
+def build_tree(root, n_words):
+    for folder in ("All Dictionary Videos", "Letters"):
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+    # Letters only: trailing digits would be read as "(2)"-style variant suffixes
+    fillers = ["filler " + "".join(chr(97 + (i // 26 ** k) % 26) for k in range(3))
+               for i in range(max(0, n_words - len(VOCABULARY)))]
+    for word in VOCABULARY + fillers:
+        with open(os.path.join(root, "All Dictionary Videos", f"{word.title().replace(' ', '_')}.mp4"), "wb") as f:
+            f.write(b"\0" * 64)
+    for ch in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
+        with open(os.path.join(root, "Letters", f"{ch}.mp4"), "wb") as f:
+            f.write(b"\0" * 64)
+    # A real clip replaces "Hello" for the Range request timing
+    make_video(os.path.join(root, "All Dictionary Videos", "Hello.mp4"), 2, 30, 320, 240)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=5000, help="dictionary entries in the synthetic tree")
+    parser.add_argument("--changed", type=int, default=20, help="files touched before the incremental refresh")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="cb-signs-")
+    build_tree(root, args.words)
+    os.environ.update(SIGN_VIDEOS_DIR=root, SIGN_INDEX_POLL_SECONDS="0", SIGN_RENDITION_HEIGHT="0")
+
+    from sign_dictionary import SignDictionary
+    dictionary = SignDictionary(root, rendition_height=0)
+    start = time.perf_counter()
+    dictionary.refresh()
+    results = {"words": len(dictionary.index.words), "full_index_ms": round((time.perf_counter() - start) * 1000, 2)}
+    results["unchanged_refresh"] = measure(dictionary.refresh, 5, 1)
+    folder = os.path.join(root, "All Dictionary Videos")
+    for name in sorted(os.listdir(folder))[-args.changed:]:
+        os.utime(os.path.join(folder, name))
+    start = time.perf_counter()
+    dictionary.refresh()
+    results[f"incremental_refresh_{args.changed}_files_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    print(f"index: {results['words']} words in {results['full_index_ms']:.1f} ms; unchanged refresh p50 "
+          f"{results['unchanged_refresh']['p50_ms']:.1f} ms; {args.changed} changed files "
+          f"{results[f'incremental_refresh_{args.changed}_files_ms']:.1f} ms")
+
+    results["lookup"] = measure(lambda: [dictionary.lookup(s) for s in SENTENCES], args.repeats, 5)
+    results["lookup"] = {k: round(v / len(SENTENCES), 4) if k.endswith("_ms") else v
+                         for k, v in results["lookup"].items()}
+    print(f"lookup per sentence: p50 {results['lookup']['p50_ms']:.3f} ms  p99 {results['lookup']['p99_ms']:.3f} ms")
+
+    from benchmarks.servers import load_speech_app
+    client = load_speech_app().app.test_client()
+    for i, sentence in enumerate(SENTENCES):
+        results[f"request_sentence_{i}"] = measure(lambda: client.post("/text-to-sign", json={"text": sentence}),
+                                                   args.repeats, 5)
+    playlist = client.post("/text-to-sign", json={"text": "hello"}).get_json()["playlist"]
+    url = playlist[0]["url"]
+    results["clip_full"] = measure(lambda: client.get(url).data, args.repeats, 5)
+    results["clip_range_64k"] = measure(lambda: client.get(url, headers={"Range": "bytes=0-65535"}).data,
+                                        args.repeats, 5)
+    for key in [k for k in results if k.startswith("request_") or k.startswith("clip_")]:
+        print(f"{key:<20} p50 {results[key]['p50_ms']:>7.3f} ms   p99 {results[key]['p99_ms']:>7.3f} ms")
+
+    if args.json:
+        write_json(args.json, "text_to_sign", results)
+
+
+if __name__ == "__main__":
+    main()
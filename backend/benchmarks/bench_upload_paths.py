@@ -0,0 +1,113 @@
+"""
+Upload path benchmark for video classification: full mp4 to /detect-video
+against client-side sampled frames to /detect-frames (a bundle of 128x128
+JPEGs, or a raw uint8 tensor blob).
+
+For each clip reports bytes on the wire, server CPU time spent turning the
+upload into a (T, 128, 128, 3) clip, and end-to-end request latency.
+
+    python benchmarks/bench_upload_paths.py --json results/upload_paths.json
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import cv2  # noqa: E402
+
+from benchmarks.common import measure, write_json  # noqa: E402
+from benchmarks.fixtures import make_video  # noqa: E402
+from benchmarks.servers import load_sign_app  # noqa: E402
+from preprocessing import (IMG_SIZE, TENSOR_CONTENT_TYPE, read_clip, decode_frame_bundle,  # noqa: E402
+                           decode_tensor_blob)
+
+CLIPS = [
+    # (seconds, width, height)
+    (3, 640, 360),
+    (5, 1280, 720),
+    (10, 1920, 1080),
+]
+
+
+def cpu_ms(fn, repeats):
+    """Median process CPU time of fn() in milliseconds"""
+    fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.process_time()
+        fn()
+        samples.append(time.process_time() - start)
+    return round(float(np.median(samples)) * 1000, 3)
+
+
+def client_frames(path, max_frames, quality):
+    """What a client sends on the fast path: sampled frames, downscaled, as JPEGs and as a tensor"""
+    clip = read_clip(path, max_frames)  # RGB uint8
+    jpegs = [cv2.imencode(".jpg", cv2.cvtColor(f, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+             for f in clip]
+    return jpegs, clip.tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", help="directory with trained .keras models and label files")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--jpeg-quality", type=int, default=90)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    server = load_sign_app(args.model_dir)
+    from fastapi.testclient import TestClient
+    client = TestClient(server.app)
+    max_frames = server.model_registry.active.max_frames
+    workdir = tempfile.mkdtemp(prefix="cb-upload-")
+
+    results = {}
+    for seconds, width, height in CLIPS:
+        name = f"{seconds}s_{width}x{height}"
+        path = make_video(os.path.join(workdir, f"{name}.mp4"), seconds, 30, width, height, gop=30)
+        with open(path, "rb") as f:
+            mp4 = f.read()
+        jpegs, tensor = client_frames(path, max_frames, args.jpeg_quality)
+        # Distinct bytes per request so the prediction cache never answers
+        server.prediction_cache.max_entries = 0
+
+        paths = {
+            "mp4": {
+                "bytes": len(mp4),
+                "server_decode_cpu_ms": cpu_ms(lambda: read_clip(path, max_frames), args.repeats),
+                "request": lambda: client.post("/detect-video", files={"file": ("clip.mp4", mp4, "video/mp4")}),
+            },
+            "jpeg_bundle": {
+                "bytes": sum(len(j) for j in jpegs),
+                "server_decode_cpu_ms": cpu_ms(lambda: decode_frame_bundle(jpegs, max_frames), args.repeats),
+                "request": lambda: client.post("/detect-frames", files=[
+                    ("frames", (f"{i}.jpg", j, "image/jpeg")) for i, j in enumerate(jpegs)]),
+            },
+            "tensor": {
+                "bytes": len(tensor),
+                "server_decode_cpu_ms": cpu_ms(lambda: decode_tensor_blob(tensor, max_frames), args.repeats),
+                "request": lambda: client.post("/detect-frames", files={
+                    "tensor": ("clip.bin", tensor, TENSOR_CONTENT_TYPE)}),
+            },
+        }
+        for path_name, entry in paths.items():
+            request = entry.pop("request")
+            assert request().status_code == 200
+            entry["request"] = measure(request, args.repeats, 1)
+            results[f"{name}.{path_name}"] = entry
+            print(f"{name:<16} {path_name:<12} {entry['bytes'] / 1024:>9.1f} KiB   "
+                  f"decode cpu {entry['server_decode_cpu_ms']:>9.2f} ms   "
+                  f"request p50 {entry['request']['p50_ms']:>9.2f} ms")
+
+    if args.json:
+        write_json(args.json, "upload_paths", {"max_frames": max_frames, "img_size": IMG_SIZE, "clips": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Shared helpers for the benchmark scripts: timing, environment capture and JSON output.
+
+The timing helpers live in profiling.py so the training tools can use them
+without importing the benchmarks package; they are re-exported here.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+from typing import Dict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from profiling import git_commit, measure, percentile, summarize_ms  # noqa: E402,F401
+
+
+def environment() -> Dict[str, any]:
+    info = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    for module in ("numpy", "cv2", "tensorflow"):
+        if module in sys.modules:
+            info[f"{module}_version"] = getattr(sys.modules[module], "__version__", "unknown")
+    return info
+
+
+def write_json(path: str, name: str, results) -> None:
+    """Write one benchmark's results with the environment they were measured in"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"benchmark": name, "environment": environment(), "results": results}, f, indent=2)
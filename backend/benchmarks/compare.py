@@ -0,0 +1,81 @@
+"""
+Compare two merged result files written by run_all.py.
+
+Every numeric leaf whose key is a latency (…_ms, …_us, rtf) or a throughput
+(…_rps, …per_sec) is diffed; latency increases and throughput drops beyond
+the threshold are flagged as regressions and make the exit status non-zero.
+
+    python benchmarks/compare.py results/abc123.json results/def456.json --threshold 10
+"""
+
+import sys
+import json
+import argparse
+
+LOWER_IS_BETTER = ("_ms", "_us", "_mb", "_seconds", "rtf", "real_time_factor")
+HIGHER_IS_BETTER = ("_rps", "per_sec", "throughput")
+
+
+def flatten(data, prefix=""):
+    """Yield (dotted.path, value) for every numeric leaf"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            yield from flatten(value, f"{prefix}[{i}]")
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix, data
+
+
+def direction(path):
+    leaf = path.rsplit(".", 1)[-1]
+    if leaf.endswith(LOWER_IS_BETTER):
+        return -1
+    if leaf.endswith(HIGHER_IS_BETTER):
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    parser.add_argument("--all", action="store_true", help="print unchanged metrics too")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    old = dict(flatten(baseline.get("benchmarks", baseline)))
+    new = dict(flatten(candidate.get("benchmarks", candidate)))
+    print(f"baseline  {baseline.get('environment', {}).get('commit', args.baseline)}")
+    print(f"candidate {candidate.get('environment', {}).get('commit', args.candidate)}\n")
+
+    regressions = 0
+    for path in sorted(old.keys() & new.keys()):
+        sign = direction(path)
+        if sign == 0 or old[path] == 0:
+            continue
+        change = (new[path] - old[path]) / abs(old[path]) * 100
+        improved = change * sign > 0
+        flag = ""
+        if abs(change) >= args.threshold:
+            flag = "improved" if improved else "REGRESSED"
+            regressions += not improved
+        elif not args.all:
+            continue
+        print(f"{path:<70} {old[path]:>12.3f} -> {new[path]:>12.3f}  {change:+7.1f}%  {flag}")
+
+    missing = sorted(old.keys() - new.keys())
+    if missing:
+        print(f"\n{len(missing)} metrics missing from candidate (e.g. {missing[0]})")
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0f}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Synthetic fixtures for benchmarks: JPEGs, mp4s with a given length and GOP, WAVs,
+and stand-in sign model artifacts with the same architecture as the trained ones.
+
+Everything is generated deterministically from a seed so runs on different
+commits see identical inputs.
+"""
+
+import io
+import os
+import json
+import wave
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+# ------------------------
+# Images and video
+# ------------------------
+def synth_frame(width: int, height: int, seed: int = 0, t: float = 0.0) -> np.ndarray:
+    """BGR uint8 frame: a moving blob over a gradient, so codecs have real work to do"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    cx = width * (0.3 + 0.4 * np.sin(t + seed))
+    cy = height * (0.5 + 0.3 * np.cos(t))
+    blob = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * (0.12 * min(width, height)) ** 2))
+    frame = np.stack([x / width * 180, y / height * 180, blob * 255], axis=-1)
+    frame += rng.normal(0, 6, frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def make_jpeg(width: int = 1280, height: int = 720, seed: int = 0, quality: int = 90) -> bytes:
+    import cv2
+    ok, encoded = cv2.imencode(".jpg", synth_frame(width, height, seed), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return encoded.tobytes()
+
+
+def write_video(path: str, frames: Iterable[np.ndarray], fps: int, width: int, height: int, gop: int = 30) -> str:
+    """Encode BGR frames as an H.264 mp4 (PyAV, honours gop) or an mp4v fallback via OpenCV"""
+    if av is not None:
+        with av.open(path, "w") as container:
+            stream = container.add_stream("libx264", rate=fps)
+            stream.width, stream.height = width, height
+            stream.pix_fmt = "yuv420p"
+            stream.codec_context.gop_size = gop
+            stream.options = {"preset": "veryfast"}
+            for bgr in frames:
+                for packet in stream.encode(av.VideoFrame.from_ndarray(bgr, format="bgr24")):
+                    container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        return path
+
+    import cv2
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for bgr in frames:
+        writer.write(bgr)
+    writer.release()
+    return path
+
+
+def make_video(path: str, seconds: float = 3.0, fps: int = 30, width: int = 640, height: int = 360,
+               gop: int = 30, seed: int = 0) -> str:
+    """Write `seconds` of a moving blob (synth_frame) as an mp4"""
+    n_frames = max(1, int(seconds * fps))
+    return write_video(path, (synth_frame(width, height, seed, i / fps) for i in range(n_frames)),
+                       fps, width, height, gop)
+
+
+def make_signing_video(path: str, clips: List[Tuple[float, int]], fps: int = 30, width: int = 640,
+                       height: int = 360, gop: int = 30) -> str:
+    """Continuous "signing": (seconds, seed) clips back to back, each seed a different motion"""
+    frames = (synth_frame(width, height, seed, i / fps)
+              for seconds, seed in clips for i in range(max(1, int(seconds * fps))))
+    return write_video(path, frames, fps, width, height, gop)
+
+
+# ------------------------
+# Audio
+# ------------------------
+def synth_speechlike(seconds: float, rate: int = 16000, channels: int = 1) -> np.ndarray:
+    """Amplitude-modulated harmonics with half a second of silence at each end"""
+    t = np.arange(int(seconds * rate)) / rate
+    signal = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((140, 280, 560, 1120)))
+    signal *= 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    signal[(t < 0.5) | (t > seconds - 0.5)] = 0
+    signal = (0.3 * signal / max(np.abs(signal).max(), 1e-9)).astype(np.float32)
+    return np.repeat(signal[:, None], channels, axis=1)
+
+
+def encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def make_wav(seconds: float = 3.0, rate: int = 16000, channels: int = 1) -> bytes:
+    return encode_wav(synth_speechlike(seconds, rate, channels), rate)
+
+
+def encode_m4a(samples: np.ndarray, rate: int) -> bytes:
+    buf = io.BytesIO()
+    with av.open(buf, "w", format="mp4") as container:
+        stream = container.add_stream("aac", rate=rate)
+        stream.layout = "stereo" if samples.shape[1] == 2 else "mono"
+        frame = av.AudioFrame.from_ndarray(samples.T.copy(), format="fltp", layout=stream.layout.name)
+        frame.sample_rate = rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buf.getvalue()
+
+
+# ------------------------
+# Stand-in sign models
+# ------------------------
+def make_sign_models(directory: str, image_classes: List[str] = None, video_classes: List[str] = None,
+                     img_size: int = 128, max_frames: int = 10) -> str:
+    """Save untrained models with the training scripts' architectures plus label files.
+
+    Latency depends on the architecture, not the weights, so these let the sign
+    server be benchmarked on machines without the trained artifacts.
+    """
+    import tensorflow as tf
+    from tensorflow.keras import layers, models  # type: ignore
+
+    image_classes = image_classes or ["G", "O", "S", "U", "Y"]
+    video_classes = video_classes or ["Abort_Cancel", "A_penny_for_your_thoughts"]
+    os.makedirs(directory, exist_ok=True)
+
+    backbone = tf.keras.applications.MobileNetV2(input_shape=(img_size, img_size, 3), include_top=False,
+                                                 pooling="avg", weights=None)
+    image_model = models.Sequential([
+        layers.Input(shape=(img_size, img_size, 3)),
+        backbone,
+        layers.Dense(128, activation="relu"),
+        layers.Dropout(0.3),
+        layers.Dense(len(image_classes), activation="softmax")
+    ])
+    image_model.save(os.path.join(directory, "sign_image_model.keras"))
+
+    feature_dim = backbone.output_shape[-1]
+    video_model = models.Sequential([
+        layers.Input(shape=(max_frames, feature_dim)),
+        layers.LSTM(128, return_sequences=True, dropout=0.3, recurrent_dropout=0.2),
+        layers.LSTM(64, dropout=0.3, recurrent_dropout=0.2),
+        layers.Dense(64, activation="relu"),
+        layers.Dropout(0.3),
+        layers.Dense(len(video_classes), activation="softmax")
+    ])
+    video_model.save(os.path.join(directory, "sign_model_weights.keras"))
+
+    with open(os.path.join(directory, "labels_image.json"), "w") as f:
+        json.dump(image_classes, f)
+    with open(os.path.join(directory, "labels.json"), "w") as f:
+        json.dump(video_classes, f)
+    return directory
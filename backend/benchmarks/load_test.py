@@ -0,0 +1,127 @@
+"""
+In-process load test for the speech (Flask) and sign (FastAPI) servers.
+
+Each worker thread drives its own test client in a closed loop for the
+configured number of requests. Upstream translate/recognize services are local
+fakes with configurable latency (see servers.py).
+
+    python benchmarks/load_test.py --target speech --concurrency 8 --requests 200
+    python benchmarks/load_test.py --target sign --concurrency 4 --requests 40
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize_ms, write_json  # noqa: E402
+from benchmarks.fixtures import make_jpeg, make_video, make_wav  # noqa: E402
+from benchmarks.servers import load_sign_app, load_speech_app  # noqa: E402
+
+
+def speech_scenarios(server):
+    wav = make_wav(4, 44100, 1)
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = server.app.test_client()
+        return local.client
+
+    return {
+        "translate": lambda: client().post("/translate", json={"text": "hello how are you", "target_language": "hi"}),
+        "detect_language": lambda: client().post("/detect-language", json={"text": "hello how are you"}),
+        "transcribe": lambda: client().post("/transcribe", data={"audio": (io.BytesIO(wav), "speech.wav")}),
+    }
+
+
+def sign_scenarios(server):
+    from fastapi.testclient import TestClient
+    import tempfile
+
+    jpeg = make_jpeg(1280, 720)
+    path = make_video(os.path.join(tempfile.mkdtemp(prefix="cb-load-"), "clip.mp4"), 3, 30, 640, 360, 30)
+    with open(path, "rb") as f:
+        video = f.read()
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = TestClient(server.app)
+        return local.client
+
+    return {
+        "detect_sign": lambda: client().post("/detect-sign", files={"file": ("sign.jpg", jpeg, "image/jpeg")}),
+        "detect_video": lambda: client().post("/detect-video", files={"file": ("sign.mp4", video, "video/mp4")}),
+    }
+
+
+def run_scenario(call, concurrency, total):
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        response = call()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    call()  # warm-up outside the measurement
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+
+    result = summarize_ms(latencies)
+    result.update({
+        "concurrency": concurrency,
+        "throughput_rps": round(total / wall, 2),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())}
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["speech", "sign", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--recognize-latency-ms", type=float, default=50)
+    parser.add_argument("--translate-latency-ms", type=float, default=80)
+    parser.add_argument("--model-dir", help="sign model artifacts (stand-ins generated if omitted)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    scenarios = {}
+    if args.target in ("speech", "both"):
+        server = load_speech_app(args.recognize_latency_ms / 1000, args.translate_latency_ms / 1000)
+        scenarios.update({f"speech.{k}": v for k, v in speech_scenarios(server).items()})
+    if args.target in ("sign", "both"):
+        server = load_sign_app(args.model_dir)
+        # Model inference is far slower than the speech paths; keep runs short
+        scenarios.update({f"sign.{k}": v for k, v in sign_scenarios(server).items()})
+
+    results = {}
+    for name, call in scenarios.items():
+        total = args.requests if name.startswith("speech.") else max(args.concurrency, args.requests // 5)
+        results[name] = run_scenario(call, args.concurrency, total)
+        r = results[name]
+        print(f"{name:<24} {r['throughput_rps']:>8.2f} req/s   p50 {r['p50_ms']:>9.2f} ms   "
+              f"p95 {r['p95_ms']:>9.2f} ms   statuses {r['statuses']}")
+
+    if args.json:
+        write_json(args.json, "load_test", {
+            "upstream_latency_ms": {"recognize": args.recognize_latency_ms, "translate": args.translate_latency_ms},
+            "scenarios": results
+        })
+
+
+if __name__ == "__main__":
+    main()
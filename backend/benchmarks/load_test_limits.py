@@ -0,0 +1,280 @@
+"""
+Upload limit and admission control load test: process memory under oversized
+and burst traffic against the sign (FastAPI) and speech (Flask) servers.
+
+Request bodies are generated lazily, chunk by chunk, as the server reads
+them, so the client holds no upload in memory and the RSS the sampler sees is
+the server's. Scenarios per server:
+
+- oversized_declared: uploads with a Content-Length far over the limit
+  (rejected by header; the body should never be read)
+- oversized_chunked: the same without Content-Length (rejected while copying)
+- too_long: a small file whose header says it is over the duration limit
+  (rejected before decoding)
+- burst: --burst valid requests at once; admission control admits
+  max_concurrent + max_queue of them and turns the rest away with 429
+
+Each reports status counts, latency, bytes the server pulled from the
+request bodies and peak RSS growth over the idle baseline.
+
+    python benchmarks/load_test_limits.py --oversized-mb 512 --burst 48 --json results/limits.json
+"""
+
+import io
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize_ms, write_json  # noqa: E402
+from benchmarks.fixtures import make_video, make_wav  # noqa: E402
+
+BOUNDARY = "cb-limits-boundary"
+CHUNK = 1024 * 1024
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class RssSampler:
+    """Track the peak resident set size on a background thread"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = rss_bytes()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            self.peak = max(self.peak, rss_bytes())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        return max(self.peak, rss_bytes())
+
+
+class MultipartBody(io.RawIOBase):
+    """One-file multipart/form-data body produced on demand: payload bytes, then zeros up to `size`"""
+
+    def __init__(self, field, filename, content_type, payload=b"", size=None):
+        self.head = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{field}\"; "
+                     f"filename=\"{filename}\"\r\nContent-Type: {content_type}\r\n\r\n").encode()
+        self.tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+        self.payload = payload
+        self.size = max(size or 0, len(payload))
+        self.length = len(self.head) + self.size + len(self.tail)
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.length}[whence]
+        self.position = base + offset
+        return self.position
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.length - self.position)
+        out = bytearray()
+        while len(out) < n:
+            pos, want = self.position, n - len(out)
+            if pos < len(self.head):
+                piece = self.head[pos:pos + want]
+            elif pos < len(self.head) + self.size:
+                offset = pos - len(self.head)
+                if offset < len(self.payload):
+                    piece = self.payload[offset:offset + want]
+                else:
+                    piece = bytes(min(want, self.size - offset))
+            else:
+                offset = pos - len(self.head) - self.size
+                piece = self.tail[offset:offset + want]
+            out += piece
+            self.position += len(piece)
+        buffer[:n] = out
+        return n
+
+
+def run_scenario(fire, total, concurrency):
+    """Fire `total` requests `concurrency` at a time; statuses, latency, bytes read and RSS growth"""
+    latencies, statuses, read = [], {}, [0]
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        status, consumed = fire()
+        with lock:
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            read[0] += consumed
+
+    baseline = rss_bytes()
+    sampler = RssSampler()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    peak = sampler.stop()
+    result = summarize_ms(latencies)
+    result.update({
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "body_read_mb": round(read[0] / 2 ** 20, 1),
+        "rss_baseline_mb": round(baseline / 2 ** 20, 1),
+        "rss_growth_mb": round((peak - baseline) / 2 ** 20, 1),
+    })
+    return result
+
+
+# ------------------------
+# Sign server: raw ASGI calls, body chunks handed out as the app asks for them
+# ------------------------
+def asgi_post(app, path, body, declare_length=True):
+    async def call():
+        headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+        if declare_length:
+            headers.append((b"content-length", str(body.length).encode()))
+        else:
+            headers.append((b"transfer-encoding", b"chunked"))
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+                 "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+                 "root_path": "", "headers": headers, "client": ("127.0.0.1", 50000),
+                 "server": ("testserver", 80)}
+        done = asyncio.Event()
+        status = []
+
+        async def receive():
+            if body.position < body.length:
+                chunk = body.read(CHUNK)
+                return {"type": "http.request", "body": chunk, "more_body": body.position < body.length}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                done.set()
+
+        await app(scope, receive, send)
+        done.set()
+        return status[0], body.position
+    return asyncio.run(call())
+
+
+def sign_scenarios(args):
+    from benchmarks.servers import load_sign_app
+    import uploads
+
+    server = load_sign_app(args.model_dir)
+    workdir = tempfile.mkdtemp(prefix="cb-limits-")
+    with open(make_video(os.path.join(workdir, "clip.mp4"), 3, 30, 640, 360), "rb") as f:
+        clip = f.read()
+    # Tiny frames keep the file small; only the header's duration matters
+    too_long = os.path.join(workdir, "long.mp4")
+    with open(make_video(too_long, uploads.MAX_VIDEO_SECONDS + 10, 10, 64, 64, 250), "rb") as f:
+        long_clip = f.read()
+    oversized = args.oversized_mb * 2 ** 20
+
+    def post(payload, size=None, declare_length=True):
+        body = MultipartBody("file", "sign.mp4", "video/mp4", payload, size)
+        return asgi_post(server.app, "/detect-video", body, declare_length)
+
+    post(clip)  # warm-up: compiles the serving functions outside the measurement
+    limits = {"max_video_upload_mb": uploads.MAX_VIDEO_UPLOAD_BYTES / 2 ** 20,
+              "max_concurrent": server.sign_admission.max_concurrent, "max_queue": server.sign_admission.max_queue}
+    return limits, {
+        "oversized_declared": (lambda: post(b"", oversized), args.oversized_requests, args.oversized_requests),
+        "oversized_chunked": (lambda: post(b"", oversized, declare_length=False),
+                              args.oversized_requests, args.oversized_requests),
+        "too_long": (lambda: post(long_clip), 4, 1),
+        # Each burst request is a distinct upload, so the prediction cache can't answer it
+        "burst": (lambda: post(clip + os.urandom(16)), args.burst, args.burst),
+    }
+
+
+# ------------------------
+# Speech server: Flask test client reading from a lazy wsgi.input
+# ------------------------
+def speech_scenarios(args):
+    from benchmarks.servers import load_speech_app
+    import uploads
+
+    server = load_speech_app(args.recognize_latency_ms / 1000, 0)
+    wav = make_wav(4, 16000, 1)
+    long_wav = make_wav(uploads.MAX_AUDIO_SECONDS + 30, 8000, 1)
+    oversized = args.oversized_mb * 2 ** 20
+    local = threading.local()
+
+    def post(payload, size=None, declare_length=True):
+        if not hasattr(local, "client"):
+            local.client = server.app.test_client()
+        body = MultipartBody("audio", "speech.wav", "audio/wav", payload, size)
+        # The builder measures seekable streams; blank the length again to look like a chunked upload
+        environ = {} if declare_length else {"CONTENT_LENGTH": "", "wsgi.input_terminated": True,
+                                             "HTTP_TRANSFER_ENCODING": "chunked"}
+        response = local.client.post("/transcribe", input_stream=body,
+                                     content_type=f"multipart/form-data; boundary={BOUNDARY}",
+                                     content_length=body.length if declare_length else None,
+                                     environ_overrides=environ)
+        return response.status_code, body.position
+
+    post(wav)
+    limits = {"max_audio_upload_mb": uploads.MAX_AUDIO_UPLOAD_BYTES / 2 ** 20,
+              "max_concurrent": server.speech_admission.max_concurrent,
+              "max_queue": server.speech_admission.max_queue}
+    return limits, {
+        "oversized_declared": (lambda: post(b"", oversized), args.oversized_requests, args.oversized_requests),
+        "oversized_chunked": (lambda: post(b"", oversized, declare_length=False),
+                              args.oversized_requests, args.oversized_requests),
+        "too_long": (lambda: post(long_wav), 4, 1),
+        "burst": (lambda: post(wav), args.burst, args.burst),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["speech", "sign", "both"], default="both")
+    parser.add_argument("--oversized-mb", type=int, default=512, help="size of each oversized upload")
+    parser.add_argument("--oversized-requests", type=int, default=4, help="concurrent oversized uploads")
+    parser.add_argument("--burst", type=int, default=48, help="valid requests fired at once")
+    parser.add_argument("--recognize-latency-ms", type=float, default=200)
+    parser.add_argument("--model-dir", help="sign model artifacts (stand-ins generated if omitted)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    targets = {"sign": sign_scenarios, "speech": speech_scenarios}
+    for target in ("sign", "speech"):
+        if args.target not in (target, "both"):
+            continue
+        limits, scenarios = targets[target](args)
+        results[target] = {"limits": limits}
+        for name, (fire, total, concurrency) in scenarios.items():
+            r = run_scenario(fire, total, concurrency)
+            results[target][name] = r
+            print(f"{target}.{name:<20} statuses {str(r['statuses']):<26} p50 {r['p50_ms']:>9.2f} ms   "
+                  f"max {r['max_ms']:>9.2f} ms   body read {r['body_read_mb']:>7.1f} MB   "
+                  f"RSS +{r['rss_growth_mb']:.1f} MB", flush=True)
+
+    if args.json:
+        write_json(args.json, "load_test_limits", {"oversized_mb": args.oversized_mb, **results})
+
+
+if __name__ == "__main__":
+    main()
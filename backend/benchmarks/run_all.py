@@ -0,0 +1,85 @@
+"""
+Run the benchmark suite and write one merged result file per commit.
+
+Each benchmark runs in its own interpreter (so imports, TF graphs and caches
+do not leak between them) and writes JSON to a temp file; the results are
+merged into benchmarks/results/<commit>.json together with the environment.
+
+    python benchmarks/run_all.py                 # everything that can run here
+    python benchmarks/run_all.py --only sign_stages load_test
+    python benchmarks/compare.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import BACKEND_DIR, environment  # noqa: E402
+
+BENCH_DIR = os.path.join(BACKEND_DIR, "benchmarks")
+
+SUITE = {
+    "speech_stages": ["bench_speech_stages.py"],
+    "sign_stages": ["bench_sign_stages.py"],
+    "preprocessing": ["bench_preprocessing.py"],
+    "prediction_cache": ["bench_prediction_cache.py", "--requests", "100"],
+    "upload_paths": ["bench_upload_paths.py"],
+    "inference": ["bench_inference.py", "--repeats", "5"],
+    "segmentation": ["bench_segmentation.py", "--lengths", "10", "30", "60"],
+    "text_to_sign": ["bench_text_to_sign.py", "--repeats", "100"],
+    "phrase_table": ["bench_phrase_table.py", "--requests", "200"],
+    "audio_pipeline": ["bench_audio_pipeline.py"],
+    "language_id": ["bench_language_id.py"],
+    "load_test": ["load_test.py", "--requests", "60"],
+    "load_test_limits": ["load_test_limits.py", "--oversized-mb", "256", "--burst", "32"],
+    "model_reload": ["bench_model_reload.py", "--phase-seconds", "3"],
+    # Needs downloaded Vosk / Whisper models; skipped with a note when they are missing
+    "speech_recognition": ["bench_speech_recognition.py"],
+}
+
+
+def run_one(name, command, timeout):
+    out = os.path.join(tempfile.mkdtemp(prefix="cb-bench-"), f"{name}.json")
+    cmd = [sys.executable, os.path.join(BENCH_DIR, command[0])] + command[1:] + ["--json", out]
+    print(f"==> {name}", flush=True)
+    try:
+        proc = subprocess.run(cmd, cwd=BACKEND_DIR, timeout=timeout, capture_output=True, text=True)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout}s"}
+    sys.stdout.write(proc.stdout)
+    if proc.returncode != 0 or not os.path.exists(out):
+        return {"error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+    with open(out) as f:
+        data = json.load(f)
+    # Scripts using common.write_json wrap their results; older ones write them bare
+    return data.get("results", data) if isinstance(data, dict) else data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITE), help="run a subset of the suite")
+    parser.add_argument("--output", help="result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--timeout", type=int, default=1800, help="per-benchmark timeout in seconds")
+    args = parser.parse_args()
+
+    env = environment()
+    results = {name: run_one(name, SUITE[name], args.timeout) for name in (args.only or SUITE)}
+
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{env['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"environment": env, "benchmarks": results}, f, indent=2)
+
+    for name, result in results.items():
+        if isinstance(result, dict) and "error" in result:
+            print(f"{name}: {result['error']}")
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
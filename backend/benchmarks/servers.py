@@ -0,0 +1,71 @@
+"""
+In-process server setup for benchmarks and load tests.
+
+load_speech_app() imports app.py with its upstream services (Google/MyMemory
+translation, network speech recognition) replaced by local fakes that sleep
+for a configurable latency, and a stub TTS engine. load_sign_app() imports
+main.py from a directory of model artifacts, generating stand-ins if needed.
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+from benchmarks.common import BACKEND_DIR
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+class FakeTranslator:
+    """Stands in for deep_translator / MyMemory with a fixed round-trip latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def translate(self, text=None, source=None, target=None, **kwargs):
+        time.sleep(self.latency)
+        return f"[{target}] {text}"
+
+
+def load_speech_app(recognize_latency: float = 0.05, translate_latency: float = 0.08):
+    """Import app.py with fake upstreams; returns the module"""
+    os.environ.setdefault("TTS_ENGINE", "stub")
+    os.environ["SPEECH_ENGINES"] = "fake"
+
+    import speech_engines
+
+    class FakeEngine(speech_engines.RecognizerEngine):
+        name = "fake"
+        local = True
+
+        def recognize(self, audio, language):
+            time.sleep(recognize_latency)
+            return "hello how are you"
+
+    speech_engines.ENGINE_CLASSES["fake"] = FakeEngine
+    speech_engines.SPEECH_ENGINES = "fake"
+
+    import app
+    app.recognition_service.engines = [FakeEngine()]
+    app.deep_translator = FakeTranslator(translate_latency)
+    fake_mymemory = FakeTranslator(translate_latency)
+    app.MyMemoryTranslator = lambda source=None, target=None: fake_mymemory
+    return app
+
+
+def load_sign_app(model_dir: str = None):
+    """Import main.py from model_dir (stand-in models are generated when omitted)"""
+    os.environ.setdefault("BACKBONE_WEIGHTS", "none")
+    os.environ.setdefault("MODEL_POLL_SECONDS", "0")  # no model watcher thread during measurements
+    if model_dir is None:
+        from benchmarks.fixtures import make_sign_models
+        model_dir = make_sign_models(tempfile.mkdtemp(prefix="cb-models-"))
+    previous = os.getcwd()
+    os.chdir(model_dir)  # main.py loads artifacts relative to the working directory
+    try:
+        import main
+    finally:
+        os.chdir(previous)
+    return main
@@ -0,0 +1,143 @@
+"""
+Temperature-scaled probabilities, top-k and rejection for the sign models.
+
+The trained models end in a softmax, so temperature scaling is applied to the
+log of its output: softmax(log(p) / T) equals softmax(logits / T) because the
+log-sum-exp constant cancels. Everything works on (N, C) batches and reuses
+the probabilities from the single forward pass.
+
+The temperature is fitted on the validation split by the training scripts
+(minimizing negative log-likelihood) and saved next to the model as
+<model>.calibration.json.
+"""
+
+import os
+import json
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_LABEL = "unknown"
+# Calibrated top-1 probability below which the server answers "unknown" (0 disables)
+SIGN_REJECT_THRESHOLD = float(os.environ.get("SIGN_REJECT_THRESHOLD", 0.0))
+MAX_TOP_K = 10
+EPSILON = 1e-12
+
+
+def calibration_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".calibration.json"
+
+
+def apply_temperature(probs: np.ndarray, temperature: float) -> np.ndarray:
+    """Rescale softmax outputs (N, C) by 1 / temperature"""
+    probs = np.asarray(probs, dtype=np.float64)
+    if temperature == 1.0:
+        return probs
+    logits = np.log(np.maximum(probs, EPSILON)) / temperature
+    logits -= logits.max(axis=-1, keepdims=True)
+    scaled = np.exp(logits)
+    return scaled / scaled.sum(axis=-1, keepdims=True)
+
+
+def negative_log_likelihood(probs: np.ndarray, labels: np.ndarray, temperature: float) -> float:
+    scaled = apply_temperature(probs, temperature)
+    return float(-np.mean(np.log(np.maximum(scaled[np.arange(len(labels)), labels], EPSILON))))
+
+
+def fit_temperature(probs: np.ndarray, labels: np.ndarray, low: float = 0.05, high: float = 20.0,
+                    steps: int = 60) -> float:
+    """Temperature minimizing validation NLL (golden-section search on log T)"""
+    labels = np.asarray(labels, dtype=np.int64)
+    if len(labels) == 0:
+        return 1.0
+    ratio = (np.sqrt(5) - 1) / 2
+    a, b = np.log(low), np.log(high)
+    c, d = b - ratio * (b - a), a + ratio * (b - a)
+    fc, fd = (negative_log_likelihood(probs, labels, np.exp(x)) for x in (c, d))
+    for _ in range(steps):
+        if fc < fd:
+            b, d, fd = d, c, fc
+            c = b - ratio * (b - a)
+            fc = negative_log_likelihood(probs, labels, np.exp(c))
+        else:
+            a, c, fc = c, d, fd
+            d = a + ratio * (b - a)
+            fd = negative_log_likelihood(probs, labels, np.exp(d))
+    return float(np.exp((a + b) / 2))
+
+
+def expected_calibration_error(probs: np.ndarray, labels: np.ndarray, bins: int = 10) -> float:
+    confidence = probs.max(axis=-1)
+    correct = probs.argmax(axis=-1) == labels
+    edges = np.linspace(0, 1, bins + 1)
+    which = np.clip(np.digitize(confidence, edges[1:-1]), 0, bins - 1)
+    error = 0.0
+    for b in range(bins):
+        mask = which == b
+        if mask.any():
+            error += mask.mean() * abs(correct[mask].mean() - confidence[mask].mean())
+    return float(error)
+
+
+def save_calibration(model_path: str, probs: np.ndarray, labels: np.ndarray) -> Dict[str, float]:
+    """Fit a temperature on validation outputs and write it next to the model"""
+    probs = np.asarray(probs, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int64)
+    temperature = fit_temperature(probs, labels)
+    calibration = {
+        "temperature": temperature,
+        "validation_samples": int(len(labels)),
+        "nll_before": negative_log_likelihood(probs, labels, 1.0),
+        "nll_after": negative_log_likelihood(probs, labels, temperature),
+        "ece_before": expected_calibration_error(probs, labels),
+        "ece_after": expected_calibration_error(apply_temperature(probs, temperature), labels),
+    }
+    with open(calibration_path(model_path), "w") as f:
+        json.dump(calibration, f, indent=2)
+    return calibration
+
+
+def load_temperature(model_path: str) -> float:
+    """Temperature saved for a model, or 1.0 (uncalibrated) if there is none"""
+    path = calibration_path(model_path)
+    if not os.path.exists(path):
+        logger.info(f"No calibration at {path}; serving raw softmax probabilities")
+        return 1.0
+    with open(path) as f:
+        return float(json.load(f).get("temperature", 1.0))
+
+
+def format_predictions(probs: np.ndarray, class_names: List[str], temperature: float = 1.0, top_k: int = 0,
+                       threshold: Optional[float] = None) -> List[Dict]:
+    """Build one response dict per row of a (N, C) batch of softmax outputs.
+
+    Each has the calibrated top-1 "label" and "confidence" ("unknown" when the
+    confidence is below threshold) and, if top_k > 0, a "top_k" list.
+    """
+    threshold = SIGN_REJECT_THRESHOLD if threshold is None else threshold
+    calibrated = apply_temperature(np.atleast_2d(probs), temperature)
+    k = min(max(top_k, 1), MAX_TOP_K, calibrated.shape[-1])
+    # argpartition + sort of k columns instead of sorting every row
+    top = np.argpartition(-calibrated, k - 1, axis=-1)[:, :k]
+    top_probs = np.take_along_axis(calibrated, top, axis=-1)
+    order = np.argsort(-top_probs, axis=-1)
+    top = np.take_along_axis(top, order, axis=-1)
+    top_probs = np.take_along_axis(top_probs, order, axis=-1)
+
+    results = []
+    for indices, values in zip(top, top_probs):
+        confidence = float(values[0])
+        rejected = confidence < threshold
+        result = {
+            "label": UNKNOWN_LABEL if rejected else class_names[indices[0]],
+            "confidence": confidence
+        }
+        if rejected:
+            result["best_guess"] = class_names[indices[0]]
+        if top_k > 0:
+            result["top_k"] = [{"label": class_names[i], "confidence": float(v)} for i, v in zip(indices, values)]
+        results.append(result)
+    return results
@@ -0,0 +1,468 @@
+"""
+Knowledge distillation of the sign models into smaller CPU students.
+
+The trained models are the teachers: sign_image_model.keras (MobileNetV2 +
+dense head) for /detect-sign, and MobileNetV2 features + sign_model_weights.keras
+(stacked LSTMs) for /detect-video. Students combine:
+
+- a backbone: MobileNetV3-Small (1.0, 0.75 or minimalistic), MobileNetV2 at
+  alpha 0.35, or the teacher's own MobileNetV2 run at a lower resolution;
+- an input resolution (128, 96 or 64 px). Students still take the server's
+  128 px frames and resize inside the graph, so preprocessing stays the same;
+- a head: the teacher's dense head for images; for video either the
+  teacher's LSTM stack or a small 1D temporal conv ("tcn").
+
+Student backbones are frozen with ImageNet weights, like the teacher's, so
+each backbone/resolution pair embeds the data once and every head trains on
+the cached features. The loss blends KL divergence to the teacher's softened
+probabilities (temperature --temperature, weight --alpha) with cross entropy
+on the labels.
+
+Every candidate is scored on the teacher's validation split (accuracy, top-1
+agreement with the teacher) and timed on this CPU through serving.py, the way
+main.py runs it. The report lists all candidates and marks the accuracy vs
+latency Pareto front. The chosen student is the fastest front member within
+--max-accuracy-drop of the teacher's accuracy. It is exported under
+distill/<run_id>/student/ in the files /detect-sign and /detect-video load:
+the image model, or the video head plus sign_backbone.keras, with labels,
+calibration and a manifest. --install copies them over the serving artifacts.
+
+    python distill.py image --resolutions 128 96 64 --epochs 30
+    python distill.py video --backbones mobilenet_v3_small mobilenet_v2_0.35 --heads lstm tcn --install
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from preprocessing import IMG_SIZE, load_image_dir, normalize, augment, read_clip, validation_mask, with_uint8_input
+from profiling import git_commit, measure
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+logger = logging.getLogger(__name__)
+
+DISTILL_DIR = "distill"
+BACKBONE_WEIGHTS = os.environ.get("BACKBONE_WEIGHTS", "imagenet")
+# Serving artifacts: image model, video head, labels, and the student video backbone main.py prefers
+ARTIFACTS = {
+    "image": ("sign_image_model.keras", "labels_image.json"),
+    "video": ("sign_model_weights.keras", "labels.json"),
+}
+STUDENT_BACKBONE_PATH = "sign_backbone.keras"
+
+BACKBONES = {
+    # name: (application, keyword arguments, expects [-1, 1] inputs)
+    "mobilenet_v2": ("MobileNetV2", {}, False),
+    "mobilenet_v2_0.35": ("MobileNetV2", {"alpha": 0.35}, False),
+    "mobilenet_v3_small": ("MobileNetV3Small", {}, True),
+    "mobilenet_v3_small_0.75": ("MobileNetV3Small", {"alpha": 0.75}, True),
+    "mobilenet_v3_small_minimalistic": ("MobileNetV3Small", {"minimalistic": True}, True),
+}
+DEFAULT_BACKBONES = ["mobilenet_v3_small", "mobilenet_v3_small_minimalistic", "mobilenet_v2_0.35", "mobilenet_v2"]
+
+
+# ------------------------
+# Models
+# ------------------------
+def build_backbone(name: str, resolution: int):
+    """Frozen student backbone taking the server's [0, 1] IMG_SIZE frames; resizing happens in the graph"""
+    import tensorflow as tf
+
+    application, kwargs, signed_inputs = BACKBONES[name]
+    weights = None if BACKBONE_WEIGHTS.lower() == "none" else BACKBONE_WEIGHTS
+    if application == "MobileNetV3Small":
+        # Keras' built-in preprocessing expects [0, 255]; the frames here are [0, 1]
+        kwargs = dict(kwargs, include_preprocessing=False)
+    network = getattr(tf.keras.applications, application)(
+        input_shape=(resolution, resolution, 3), include_top=False, pooling="avg", weights=weights, **kwargs)
+    network.trainable = False
+
+    inputs = tf.keras.Input(shape=(IMG_SIZE, IMG_SIZE, 3))
+    x = inputs
+    # Average pooling is area resizing for whole factors; both map to TFLite builtins (ResizeArea does not)
+    if IMG_SIZE % resolution == 0 and resolution != IMG_SIZE:
+        x = tf.keras.layers.AveragePooling2D(IMG_SIZE // resolution)(x)
+    elif resolution != IMG_SIZE:
+        x = tf.keras.layers.Resizing(resolution, resolution, interpolation="bilinear", antialias=False)(x)
+    if signed_inputs:
+        x = tf.keras.layers.Rescaling(2.0, offset=-1.0)(x)
+    return tf.keras.Model(inputs, network(x), name=f"{name.replace('.', '')}_{resolution}")
+
+
+def build_head(task: str, kind: str, input_shape: Tuple[int, ...], n_classes: int):
+    from tensorflow.keras import layers, models  # type: ignore
+
+    if task == "image":
+        # train_image_model.py's head
+        return models.Sequential([
+            layers.Input(shape=input_shape),
+            layers.Dense(128, activation="relu"),
+            layers.Dropout(0.3),
+            layers.Dense(n_classes, activation="softmax")
+        ])
+    if kind == "lstm":
+        # train_video_model.py's head
+        return models.Sequential([
+            layers.Input(shape=input_shape),
+            layers.LSTM(128, return_sequences=True, dropout=0.3, recurrent_dropout=0.2),
+            layers.LSTM(64, dropout=0.3, recurrent_dropout=0.2),
+            layers.Dense(64, activation="relu"),
+            layers.Dropout(0.3),
+            layers.Dense(n_classes, activation="softmax")
+        ])
+    # Temporal conv: two dilated 1D convs over the frame axis, then average over time
+    return models.Sequential([
+        layers.Input(shape=input_shape),
+        layers.Conv1D(64, 3, padding="same", activation="relu"),
+        layers.Conv1D(64, 3, padding="same", dilation_rate=2, activation="relu"),
+        layers.GlobalAveragePooling1D(),
+        layers.Dropout(0.3),
+        layers.Dense(n_classes, activation="softmax")
+    ])
+
+
+def distillation_loss(n_classes: int, temperature: float, alpha: float):
+    """y_true is [one-hot labels | teacher probabilities]; y_pred the student's softmax"""
+    import tensorflow as tf
+
+    def soften(probs):
+        return tf.nn.softmax(tf.math.log(probs + 1e-7) / temperature)
+
+    def loss(y_true, y_pred):
+        labels, teacher = y_true[:, :n_classes], y_true[:, n_classes:]
+        hard = tf.keras.losses.categorical_crossentropy(labels, y_pred)
+        # T^2 keeps the soft term's gradients on the same scale as the hard one
+        soft = tf.keras.losses.KLDivergence(reduction=None)(soften(teacher), soften(y_pred)) * temperature ** 2
+        return alpha * soft + (1.0 - alpha) * hard
+    return loss
+
+
+def train_student(head, X_train, y_train, teacher_train, n_classes: int, args):
+    import tensorflow as tf
+
+    targets = np.concatenate([np.eye(n_classes, dtype=np.float32)[y_train], teacher_train], axis=1)
+    # Compile a wrapper sharing the head's layers: a saved model carries its compile
+    # config, and the custom loss would not load in main.py
+    trainer = tf.keras.Model(head.inputs, head.outputs)
+    trainer.compile(optimizer=tf.keras.optimizers.Adam(args.learning_rate),
+                    loss=distillation_loss(n_classes, args.temperature, args.alpha))
+    trainer.fit(X_train, targets, epochs=args.epochs, batch_size=args.batch_size, shuffle=True, verbose=0)
+    return head
+
+
+# ------------------------
+# Data and teachers
+# ------------------------
+def load_image_data(args):
+    """uint8 images, labels, validation mask and class names, split as train_image_model.py does"""
+    images, labels, class_names = load_image_dir(args.data_dir, IMG_SIZE)
+    return images, labels, validation_mask(labels, len(class_names), 0.2), class_names
+
+
+def load_video_data(args, max_frames: int, teacher_classes: List[str]):
+    """uint8 (N, T, H, W, 3) clips, labels, validation mask and class names, split as train_video_model.py does.
+
+    train_video_model.py numbers classes in os.listdir order, so folders are
+    read in the order of the teacher's labels.json rather than sorted.
+    """
+    from sklearn.model_selection import train_test_split
+
+    class_folders = [f for f in os.listdir(args.data_dir) if os.path.isdir(os.path.join(args.data_dir, f))]
+    class_folders.sort(key=lambda f: (teacher_classes.index(f) if f in teacher_classes else len(teacher_classes), f))
+    clips, labels, class_names = [], [], []
+    for folder in class_folders:
+        videos = [f for f in sorted(os.listdir(os.path.join(args.data_dir, folder))) if f.endswith(".mp4")]
+        if not videos:
+            continue
+        class_names.append(folder)
+        for vid in videos:
+            clip = read_clip(os.path.join(args.data_dir, folder, vid), max_frames)
+            clips.append(np.concatenate([clip, np.repeat(clip[-1:], max_frames - len(clip), axis=0)]))
+            labels.append(len(class_names) - 1)
+    clips, labels = np.stack(clips), np.asarray(labels)
+    val_mask = np.zeros(len(labels), dtype=bool)
+    if len(class_names) > 1:
+        _, val_index = train_test_split(np.arange(len(labels)), test_size=0.2, random_state=42, stratify=labels)
+        val_mask[val_index] = True
+    else:
+        val_mask[:] = True
+    return clips, labels, val_mask, class_names
+
+
+def training_views(frames: np.ndarray, copies: int, seed: int) -> List[np.ndarray]:
+    """The normalized training frames plus `copies` augmented versions; teacher and students see the same ones"""
+    rng = np.random.default_rng(seed)
+    base = normalize(frames)
+    views = [base]
+    for _ in range(copies):
+        view = base.copy()
+        # augment() draws per frame along the first axis: one image each, or each clip's frames
+        for clip in (view if view.ndim == 5 else [view]):
+            augment(clip, rng)
+        views.append(view)
+    return views
+
+
+def embed(backbone, frames: np.ndarray, batch_size: int = 64) -> np.ndarray:
+    """Backbone features of (N, H, W, 3) or (N, T, H, W, 3) normalized frames"""
+    flat = frames.reshape(-1, *frames.shape[-3:])
+    features = backbone.predict(flat, batch_size=batch_size, verbose=0)
+    return features.reshape(*frames.shape[:-3], features.shape[-1])
+
+
+class Teacher:
+    """The serving models as teachers: soft targets plus the latency every student is compared with"""
+
+    def __init__(self, task: str, model_dir: str):
+        import tensorflow as tf
+
+        model_file, labels_file = ARTIFACTS[task]
+        self.task = task
+        self.model = tf.keras.models.load_model(os.path.join(model_dir, model_file))
+        with open(os.path.join(model_dir, labels_file)) as f:
+            self.class_names = json.load(f)
+        if task == "video":
+            self.max_frames = self.model.input_shape[1]
+            # After an --install the head is a student's, paired with its own backbone (as model_registry loads it)
+            backbone_path = os.path.join(model_dir, STUDENT_BACKBONE_PATH)
+            if os.path.exists(backbone_path):
+                self.backbone = tf.keras.models.load_model(backbone_path)
+            else:
+                self.backbone = tf.keras.applications.MobileNetV2(
+                    input_shape=(IMG_SIZE, IMG_SIZE, 3), include_top=False, pooling="avg",
+                    weights=None if BACKBONE_WEIGHTS.lower() == "none" else BACKBONE_WEIGHTS)
+            self.backbone.trainable = False
+            if self.backbone.output_shape[-1] != self.model.input_shape[-1]:
+                raise ValueError(f"{model_file} expects {self.model.input_shape[-1]}-d frame features but the "
+                                 f"backbone produces {self.backbone.output_shape[-1]}")
+
+    def predict(self, frames: np.ndarray) -> np.ndarray:
+        if self.task == "image":
+            return self.model.predict(frames, batch_size=64, verbose=0)
+        return self.model.predict(embed(self.backbone, frames), batch_size=32, verbose=0)
+
+    def serving_parts(self):
+        """(backbone or None, head) as main.py serves them"""
+        if self.task == "image":
+            return None, self.model
+        return self.backbone, self.model
+
+
+def image_model(backbone, head):
+    """Backbone and dense head as the single model /detect-sign loads"""
+    import tensorflow as tf
+
+    return tf.keras.Sequential([tf.keras.layers.Input(shape=(IMG_SIZE, IMG_SIZE, 3)), backbone] + head.layers)
+
+
+# ------------------------
+# Latency
+# ------------------------
+def serving_latency(backbone, head, task: str, max_frames: int, repeats: int) -> Dict[str, float]:
+    """p50/p99 of one request's model work through serving.py: image model at batch 1, or a clip"""
+    import serving
+
+    rng = np.random.default_rng(0)
+    if task == "image":
+        model = head if backbone is None else image_model(backbone, head)
+        model = serving.serving_model(with_uint8_input(model), "image", (1,))
+        frame = rng.integers(0, 256, (1, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+        return measure(lambda: model.predict(frame, verbose=0), repeats, 3)
+    backbone = serving.serving_model(with_uint8_input(backbone), "backbone", (max_frames,))
+    head = serving.serving_model(head, "head", (1,))
+    clip = rng.integers(0, 256, (max_frames, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+    return measure(lambda: head.predict(backbone.predict(clip, verbose=0)[np.newaxis], verbose=0), repeats, 3)
+
+
+# ------------------------
+# Report
+# ------------------------
+def pareto_front(candidates: List[Dict]) -> List[str]:
+    """Names of candidates no other candidate beats on both accuracy and latency"""
+    front, best_accuracy = [], -1.0
+    for c in sorted(candidates, key=lambda c: (c["latency_p50_ms"], -c["val_accuracy"])):
+        if c["val_accuracy"] > best_accuracy:
+            front.append(c["name"])
+            best_accuracy = c["val_accuracy"]
+    return front
+
+
+def choose(candidates: List[Dict], front: List[str], teacher: Dict, max_drop: float):
+    """Fastest front member within max_drop of the teacher's accuracy (None if none qualifies)"""
+    eligible = [c for c in candidates if c["name"] in front and c["val_accuracy"] >= teacher["val_accuracy"] - max_drop]
+    return min(eligible, key=lambda c: c["latency_p50_ms"]) if eligible else None
+
+
+def write_report(run_dir: str, report: Dict):
+    with open(os.path.join(run_dir, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    teacher = report["teacher"]
+    lines = [f"# Distillation report: {report['task']} ({report['run_id']})", "",
+             f"Teacher: val accuracy {teacher['val_accuracy']:.3f}, p50 {teacher['latency_p50_ms']:.2f} ms, "
+             f"{teacher['params']:,} parameters. Chosen: {report['chosen'] or 'none'}", "",
+             "| candidate | backbone | px | head | params | val acc | agreement | p50 ms | p99 ms | speedup | front |",
+             "|---|---|---|---|---|---|---|---|---|---|---|"]
+    for c in sorted(report["candidates"], key=lambda c: c["latency_p50_ms"]):
+        lines.append(f"| {c['name']} | {c['backbone']} | {c['resolution']} | {c['head']} | {c['params']:,} | "
+                     f"{c['val_accuracy']:.3f} | {c['agreement']:.3f} | {c['latency_p50_ms']:.2f} | "
+                     f"{c['latency_p99_ms']:.2f} | x{c['speedup']:.2f} | {'*' if c['pareto'] else ''} |")
+    with open(os.path.join(run_dir, "report.md"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    print("\n".join(lines))
+
+
+# ------------------------
+# Export
+# ------------------------
+def export_student(args, run_dir: str, student: Dict, backbone, head, class_names: List[str],
+                   val_probs: np.ndarray, y_val: np.ndarray, report: Dict) -> str:
+    """Write the student as the serving artifacts for its task, with calibration and a manifest"""
+    from calibration import save_calibration
+
+    model_file, labels_file = ARTIFACTS[args.task]
+    student_dir = os.path.join(run_dir, "student")
+    os.makedirs(student_dir, exist_ok=True)
+    files = [model_file, labels_file, model_file.replace(".keras", ".calibration.json")]
+    if args.task == "image":
+        model = image_model(backbone, head)
+    else:
+        model = head
+        backbone.save(os.path.join(student_dir, STUDENT_BACKBONE_PATH))
+        files.append(STUDENT_BACKBONE_PATH)
+    model_path = os.path.join(student_dir, model_file)
+    model.save(model_path)
+    calibration = save_calibration(model_path, val_probs, y_val)
+    with open(os.path.join(student_dir, labels_file), "w") as f:
+        json.dump(class_names, f)
+
+    manifest = {"run_id": report["run_id"], "task": args.task, "student": student, "teacher": report["teacher"],
+                "calibration": calibration, "distillation": report["settings"],
+                "backbone_weights": BACKBONE_WEIGHTS, "commit": git_commit(), "files": files}
+    with open(os.path.join(student_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if args.install:
+        # Over the teacher's serving artifacts, so the next run distills from the installed student
+        for filename in files:
+            shutil.copy(os.path.join(student_dir, filename), os.path.join(args.teacher_dir, filename))
+        logger.info(f"Installed {', '.join(files)} into {os.path.abspath(args.teacher_dir)}")
+    return student_dir
+
+
+# ------------------------
+# Run
+# ------------------------
+def distill(args) -> Dict:
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(args.seed)
+    teacher = Teacher(args.task, args.teacher_dir)
+    max_frames = teacher.max_frames if args.task == "video" else 1
+    if args.task == "image":
+        frames, labels, val_mask, class_names = load_image_data(args)
+    else:
+        frames, labels, val_mask, class_names = load_video_data(args, max_frames, teacher.class_names)
+    if class_names != teacher.class_names:
+        raise ValueError(f"Data classes {class_names} do not match the teacher's labels {teacher.class_names}")
+    n_classes = len(class_names)
+
+    views = training_views(frames[~val_mask], args.augment_copies, args.seed)
+    val_frames = training_views(frames[val_mask], 0, args.seed)[0]
+    y_train, y_val = np.tile(labels[~val_mask], len(views)), labels[val_mask]
+    teacher_train = np.concatenate([teacher.predict(view) for view in views])
+    teacher_val = teacher.predict(val_frames)
+    teacher_backbone, teacher_head = teacher.serving_parts()
+    teacher_latency = serving_latency(teacher_backbone, teacher_head, args.task, max_frames, args.repeats)
+    teacher_entry = {
+        "val_accuracy": float(np.mean(teacher_val.argmax(-1) == y_val)),
+        "latency_p50_ms": teacher_latency["p50_ms"], "latency_p99_ms": teacher_latency["p99_ms"],
+        "params": int(teacher_head.count_params() + (teacher_backbone.count_params() if teacher_backbone else 0)),
+    }
+    logger.info(f"Teacher: {len(y_train)} train / {len(y_val)} val samples, {teacher_entry}")
+
+    heads = ["dense"] if args.task == "image" else args.heads
+    candidates, trained = [], {}
+    for backbone_name in args.backbones:
+        for resolution in args.resolutions:
+            start = time.perf_counter()
+            backbone = build_backbone(backbone_name, resolution)
+            X_train = np.concatenate([embed(backbone, view) for view in views])
+            X_val = embed(backbone, val_frames)
+            embed_seconds = time.perf_counter() - start
+            for kind in heads:
+                name = f"{backbone_name}@{resolution}" + (f"+{kind}" if args.task == "video" else "")
+                start = time.perf_counter()
+                head = build_head(args.task, kind, X_train.shape[1:], n_classes)
+                head = train_student(head, X_train, y_train, teacher_train, n_classes, args)
+                val_probs = head.predict(X_val, verbose=0)
+                latency = serving_latency(backbone, head, args.task, max_frames, args.repeats)
+                candidate = {
+                    "name": name, "backbone": backbone_name, "resolution": resolution, "head": kind,
+                    "params": int(backbone.count_params() + head.count_params()),
+                    "val_accuracy": float(np.mean(val_probs.argmax(-1) == y_val)),
+                    "agreement": float(np.mean(val_probs.argmax(-1) == teacher_val.argmax(-1))),
+                    "latency_p50_ms": latency["p50_ms"], "latency_p99_ms": latency["p99_ms"],
+                    "speedup": round(teacher_entry["latency_p50_ms"] / latency["p50_ms"], 2),
+                    "embed_seconds": round(embed_seconds, 1),
+                    "train_seconds": round(time.perf_counter() - start, 1),
+                }
+                candidates.append(candidate)
+                trained[name] = (backbone, head, val_probs)
+                logger.info(f"{name:<44} acc {candidate['val_accuracy']:.3f}  agree {candidate['agreement']:.3f}  "
+                            f"p50 {candidate['latency_p50_ms']:>8.2f} ms  x{candidate['speedup']}")
+
+    front = pareto_front(candidates)
+    for c in candidates:
+        c["pareto"] = c["name"] in front
+    chosen = choose(candidates, front, teacher_entry, args.max_accuracy_drop)
+    run_id = time.strftime("%Y%m%d-%H%M%S") + f"-{args.task}"
+    run_dir = os.path.join(DISTILL_DIR, run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    report = {
+        "run_id": run_id, "task": args.task, "teacher": teacher_entry, "candidates": candidates,
+        "pareto_front": front, "chosen": chosen["name"] if chosen else None,
+        "settings": {"temperature": args.temperature, "alpha": args.alpha, "epochs": args.epochs,
+                     "augment_copies": args.augment_copies, "max_accuracy_drop": args.max_accuracy_drop},
+    }
+    write_report(run_dir, report)
+    if chosen is None:
+        logger.info(f"No student within {args.max_accuracy_drop} of the teacher's accuracy; nothing exported")
+    else:
+        backbone, head, val_probs = trained[chosen["name"]]
+        student_dir = export_student(args, run_dir, chosen, backbone, head, class_names, val_probs, y_val, report)
+        logger.info(f"Exported {chosen['name']} to {student_dir}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("task", choices=["image", "video"])
+    parser.add_argument("--data-dir", help="default: image/ or video/")
+    parser.add_argument("--teacher-dir", default=".", help="directory with the serving models and labels")
+    parser.add_argument("--backbones", nargs="+", choices=sorted(BACKBONES), default=DEFAULT_BACKBONES)
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[128, 96, 64])
+    parser.add_argument("--heads", nargs="+", choices=["lstm", "tcn"], default=["lstm", "tcn"], help="video heads")
+    parser.add_argument("--temperature", type=float, default=4.0, help="softening temperature for the KD term")
+    parser.add_argument("--alpha", type=float, default=0.7, help="weight of the KD term vs label cross entropy")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--augment-copies", type=int, default=2, help="augmented copies of the training set")
+    parser.add_argument("--repeats", type=int, default=30, help="timed calls per latency measurement")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--install", action="store_true", help="copy the chosen student over the serving artifacts")
+    args = parser.parse_args()
+    args.data_dir = args.data_dir or args.task
+    distill(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+Export the sign models to quantized TFLite for on-device inference.
+
+Writes into mobile/ (served by main.py under /mobile):
+- sign_image.tflite  - uint8 RGB (1, 128, 128, 3) -> class probabilities
+- sign_video.tflite  - uint8 RGB (1, MAX_FRAMES, 128, 128, 3) -> class probabilities
+                       (MobileNetV2 or distilled backbone + head in one graph; shorter
+                       clips are padded by repeating the last frame)
+- manifest.json      - per model: file, sha256, input geometry, labels and the
+                       calibration temperature, so the app can apply the same
+                       top-k / threshold logic as the server
+
+Scaling to [0, 1] is part of the graph (preprocessing.with_uint8_input), so the
+app feeds raw resized RGB bytes. --verify compares TFLite against Keras on the
+validation split and fails if top-1 agreement drops below --min-agreement.
+
+    python export_tflite.py --models image video --verify
+"""
+
+import os
+import json
+import hashlib
+import logging
+import argparse
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model  # type: ignore
+
+from preprocessing import IMG_SIZE, load_image_dir, read_clip, validation_mask, with_uint8_input
+from calibration import load_temperature
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MOBILE_DIR = "mobile"
+IMAGE_MODEL_PATH = "sign_image_model.keras"
+VIDEO_MODEL_PATH = "sign_model_weights.keras"
+BACKBONE_PATH = "sign_backbone.keras"
+BACKBONE_WEIGHTS = os.environ.get("BACKBONE_WEIGHTS", "imagenet")
+QUANTIZATION_MODES = ("int8", "dynamic", "float16", "none")
+# Full-integer quantization of the LSTM's while loop is not reliable in the
+# converter, so the clip model defaults to int8 weights with float activations
+DEFAULT_QUANTIZATION = {"image": "int8", "video": "dynamic"}
+
+
+# ------------------------
+# Conversion
+# ------------------------
+def convert(fn: Callable, input_shape, quantize: str, representative: Iterable[np.ndarray] = ()) -> bytes:
+    """Convert a traced uint8-input function to a TFLite flatbuffer.
+
+    int8 quantizes weights and activations with the representative samples
+    (falling back to float kernels for unsupported ops); dynamic quantizes
+    weights only; float16 halves weight size.
+    """
+    concrete = tf.function(fn).get_concrete_function(tf.TensorSpec(input_shape, tf.uint8))
+    # No trackable_obj: the converter then freezes the variables into constants
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete])
+    if quantize != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        samples = list(representative)
+        converter.representative_dataset = lambda: ([sample] for sample in samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8, tf.lite.OpsSet.TFLITE_BUILTINS]
+    return converter.convert()
+
+
+def inference_copy(model):
+    """Same weights with dropout rates zeroed, so no RNG state variables end up in the graph"""
+    config = model.get_config()
+    for layer in config["layers"]:
+        for key in ("dropout", "recurrent_dropout", "rate"):
+            if key in layer["config"]:
+                layer["config"][key] = 0.0
+    copy = model.__class__.from_config(config)
+    copy.set_weights(model.get_weights())
+    return copy
+
+
+def run_tflite(flatbuffer: bytes, inputs: np.ndarray) -> np.ndarray:
+    """Run the converted model one sample at a time (its batch dimension is 1)"""
+    interpreter = tf.lite.Interpreter(model_content=flatbuffer)
+    interpreter.allocate_tensors()
+    input_index = interpreter.get_input_details()[0]["index"]
+    output_index = interpreter.get_output_details()[0]["index"]
+    outputs = []
+    for sample in inputs:
+        interpreter.set_tensor(input_index, sample[np.newaxis])
+        interpreter.invoke()
+        outputs.append(interpreter.get_tensor(output_index)[0].copy())
+    return np.stack(outputs)
+
+
+def compare(reference: np.ndarray, exported: np.ndarray, labels: np.ndarray = None) -> Dict[str, float]:
+    report = {
+        "samples": int(len(reference)),
+        "top1_agreement": float(np.mean(reference.argmax(-1) == exported.argmax(-1))),
+        "max_abs_diff": float(np.abs(reference - exported).max()),
+        "mean_abs_diff": float(np.abs(reference - exported).mean()),
+    }
+    if labels is not None:
+        report["keras_accuracy"] = float(np.mean(reference.argmax(-1) == labels))
+        report["tflite_accuracy"] = float(np.mean(exported.argmax(-1) == labels))
+    return report
+
+
+# ------------------------
+# Models
+# ------------------------
+def export_image_model(quantize: str, image_dir: str, verify: bool) -> Dict:
+    model = with_uint8_input(load_model(IMAGE_MODEL_PATH))
+    with open("labels_image.json") as f:
+        class_names = json.load(f)
+
+    images, labels, _ = load_image_dir(image_dir, IMG_SIZE) if os.path.isdir(image_dir) else (None, None, None)
+    if images is None:
+        logger.warning(f"{image_dir} not found; using random frames as representative data")
+        images = np.random.default_rng(0).integers(0, 256, (32, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+        labels = None
+    representative = (images[i:i + 1] for i in np.random.default_rng(0).permutation(len(images))[:100])
+    flatbuffer = convert(lambda x: model(x, training=False), (1, IMG_SIZE, IMG_SIZE, 3), quantize, representative)
+
+    entry = {
+        "task": "image",
+        "input": {"shape": [1, IMG_SIZE, IMG_SIZE, 3], "dtype": "uint8", "color": "RGB"},
+        "labels": class_names,
+        "temperature": load_temperature(IMAGE_MODEL_PATH),
+    }
+    if verify:
+        mask = validation_mask(labels, len(class_names)) if labels is not None else np.ones(len(images), bool)
+        test = images[mask]
+        entry["verification"] = compare(model.predict(test, verbose=0), run_tflite(flatbuffer, test),
+                                        labels[mask] if labels is not None else None)
+    return {"name": "sign_image", "flatbuffer": flatbuffer, **entry}
+
+
+def load_clips(video_dir: str, max_frames: int, class_names: List[str]):
+    clips, labels = [], []
+    if not os.path.isdir(video_dir):
+        return None, None
+    for idx, name in enumerate(class_names):
+        folder = os.path.join(video_dir, name)
+        if not os.path.isdir(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if filename.endswith(".mp4"):
+                clip = read_clip(os.path.join(folder, filename), max_frames)
+                clips.append(np.concatenate([clip, np.repeat(clip[-1:], max_frames - len(clip), axis=0)]))
+                labels.append(idx)
+    if not clips:
+        return None, None
+    return np.stack(clips), np.asarray(labels)
+
+
+def export_video_model(quantize: str, video_dir: str, verify: bool) -> Dict:
+    head = inference_copy(load_model(VIDEO_MODEL_PATH))
+    max_frames = head.input_shape[1]
+    # The distilled student backbone when one is installed (distill.py), as main.py does
+    if os.path.exists(BACKBONE_PATH):
+        backbone = with_uint8_input(load_model(BACKBONE_PATH))
+    else:
+        backbone = with_uint8_input(tf.keras.applications.MobileNetV2(
+            input_shape=(IMG_SIZE, IMG_SIZE, 3), include_top=False, pooling="avg",
+            weights=None if BACKBONE_WEIGHTS.lower() == "none" else BACKBONE_WEIGHTS))
+    with open("labels.json") as f:
+        class_names = json.load(f)
+
+    def clip_model(clip):
+        features = backbone(clip[0], training=False)
+        return head(features[tf.newaxis], training=False)
+
+    clips, labels = load_clips(video_dir, max_frames, class_names)
+    if clips is None:
+        logger.warning(f"No clips under {video_dir}; using random frames as representative data")
+        clips = np.random.default_rng(0).integers(0, 256, (8, max_frames, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+    representative = (clips[i:i + 1] for i in range(min(len(clips), 50)))
+    flatbuffer = convert(clip_model, (1, max_frames, IMG_SIZE, IMG_SIZE, 3), quantize, representative)
+
+    entry = {
+        "task": "video",
+        "input": {"shape": [1, max_frames, IMG_SIZE, IMG_SIZE, 3], "dtype": "uint8", "color": "RGB"},
+        "labels": class_names,
+        "temperature": load_temperature(VIDEO_MODEL_PATH),
+    }
+    if verify:
+        reference = np.concatenate([clip_model(clips[i:i + 1]).numpy() for i in range(len(clips))])
+        entry["verification"] = compare(reference, run_tflite(flatbuffer, clips), labels)
+    return {"name": "sign_video", "flatbuffer": flatbuffer, **entry}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", choices=["image", "video"], default=["image", "video"])
+    parser.add_argument("--quantize", choices=QUANTIZATION_MODES,
+                        help="default: int8 for the image model, dynamic for the video model")
+    parser.add_argument("--image-dir", default="image")
+    parser.add_argument("--video-dir", default="video")
+    parser.add_argument("--output-dir", default=MOBILE_DIR)
+    parser.add_argument("--verify", action="store_true", help="compare TFLite and Keras on the validation split")
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="minimum top-1 agreement for --verify")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, "manifest.json")
+    manifest = {"models": {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    failed = []
+    exporters = {"image": lambda q: export_image_model(q, args.image_dir, args.verify),
+                 "video": lambda q: export_video_model(q, args.video_dir, args.verify)}
+    for task in args.models:
+        quantize = args.quantize or DEFAULT_QUANTIZATION[task]
+        exported = exporters[task](quantize)
+        flatbuffer = exported.pop("flatbuffer")
+        name = exported.pop("name")
+        filename = f"{name}.tflite"
+        with open(os.path.join(args.output_dir, filename), "wb") as f:
+            f.write(flatbuffer)
+        exported.update({
+            "file": filename,
+            "sha256": hashlib.sha256(flatbuffer).hexdigest(),
+            "size_bytes": len(flatbuffer),
+            "quantization": quantize,
+        })
+        manifest["models"][task] = exported
+        logger.info(f"{filename}: {len(flatbuffer) / 1e6:.2f} MB, {exported.get('verification', 'not verified')}")
+        if args.verify and exported["verification"]["top1_agreement"] < args.min_agreement:
+            failed.append(task)
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Wrote {manifest_path}")
+    if failed:
+        raise SystemExit(f"TFLite/Keras top-1 agreement below {args.min_agreement} for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Fast language identification for /detect-language and /transcribe.
+
+Detection runs in three tiers:
+1. Script shortcut - the dominant Unicode script settles most non-Latin
+   languages outright (Tamil, Gujarati, Thaana, Hangul...) or narrows the
+   candidates (Devanagari -> hi/mr/ne).
+2. N-gram index - a naive Bayes model over 1-3 character n-grams, built once
+   from langdetect's bundled profiles into a single log-probability matrix and
+   cached on disk. Batches are scored with one gather + reduceat.
+   A fastText lid model is used instead when installed and configured.
+3. An LRU memo cache in front of both for repeated inputs.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fasttext
+except ImportError:
+    fasttext = None
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LANGID_INDEX_PATH = os.environ.get("LANGID_INDEX_PATH", os.path.join(BASE_DIR, "models", "langid_index.npz"))
+FASTTEXT_LID_MODEL = os.environ.get("FASTTEXT_LID_MODEL", os.path.join(BASE_DIR, "models", "lid.176.ftz"))
+LANGID_CACHE_SIZE = int(os.environ.get("LANGID_CACHE_SIZE", 4096))
+LANGID_MAX_BATCH = int(os.environ.get("LANGID_MAX_BATCH", 1000))  # texts per /detect-language request
+MAX_NGRAM = 3
+# Additive smoothing matching langdetect's alpha / BASE_FREQ
+SMOOTHING = 0.5 / 10000
+
+# langdetect profile names that differ from our language codes
+PROFILE_ALIASES = {'zh-cn': 'zh', 'zh-tw': 'zh'}
+
+# (first code point, last code point, script)
+SCRIPT_RANGES = [
+    (0x0041, 0x005A, 'latin'), (0x0061, 0x007A, 'latin'), (0x00C0, 0x024F, 'latin'),
+    (0x0370, 0x03FF, 'greek'), (0x0400, 0x052F, 'cyrillic'), (0x0530, 0x058F, 'armenian'),
+    (0x0590, 0x05FF, 'hebrew'), (0x0600, 0x06FF, 'arabic'), (0x0750, 0x077F, 'arabic'),
+    (0x0780, 0x07BF, 'thaana'), (0x0900, 0x097F, 'devanagari'), (0x0980, 0x09FF, 'bengali'),
+    (0x0A00, 0x0A7F, 'gurmukhi'), (0x0A80, 0x0AFF, 'gujarati'), (0x0B00, 0x0B7F, 'oriya'),
+    (0x0B80, 0x0BFF, 'tamil'), (0x0C00, 0x0C7F, 'telugu'), (0x0C80, 0x0CFF, 'kannada'),
+    (0x0D00, 0x0D7F, 'malayalam'), (0x0D80, 0x0DFF, 'sinhala'), (0x0E00, 0x0E7F, 'thai'),
+    (0x0E80, 0x0EFF, 'lao'), (0x1000, 0x109F, 'myanmar'), (0x10A0, 0x10FF, 'georgian'),
+    (0x1100, 0x11FF, 'hangul'), (0x1200, 0x139F, 'ethiopic'), (0x1780, 0x17FF, 'khmer'),
+    (0x1E00, 0x1EFF, 'latin'), (0x3040, 0x30FF, 'kana'), (0x3400, 0x4DBF, 'han'),
+    (0x4E00, 0x9FFF, 'han'), (0xAC00, 0xD7AF, 'hangul'), (0xFB50, 0xFDFF, 'arabic'),
+]
+
+# Languages written in each script; None means "ask the n-gram model"
+SCRIPT_LANGUAGES = {
+    'devanagari': ['hi', 'mr', 'ne', 'sa'], 'bengali': ['bn', 'as'], 'gurmukhi': ['pa'],
+    'gujarati': ['gu'], 'oriya': ['or'], 'tamil': ['ta'], 'telugu': ['te'], 'kannada': ['kn'],
+    'malayalam': ['ml'], 'sinhala': ['si'], 'thaana': ['dv'], 'arabic': ['ar', 'ur', 'fa', 'ps'],
+    'hebrew': ['he'], 'greek': ['el'], 'thai': ['th'], 'lao': ['lo'], 'khmer': ['km'],
+    'myanmar': ['my'], 'georgian': ['ka'], 'armenian': ['hy'], 'ethiopic': ['am'],
+    'hangul': ['ko'], 'kana': ['ja'], 'han': ['zh'],
+    'cyrillic': ['ru', 'uk', 'bg', 'sr', 'mk', 'kk', 'ky', 'mn', 'tg'],
+    'latin': None,
+}
+
+_RANGE_STARTS = np.array([r[0] for r in SCRIPT_RANGES], dtype=np.uint32)
+_RANGE_ENDS = np.array([r[1] for r in SCRIPT_RANGES], dtype=np.uint32)
+SCRIPTS = sorted({r[2] for r in SCRIPT_RANGES})
+_RANGE_SCRIPT_IDS = np.array([SCRIPTS.index(r[2]) for r in SCRIPT_RANGES], dtype=np.int64)
+_NON_LETTERS = re.compile(r"[\W\d_]+", re.UNICODE)
+
+
+def script_counts_batch(texts: List[str]) -> np.ndarray:
+    """Characters per script for every text at once, shape (len(texts), len(SCRIPTS))"""
+    n_scripts = len(SCRIPTS)
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    owner = np.repeat(np.arange(len(texts)), [len(text) for text in texts])
+    slot = np.searchsorted(_RANGE_STARTS, codes, side="right") - 1
+    valid = (slot >= 0) & (codes <= _RANGE_ENDS[np.clip(slot, 0, None)])
+    flat = owner[valid] * n_scripts + _RANGE_SCRIPT_IDS[slot[valid]]
+    return np.bincount(flat, minlength=len(texts) * n_scripts).reshape(len(texts), n_scripts)
+
+
+def script_counts(text: str) -> Dict[str, int]:
+    """Characters per script for a single text"""
+    row = script_counts_batch([text])[0]
+    return {SCRIPTS[i]: int(row[i]) for i in np.flatnonzero(row)}
+
+
+def extract_ngrams(text: str, max_n: int = MAX_NGRAM) -> List[str]:
+    """Space-padded 1..max_n character n-grams of each word, lowercased"""
+    ngrams = []
+    for word in _NON_LETTERS.sub(" ", text.lower()).split():
+        padded = f" {word} "
+        for n in range(1, max_n + 1):
+            for i in range(len(padded) - n + 1):
+                gram = padded[i:i + n]
+                if gram != " ":
+                    ngrams.append(gram)
+    return ngrams
+
+
+class NGramProfileIndex:
+    """Log-probability matrix of shape (n-grams, languages) with a vocabulary lookup"""
+
+    def __init__(self, languages: List[str], ngrams: List[str], log_probs: np.ndarray):
+        self.languages = languages
+        self.language_index = {lang: i for i, lang in enumerate(languages)}
+        self.vocab = {gram: i for i, gram in enumerate(ngrams)}
+        self.ngrams = ngrams
+        self.log_probs = log_probs
+
+    @classmethod
+    def from_langdetect_profiles(cls, profile_dir: Optional[str] = None) -> "NGramProfileIndex":
+        if profile_dir is None:
+            import langdetect
+            profile_dir = os.path.join(os.path.dirname(langdetect.__file__), "profiles")
+
+        profiles = {}
+        for name in sorted(os.listdir(profile_dir)):
+            lang = PROFILE_ALIASES.get(name, name)
+            if lang in profiles:
+                continue
+            with open(os.path.join(profile_dir, name), "r", encoding="utf-8") as f:
+                profiles[lang] = json.load(f)
+
+        languages = sorted(profiles)
+        ngrams = sorted({gram for profile in profiles.values() for gram in profile["freq"]})
+        vocab = {gram: i for i, gram in enumerate(ngrams)}
+        probs = np.zeros((len(ngrams), len(languages)), dtype=np.float64)
+        for col, lang in enumerate(languages):
+            profile = profiles[lang]
+            totals = profile["n_words"]
+            for gram, count in profile["freq"].items():
+                n = len(gram)
+                if 1 <= n <= MAX_NGRAM and totals[n - 1]:
+                    probs[vocab[gram], col] = count / totals[n - 1]
+        return cls(languages, ngrams, np.log(probs + SMOOTHING).astype(np.float32))
+
+    @classmethod
+    def load(cls, path: str) -> "NGramProfileIndex":
+        data = np.load(path, allow_pickle=False)
+        return cls([str(lang) for lang in data["languages"]], [str(gram) for gram in data["ngrams"]],
+                   data["log_probs"])
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(path, languages=np.array(self.languages), ngrams=np.array(self.ngrams),
+                            log_probs=self.log_probs)
+
+    def score_batch(self, texts: List[str]) -> np.ndarray:
+        """Summed log-likelihoods, shape (len(texts), languages)"""
+        ids, offsets = [], []
+        for text in texts:
+            offsets.append(len(ids))
+            ids.extend(self.vocab[gram] for gram in extract_ngrams(text) if gram in self.vocab)
+        scores = np.zeros((len(texts), len(self.languages)), dtype=np.float32)
+        if not ids:
+            return scores
+        rows = self.log_probs[np.asarray(ids)]
+        # reduceat needs strictly valid offsets; texts with no known n-grams keep zeros
+        ends = offsets[1:] + [len(ids)]
+        nonempty = [i for i, (start, end) in enumerate(zip(offsets, ends)) if end > start]
+        if nonempty:
+            scores[nonempty] = np.add.reduceat(rows, [offsets[i] for i in nonempty], axis=0)
+        return scores
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class LanguageIdentifier:
+    """Script shortcut + n-gram (or fastText) model + memo cache"""
+
+    def __init__(self, index_path: str = LANGID_INDEX_PATH, fasttext_path: str = FASTTEXT_LID_MODEL,
+                 cache_size: int = LANGID_CACHE_SIZE):
+        self.index = self._load_index(index_path)
+        self.fasttext_model = None
+        if fasttext is not None and os.path.exists(fasttext_path):
+            logger.info(f"Loading fastText language ID model from {fasttext_path}")
+            self.fasttext_model = fasttext.load_model(fasttext_path)
+        self.cache = LRUCache(cache_size)
+
+    @staticmethod
+    def _load_index(path: str) -> NGramProfileIndex:
+        if os.path.exists(path):
+            return NGramProfileIndex.load(path)
+        logger.info("Building n-gram language index from langdetect profiles")
+        index = NGramProfileIndex.from_langdetect_profiles()
+        try:
+            index.save(path)
+        except OSError as e:
+            logger.warning(f"Could not cache language index at {path}: {e}")
+        return index
+
+    @staticmethod
+    def script_candidates(counts: Dict[str, int]) -> Tuple[Optional[List[str]], float]:
+        """Candidate languages for the dominant script and that script's share of letters"""
+        if not counts:
+            return None, 0.0
+        if 'kana' in counts and 'han' in counts:
+            # Japanese mixes kanji with kana; Chinese never uses kana
+            counts['kana'] += counts.pop('han')
+        script = max(counts, key=counts.get)
+        return SCRIPT_LANGUAGES.get(script), counts[script] / sum(counts.values())
+
+    def _model_predict(self, texts: List[str], candidates: List[Optional[List[str]]]) -> List[Tuple[str, float]]:
+        if self.fasttext_model is not None:
+            labels, probs = self.fasttext_model.predict([t.replace("\n", " ") for t in texts], k=5)
+            results = []
+            for text_labels, text_probs, allowed in zip(labels, probs, candidates):
+                pairs = [(label.replace("__label__", ""), float(p)) for label, p in zip(text_labels, text_probs)]
+                if allowed:
+                    pairs = [pair for pair in pairs if pair[0] in allowed] or pairs
+                results.append(pairs[0])
+            return results
+
+        scores = self.index.score_batch(texts)
+        for row, allowed in enumerate(candidates):
+            if allowed:
+                mask = np.full(scores.shape[1], -np.inf, dtype=np.float32)
+                mask[[self.index.language_index[lang] for lang in allowed]] = 0.0
+                scores[row] += mask
+        probs = np.exp(scores - scores.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [(self.index.languages[b], float(probs[row, b])) for row, b in enumerate(best)]
+
+    def detect_batch(self, texts: List[str]) -> List[Dict[str, any]]:
+        """Detect the language of each text; results are dicts with language/confidence/method"""
+        results = [None] * len(texts)
+        keys = [text.strip() for text in texts]
+        misses = []
+        for i, key in enumerate(keys):
+            results[i] = self.cache.get(key)
+            if results[i] is None:
+                misses.append(i)
+        if not misses:
+            return results
+
+        pending, pending_candidates = [], []
+        counts = script_counts_batch([keys[i] for i in misses])
+        for i, row in zip(misses, counts):
+            key = keys[i]
+            candidates, share = self.script_candidates(
+                {SCRIPTS[s]: int(row[s]) for s in np.flatnonzero(row)})
+            if candidates is not None and len(candidates) == 1:
+                results[i] = {'language': candidates[0], 'confidence': share, 'method': 'script'}
+                self.cache.put(key, results[i])
+                continue
+            if candidates is not None:
+                known = [lang for lang in candidates if lang in self.index.language_index]
+                if len(known) <= 1:
+                    language = known[0] if known else candidates[0]
+                    results[i] = {'language': language, 'confidence': share, 'method': 'script'}
+                    self.cache.put(key, results[i])
+                    continue
+                candidates = known
+            if not key:
+                results[i] = {'language': 'unknown', 'confidence': 0.0, 'method': 'none'}
+                continue
+            pending.append(i)
+            pending_candidates.append(candidates)
+
+        if pending:
+            method = 'fasttext' if self.fasttext_model is not None else 'ngram'
+            predictions = self._model_predict([keys[i] for i in pending], pending_candidates)
+            for i, (language, confidence) in zip(pending, predictions):
+                results[i] = {'language': language, 'confidence': confidence, 'method': method}
+                self.cache.put(keys[i], results[i])
+        return results
+
+    def detect(self, text: str) -> Dict[str, any]:
+        return self.detect_batch([text])[0]
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {"size": len(self.cache), "hits": self.cache.hits, "misses": self.cache.misses}
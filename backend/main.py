@@ -1,142 +1,391 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse
+from starlette.routing import Match
 import numpy as np
 import cv2
-from tensorflow.keras.models import load_model  # type: ignore
 import json
+import functools
 import tempfile
 import os
-import tensorflow as tf
+import time
+import metrics
+import serving
+import uploads
+from typing import List, Optional
+from preprocessing import (IMG_SIZE, TENSOR_CONTENT_TYPE, allocate_clip, preprocess_frame, read_clip, pad_features,
+                           decode_frame_bundle, decode_tensor_blob)
+from prediction_cache import PredictionCache, EmbeddingCache, content_hash, content_hasher, embed_clip
+from calibration import format_predictions
+from segmentation import SEGMENT_HOP, SEGMENT_WINDOW_SECONDS, video_posteriors, segmentation_response
+from model_registry import ModelRegistry, register_registry_gauges
 
 app = FastAPI()
+# Thread pools must be sized before TensorFlow runs its first op
+serving.configure_threads()
 
 # ------------------------
-# Load trained models
+# Models
 # ------------------------
+# Versioned models, loaded and warmed up off the request path and swapped in when new files appear
+# (model_registry.py). Each request holds one version from start to finish
+model_registry = ModelRegistry()
+model_registry.start()
+register_registry_gauges(model_registry)
 
-# Video model + labels
-VIDEO_MODEL_PATH = "sign_model_weights.keras"
-video_model = load_model(VIDEO_MODEL_PATH)
-
-with open("labels.json", "r") as f:
-    video_class_names = json.load(f)
-
-# Image model + labels
-IMAGE_MODEL_PATH = "sign_image_model.keras"
-image_model = load_model(IMAGE_MODEL_PATH)
-
-with open("labels_image.json", "r") as f:
-    image_class_names = json.load(f)
+# Quantized TFLite exports for the app's on-device mode (export_tflite.py)
+MOBILE_DIR = "mobile"
+MOBILE_MANIFEST_PATH = os.path.join(MOBILE_DIR, "manifest.json")
 
 # ------------------------
-# Shared configs
+# Caches
 # ------------------------
-IMG_SIZE = 128
-MAX_FRAMES = 5
-
-# Base MobileNetV2 for video feature extraction
-base_model = tf.keras.applications.MobileNetV2(
-    input_shape=(IMG_SIZE, IMG_SIZE, 3),
-    include_top=False,
-    pooling="avg",
-    weights="imagenet"
-)
-base_model.trainable = False
+# Softmax outputs keyed by upload hash + model version; embeddings keyed by perceptual frame hash
+prediction_cache = PredictionCache()
+embedding_cache = EmbeddingCache()
 
+for cache_name, cache in (("sign_prediction", prediction_cache), ("sign_embedding", embedding_cache)):
+    metrics.register_gauge("chatterbridge_cache_hit_ratio", "Cache hits / lookups",
+                           metrics.hit_ratio(lambda c=cache: c.hits, lambda c=cache: c.misses), cache=cache_name)
+    metrics.register_gauge("chatterbridge_cache_lookups", "Cache lookups by result",
+                           lambda c=cache: c.hits, cache=cache_name, result="hit")
+    metrics.register_gauge("chatterbridge_cache_lookups", "Cache lookups by result",
+                           lambda c=cache: c.misses, cache=cache_name, result="miss")
+metrics.register_gauge("chatterbridge_cache_bytes", "Bytes held in a cache",
+                       lambda: embedding_cache.size, cache="sign_embedding")
 
 # ------------------------
-# Helpers
+# Upload limits and admission control
 # ------------------------
-def preprocess_frame(frame):
-    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    frame = cv2.resize(frame, (IMG_SIZE, IMG_SIZE))
-    frame = frame.astype("float32") / 255.0
-    return frame
-
-
-def sample_frames(video_path, max_frames=MAX_FRAMES):
-    cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    frames = []
-    if total_frames == 0:
-        cap.release()
-        return [np.zeros((IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)]
-    step = max(1, total_frames // max_frames)
-    for i in range(0, total_frames, step):
-        cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-        ret, frame = cap.read()
-        if not ret:
-            continue
-        frames.append(preprocess_frame(frame))
-        if len(frames) >= max_frames:
-            break
-    cap.release()
-    return frames
-
-
-def pad_features(features, max_frames=MAX_FRAMES):
-    n = len(features)
-    feature_dim = features[0].shape[0]
-    if n < max_frames:
-        pad = np.repeat(features[-1][np.newaxis, :], max_frames - n, axis=0)
-        features = np.vstack([features, pad])
-    else:
-        features = np.array(features[:max_frames])
-    return features
+# Inference endpoints: byte limit checked against Content-Length before the body is read
+UPLOAD_LIMITS = {
+    "/detect-video": uploads.MAX_VIDEO_UPLOAD_BYTES,
+    "/detect-frames": uploads.MAX_FRAMES_UPLOAD_BYTES,
+    "/detect-sign": uploads.MAX_IMAGE_UPLOAD_BYTES,
+}
+# Requests running inference at once (they share the CPU's TF thread pool) and requests allowed to wait
+SIGN_MAX_CONCURRENT = int(os.environ.get("SIGN_MAX_CONCURRENT", 2))
+SIGN_MAX_QUEUE = int(os.environ.get("SIGN_MAX_QUEUE", 8))
+sign_admission = uploads.AdmissionController("sign", SIGN_MAX_CONCURRENT, SIGN_MAX_QUEUE)
+uploads.register_admission_gauges(sign_admission)
 
 
 # ------------------------
 # Endpoints
 # ------------------------
 
+# Oversized uploads, and everything once the inference backlog is full, are turned away before the
+# body is read; chunked bodies stop being read at the limit
+app.add_middleware(uploads.UploadLimitMiddleware, limits=UPLOAD_LIMITS, admission=sign_admission)
+
+
+def route_template(request: Request) -> str:
+    """The matched route's path template (e.g. /mobile/{filename}), so metric labels stay bounded"""
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    # Requests rejected by the upload middleware never reach the router
+    for candidate in app.router.routes:
+        if candidate.matches(request.scope)[0] == Match.FULL:
+            return candidate.path
+    return "unmatched"
+
+
+# Registered last so it is the outermost middleware and also times rejected requests
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    metrics.observe_request(route_template(request), response.status_code, time.perf_counter() - start,
+                            service="sign")
+    return response
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/mobile/manifest.json")
+async def mobile_manifest():
+    """On-device models exported by export_tflite.py, with labels and calibration"""
+    if not os.path.exists(MOBILE_MANIFEST_PATH):
+        return JSONResponse({"error": "No mobile models exported"}, status_code=404)
+    with open(MOBILE_MANIFEST_PATH) as f:
+        manifest = json.load(f)
+    for entry in manifest["models"].values():
+        entry["url"] = f"/mobile/{entry['file']}"
+    return manifest
+
+
+@app.get("/mobile/{filename}")
+async def mobile_model(filename: str):
+    path = os.path.join(MOBILE_DIR, os.path.basename(filename))
+    if not filename.endswith(".tflite") or not os.path.exists(path):
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    return FileResponse(path, media_type="application/octet-stream")
+
+
+@app.get("/capabilities")
+async def capabilities():
+    """Input geometry and frame budget, so clients can downscale before uploading"""
+    models = model_registry.active
+    return {
+        "input": {"width": IMG_SIZE, "height": IMG_SIZE, "channels": 3, "color": "RGB", "dtype": "uint8"},
+        "video": {"max_frames": models.max_frames, "sampling": "evenly spaced; shorter clips repeat the last frame"},
+        "endpoints": {
+            "/detect-sign": ["image/jpeg", "image/png", TENSOR_CONTENT_TYPE],
+            "/detect-video": ["video/mp4"],
+            "/detect-frames": ["multipart frames (image/jpeg, image/png)", TENSOR_CONTENT_TYPE],
+        },
+        "tensor_layout": f"row-major uint8 (frames, {IMG_SIZE}, {IMG_SIZE}, 3), RGB, no header",
+        "inference": serving.describe(),
+        "model_version": models.version,
+        "limits": {
+            "upload_bytes": UPLOAD_LIMITS,
+            "video_seconds": {"clip": uploads.MAX_VIDEO_SECONDS, "segment": uploads.MAX_SEGMENT_VIDEO_SECONDS},
+            "video_pixels": uploads.MAX_VIDEO_PIXELS,
+        },
+    }
+
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return {"prediction": prediction_cache.stats(), "embedding": embedding_cache.stats()}
+
+
+@app.get("/admission-stats")
+async def admission_stats():
+    return sign_admission.stats()
+
+
+@app.get("/models")
+async def models_status():
+    """Active and canary versions with per-version latency, loads in progress, drains and failures"""
+    return model_registry.stats()
+
+
+@app.post("/models/reload")
+def reload_models():
+    """Load the newest version now instead of waiting for the watcher (runs in the threadpool)"""
+    models = model_registry.reload()
+    return {"loaded": models.version if models else None, **model_registry.stats()}
+
+
+@app.post("/models/promote")
+async def promote_models():
+    version = model_registry.promote()
+    if version is None:
+        return JSONResponse({"error": "No canary version to promote"}, status_code=409)
+    return {"active": version}
+
+
+@app.post("/models/discard")
+async def discard_models():
+    version = model_registry.discard()
+    if version is None:
+        return JSONResponse({"error": "No canary version to discard"}, status_code=409)
+    return {"discarded": version}
+
+
+def classify_clip(models, clip):
+    """Softmax over video classes for a (T, IMG_SIZE, IMG_SIZE, 3) uint8 clip"""
+    start = time.perf_counter()
+    with metrics.stage("backbone", service="sign"):
+        features = embed_clip(models.base_model, clip, embedding_cache, models.backbone_version)
+        features = pad_features(features, models.max_frames)
+        features = np.expand_dims(features, axis=0)
+
+    with metrics.stage("head", service="sign"):
+        pred = models.video_model.predict(features, verbose=0)
+    models.observe(time.perf_counter() - start)
+    return pred[0]
+
+
+def prediction_response(models, pred, class_names, temperature, top_k, threshold, cache_status):
+    result = format_predictions(pred, class_names, temperature, top_k, threshold)[0]
+    return JSONResponse(result, headers={"X-Prediction-Cache": cache_status, "X-Model-Version": models.version})
+
+
+def embed_frames(models, frames):
+    with metrics.stage("backbone", service="sign"):
+        return embed_clip(models.base_model, frames, embedding_cache, models.backbone_version)
+
+
+def classify_windows(models, windows):
+    with metrics.stage("head", service="sign"):
+        return models.video_model.predict(windows, verbose=0)
+
+
+def segment_video(models, path: str, digest: str, window_seconds: float, hop: int, threshold: Optional[float]):
+    """Timestamped label sequence for a continuous signing video (see segmentation.py)"""
+    cache_key = ("video-segment", models.video_version, digest, window_seconds, hop)
+    cached = prediction_cache.get(cache_key)
+    cache_status = "hit" if cached is not None else "miss"
+    if cached is None:
+        uploads.check_video(path, uploads.MAX_SEGMENT_VIDEO_SECONDS)
+        start = time.perf_counter()
+        cached = video_posteriors(path, functools.partial(embed_frames, models),
+                                  functools.partial(classify_windows, models), models.max_frames,
+                                  models.video_temperature, window_seconds, hop)
+        models.observe(time.perf_counter() - start)
+        prediction_cache.put(cache_key, cached)
+    result = segmentation_response(cached, models.video_class_names, threshold)
+    return JSONResponse(result, headers={"X-Prediction-Cache": cache_status, "X-Model-Version": models.version})
+
+
+def admitted(endpoint):
+    """Run an inference endpoint inside a sign_admission slot; 429/503 with Retry-After when saturated.
+
+    Endpoints are plain functions so FastAPI runs them (and the wait for a slot) in its
+    threadpool, leaving the event loop free to parse uploads and shed load while models run.
+    """
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        try:
+            sign_admission.acquire()
+        except uploads.Overloaded as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status, headers=e.headers())
+        start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            sign_admission.release(time.perf_counter() - start)
+    return wrapper
+
+
 @app.post("/detect-video")
-async def detect_video(file: UploadFile = File(...)):
+@admitted
+def detect_video(file: UploadFile = File(...), top_k: int = Form(0), threshold: Optional[float] = Form(None),
+                 mode: str = Form("clip"), window_seconds: float = Form(SEGMENT_WINDOW_SECONDS),
+                 hop: int = Form(SEGMENT_HOP)):
+    """Classify a video as one sign (mode=clip) or as a sequence of signs (mode=segment)"""
+    if mode not in ("clip", "segment"):
+        return JSONResponse({"error": "mode must be clip or segment"}, status_code=400)
+    if mode == "segment" and (window_seconds <= 0 or hop < 1):
+        return JSONResponse({"error": "window_seconds must be > 0 and hop >= 1"}, status_code=400)
+    # OpenCV's demuxer needs a path; the upload is copied there in chunks and hashed on the way
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
     try:
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-        tmp.write(await file.read())
-        tmp.close()
+        with metrics.stage("upload", service="sign"):
+            hasher = content_hasher()
+            with tmp:
+                uploads.copy_upload(file.file, tmp, uploads.MAX_VIDEO_UPLOAD_BYTES, hasher)
+            digest = hasher.hexdigest()
+        with model_registry.use() as models:
+            if mode == "segment":
+                return segment_video(models, tmp.name, digest, window_seconds, hop, threshold)
 
-        frames = sample_frames(tmp.name)
-        features = [base_model.predict(np.expand_dims(f, axis=0), verbose=0)[0] for f in frames]
-        features = pad_features(features)
-        features = np.expand_dims(features, axis=0)
+            cache_key = ("video", models.video_version, digest)
+            cached = prediction_cache.get(cache_key)
+            if cached is not None:
+                return prediction_response(models, cached["probabilities"], models.video_class_names,
+                                           models.video_temperature, top_k, threshold, "hit")
 
-        pred = video_model.predict(features, verbose=0)
-        index = int(np.argmax(pred[0]))
-        confidence = float(np.max(pred[0]))
+            with metrics.stage("decode", service="sign"):
+                uploads.check_video(tmp.name, uploads.MAX_VIDEO_SECONDS)
+                clip = read_clip(tmp.name, models.max_frames)
 
+            probabilities = classify_clip(models, clip)
+            prediction_cache.put(cache_key, {"probabilities": probabilities})
+            return prediction_response(models, probabilities, models.video_class_names, models.video_temperature,
+                                       top_k, threshold, "miss")
+
+    except uploads.UploadRejected as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
         os.unlink(tmp.name)
 
-        return JSONResponse({
-            "label": video_class_names[index],
-            "confidence": confidence
-        })
 
+@app.post("/detect-frames")
+@admitted
+def detect_frames(frames: Optional[List[UploadFile]] = File(None), tensor: Optional[UploadFile] = File(None),
+                  top_k: int = Form(0), threshold: Optional[float] = Form(None)):
+    """Video classification from client-side sampled frames, skipping video decode.
+
+    Either `frames` (several JPEG/PNG parts, ideally MAX_FRAMES at IMG_SIZE) or
+    one `tensor` part of raw uint8 RGB frames, see /capabilities.
+    """
+    try:
+        with metrics.stage("upload", service="sign"):
+            if tensor is not None:
+                data = uploads.read_upload(tensor.file, uploads.MAX_FRAMES_UPLOAD_BYTES)
+                parts = [data]
+            elif frames:
+                parts = uploads.read_uploads([frame.file for frame in frames], uploads.MAX_FRAMES_UPLOAD_BYTES)
+            else:
+                return JSONResponse({"error": "Send `frames` or `tensor`"}, status_code=400)
+        # Each part's length is hashed with it, so different splits of the same bytes get different keys
+        hasher = content_hasher()
+        for part in parts:
+            hasher.update(len(part).to_bytes(8, "little"))
+            hasher.update(part)
+        with model_registry.use() as models:
+            cache_key = ("frames", models.video_version, "tensor" if tensor is not None else "bundle",
+                         hasher.hexdigest())
+            cached = prediction_cache.get(cache_key)
+            if cached is not None:
+                return prediction_response(models, cached["probabilities"], models.video_class_names,
+                                           models.video_temperature, top_k, threshold, "hit")
+
+            with metrics.stage("decode", service="sign"):
+                try:
+                    clip = decode_tensor_blob(data, models.max_frames) if tensor is not None else \
+                        decode_frame_bundle(parts, models.max_frames)
+                except ValueError as e:
+                    return JSONResponse({"error": str(e)}, status_code=400)
+
+            probabilities = classify_clip(models, clip)
+            prediction_cache.put(cache_key, {"probabilities": probabilities})
+            return prediction_response(models, probabilities, models.video_class_names, models.video_temperature,
+                                       top_k, threshold, "miss")
+
+    except uploads.UploadRejected as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
 @app.post("/detect-sign")
-async def detect_sign(file: UploadFile = File(...)):
+@admitted
+def detect_sign(file: UploadFile = File(...), top_k: int = Form(0), threshold: Optional[float] = Form(None)):
     try:
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg")
-        tmp.write(await file.read())
-        tmp.close()
-
-        img = cv2.imread(tmp.name)
-        img = preprocess_frame(img)
-        img = np.expand_dims(img, axis=0)
+        with metrics.stage("upload", service="sign"):
+            data = uploads.read_upload(file.file, uploads.MAX_IMAGE_UPLOAD_BYTES)
+        with model_registry.use() as models:
+            tensor = file.content_type == TENSOR_CONTENT_TYPE
+            cache_key = ("image", models.image_version, "tensor" if tensor else "encoded", content_hash(data))
+            cached = prediction_cache.get(cache_key)
+            if cached is not None:
+                return prediction_response(models, cached["probabilities"], models.image_class_names,
+                                           models.image_temperature, top_k, threshold, "hit")
 
-        pred = image_model.predict(img, verbose=0)
-        index = int(np.argmax(pred[0]))
-        confidence = float(np.max(pred[0]))
+            if tensor:
+                if len(data) != IMG_SIZE * IMG_SIZE * 3:
+                    return JSONResponse({"error": f"Tensor upload must be exactly one {IMG_SIZE}x{IMG_SIZE}x3 "
+                                                  f"uint8 frame ({IMG_SIZE * IMG_SIZE * 3} bytes), "
+                                                  f"got {len(data)} bytes"}, status_code=400)
+                img = decode_tensor_blob(data, 1)
+            else:
+                with metrics.stage("decode", service="sign"):
+                    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if frame is None:
+                        return JSONResponse({"error": "Could not decode image"}, status_code=400)
+                with metrics.stage("preprocess", service="sign"):
+                    img = allocate_clip(1)
+                    preprocess_frame(frame, img[0])
 
-        os.unlink(tmp.name)
+            start = time.perf_counter()
+            with metrics.stage("model", service="sign"):
+                pred = models.image_model.predict(img, verbose=0)
+            models.observe(time.perf_counter() - start)
 
-        return JSONResponse({
-            "label": image_class_names[index],
-            "confidence": confidence
-        })
+            prediction_cache.put(cache_key, {"probabilities": pred[0]})
+            return prediction_response(models, pred[0], models.image_class_names, models.image_temperature,
+                                       top_k, threshold, "miss")
 
+    except uploads.UploadRejected as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
@@ -0,0 +1,214 @@
+"""
+Lightweight request tracing and Prometheus metrics shared by app.py and main.py.
+
+- stage("decode", service="sign") times a block into the
+  chatterbridge_stage_seconds histogram (and an OpenTelemetry span when enabled)
+- observe_request() feeds per-endpoint request counters and latency histograms
+- register_gauge() exposes values computed at scrape time (cache hit ratios,
+  queue depths) without touching the hot path
+- render() produces the Prometheus text exposition format for /metrics
+
+Set METRICS_ENABLED=0 to turn everything into shared no-ops. Set
+OTEL_TRACING=1 (with opentelemetry-api installed and configured) to also emit spans.
+"""
+
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+OTEL_TRACING = os.environ.get("OTEL_TRACING", "0").lower() in ("1", "true", "yes")
+
+tracer = None
+if METRICS_ENABLED and OTEL_TRACING:
+    try:
+        from opentelemetry import trace
+        tracer = trace.get_tracer("chatterbridge")
+    except ImportError:
+        tracer = None
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Dict[str, str] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in self.values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}  # key -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in self.series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': str(bound)})} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}  # name -> (help, callback returning {label dict tuple: value} or a number)
+        self.lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        with self.lock:
+            if name not in self.counters:
+                self.counters[name] = Counter(name, help_text)
+            return self.counters[name]
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(name, help_text, buckets)
+            return self.histograms[name]
+
+    def register_gauge(self, name: str, help_text: str, callback: Callable, **labels):
+        """Add a gauge whose value is read from callback() at scrape time"""
+        with self.lock:
+            entry = self.gauges.setdefault(name, (help_text, []))
+            entry[1].append((_label_key(labels), callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.counters.values()) + list(self.histograms.values()):
+            lines.extend(metric.render())
+        for name, (help_text, series) in self.gauges.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for key, callback in series:
+                try:
+                    value = float(callback())
+                except Exception:
+                    continue  # a broken callback must not take down /metrics
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+stage_seconds = registry.histogram("chatterbridge_stage_seconds", "Time spent in each pipeline stage")
+requests_total = registry.counter("chatterbridge_requests_total", "HTTP requests by endpoint and status")
+request_seconds = registry.histogram("chatterbridge_request_seconds", "HTTP request latency by endpoint")
+
+
+class _NoopContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopContext()
+
+
+@contextmanager
+def _timed_stage(name: str, service: str):
+    start = time.perf_counter()
+    # Recorded in finally so stages that raise (decode errors, upstream failures) are counted too
+    try:
+        if tracer is not None:
+            with tracer.start_as_current_span(f"{service}.{name}"):
+                yield
+        else:
+            yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, service=service, stage=name)
+
+
+def stage(name: str, service: str = "speech"):
+    """Context manager timing one pipeline stage; a shared no-op when metrics are off"""
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _timed_stage(name, service)
+
+
+def record_stage(name: str, seconds: float, service: str = "speech"):
+    """Record a duration measured elsewhere (e.g. inside a worker thread)"""
+    if METRICS_ENABLED:
+        stage_seconds.observe(seconds, service=service, stage=name)
+
+
+def observe_request(endpoint: str, status: int, seconds: float, service: str):
+    if METRICS_ENABLED:
+        requests_total.inc(service=service, endpoint=endpoint, status=status)
+        request_seconds.observe(seconds, service=service, endpoint=endpoint)
+
+
+def register_gauge(name: str, help_text: str, callback: Callable, **labels):
+    if METRICS_ENABLED:
+        registry.register_gauge(name, help_text, callback, **labels)
+
+
+def hit_ratio(hits: Callable[[], int], misses: Callable[[], int]) -> Callable[[], float]:
+    """Build a gauge callback computing hits / (hits + misses)"""
+    def ratio():
+        total = hits() + misses()
+        return hits() / total if total else 0.0
+    return ratio
+
+
+def render() -> str:
+    return registry.render()
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
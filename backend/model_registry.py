@@ -0,0 +1,461 @@
+"""
+Versioned sign models with hot reload and zero-downtime swaps for main.py.
+
+Layout: MODEL_DIR (default models/) holds one directory per version, each with
+the files the training scripts write:
+
+    models/20261019-0600/sign_model_weights.keras, labels.json,
+                         sign_image_model.keras, labels_image.json
+                         [sign_backbone.keras, *.calibration.json]
+
+The complete version with the greatest name is served; removing or hiding
+(leading "." or "_") the newest directory rolls back to the one before it.
+Without any version directory the artifacts in the working directory are
+served as before, and reloaded when they change (training scripts, sweep.py
+and distill.py --install all write there).
+`python model_registry.py publish` copies the working directory's artifacts
+into a new version directory atomically.
+
+Reload: a watcher thread compares file names, sizes and mtimes every
+MODEL_POLL_SECONDS. A change must look the same on two polls in a row, so
+half-copied files are never loaded. The new version is loaded and warmed up in
+the background: serving.py traces and runs its fixed-shape functions, and a
+blank clip and image are classified to check the output sizes against the
+labels. Only then is it swapped in, by one reference assignment under a lock.
+Requests hold the version they started with until they finish; the old version
+is freed once its in-flight requests have drained. A version that fails to
+load is logged and skipped, and the current one keeps serving.
+
+Canary: with MODEL_CANARY_PERCENT > 0 a new version first serves that share of
+requests next to the active one, each version's latency is recorded separately
+(/models, chatterbridge_model_seconds), and POST /models/promote or
+/models/discard ends the comparison.
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import metrics
+import serving
+from calibration import load_temperature
+from preprocessing import IMG_SIZE, with_uint8_input
+from prediction_cache import model_version
+from segmentation import SEGMENT_BATCH
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+MODEL_DIR = os.environ.get("MODEL_DIR", "models")
+# 0 disables the watcher (models load once at startup)
+MODEL_POLL_SECONDS = float(os.environ.get("MODEL_POLL_SECONDS", 10))
+# Longest wait for a replaced version's in-flight requests before leaving it to the garbage collector
+MODEL_DRAIN_SECONDS = float(os.environ.get("MODEL_DRAIN_SECONDS", 60))
+# Share of requests a newly loaded version serves before it is promoted; 0 swaps it in at once
+MODEL_CANARY_PERCENT = float(os.environ.get("MODEL_CANARY_PERCENT", 0))
+# "imagenet" for serving; "none" gives random weights for offline benchmarks
+BACKBONE_WEIGHTS = os.environ.get("BACKBONE_WEIGHTS", "imagenet")
+
+VIDEO_MODEL_FILE = "sign_model_weights.keras"
+VIDEO_LABELS_FILE = "labels.json"
+IMAGE_MODEL_FILE = "sign_image_model.keras"
+IMAGE_LABELS_FILE = "labels_image.json"
+# Distilled video backbone (distill.py); MobileNetV2 when absent
+BACKBONE_FILE = "sign_backbone.keras"
+REQUIRED_FILES = (VIDEO_MODEL_FILE, VIDEO_LABELS_FILE, IMAGE_MODEL_FILE, IMAGE_LABELS_FILE)
+OPTIONAL_FILES = (BACKBONE_FILE, "sign_model_weights.calibration.json", "sign_image_model.calibration.json",
+                  "sign_backbone.calibration.json")
+# Latest per-request inference times kept per version for /models
+LATENCY_WINDOW = 512
+
+model_seconds = metrics.registry.histogram("chatterbridge_model_seconds", "Model inference time per request by version")
+
+
+class SignModels:
+    """One version of the sign models: compiled models, labels, calibration and cache keys.
+
+    Requests take it with ModelRegistry.use() and keep it for their whole
+    duration, so a swap never mixes one version's labels with another's model.
+    """
+
+    def __init__(self, version: str, directory: str):
+        import tensorflow as tf
+        from tensorflow.keras.models import load_model  # type: ignore
+
+        start = time.perf_counter()
+        self.version = version
+        self.directory = directory
+        self.fingerprint = fingerprint(directory)
+
+        video_model = load_model(self.path(VIDEO_MODEL_FILE))
+        # Frames per clip the video head was trained with (train_video_model.MAX_FRAMES)
+        self.max_frames = video_model.input_shape[1]
+        self.video_class_names = _read_labels(self.path(VIDEO_LABELS_FILE))
+        self.video_temperature = load_temperature(self.path(VIDEO_MODEL_FILE))
+        # Takes uint8 frames; scaling to [0, 1] runs in the graph
+        image_model = with_uint8_input(load_model(self.path(IMAGE_MODEL_FILE)))
+        self.image_class_names = _read_labels(self.path(IMAGE_LABELS_FILE))
+        self.image_temperature = load_temperature(self.path(IMAGE_MODEL_FILE))
+
+        if os.path.exists(self.path(BACKBONE_FILE)):
+            base_model = load_model(self.path(BACKBONE_FILE))
+            backbone_id = model_version(self.path(BACKBONE_FILE))
+        else:
+            base_model = tf.keras.applications.MobileNetV2(
+                input_shape=(IMG_SIZE, IMG_SIZE, 3), include_top=False, pooling="avg",
+                weights=None if BACKBONE_WEIGHTS.lower() == "none" else BACKBONE_WEIGHTS)
+            backbone_id = BACKBONE_WEIGHTS
+        base_model.trainable = False
+        if base_model.output_shape[-1] != video_model.input_shape[-1]:
+            raise ValueError(f"{VIDEO_MODEL_FILE} expects {video_model.input_shape[-1]}-d frame features but the "
+                             f"backbone produces {base_model.output_shape[-1]}; install the matching "
+                             f"{BACKBONE_FILE} or remove it")
+
+        # Fixed-shape compiled functions, traced and run once here (serving.py). The backbone sees single
+        # frames (embedding cache misses) and whole clips; the heads see one sample, or a batch of windows
+        # when segmenting continuous video
+        self.video_model = serving.serving_model(video_model, "head", (1, SEGMENT_BATCH))
+        self.image_model = serving.serving_model(image_model, "image", (1,))
+        self.base_model = serving.serving_model(with_uint8_input(base_model), "backbone", (1, self.max_frames))
+
+        # Cache keys: outputs of one version never answer for another
+        self.backbone_version = f"{backbone_id}-{serving.precision('backbone')}"
+        self.video_version = (f"{model_version(self.path(VIDEO_MODEL_FILE))}-{serving.precision('head')}-"
+                              f"{self.backbone_version}")
+        self.image_version = f"{model_version(self.path(IMAGE_MODEL_FILE))}-{serving.precision('image')}"
+
+        self.check()
+        self.load_seconds = time.perf_counter() - start
+        self.loaded_at = time.time()
+        self.condition = threading.Condition()
+        self.inflight = 0
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def check(self):
+        """Classify a blank clip and image end to end; output sizes must match the labels"""
+        blank = np.zeros((self.max_frames, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+        features = self.base_model.predict(blank, verbose=0)
+        video = self.video_model.predict(features[np.newaxis], verbose=0)
+        image = self.image_model.predict(blank[:1], verbose=0)
+        for name, output, labels in (("video", video, self.video_class_names),
+                                     ("image", image, self.image_class_names)):
+            if output.shape[-1] != len(labels):
+                raise ValueError(f"{name} model has {output.shape[-1]} outputs but {len(labels)} labels")
+
+    def observe(self, seconds: float):
+        """Record one request's model time"""
+        self.latencies.append(seconds)
+        if metrics.METRICS_ENABLED:
+            model_seconds.observe(seconds, version=self.version)
+
+    def drain(self, timeout: float) -> bool:
+        """Wait until no request holds this version; False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.inflight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self):
+        """Drop the models so their memory can be reclaimed"""
+        self.video_model = self.image_model = self.base_model = None
+        gc.collect()
+
+    def stats(self) -> Dict:
+        latencies = np.asarray(self.latencies) * 1000
+        return {
+            "version": self.version,
+            "directory": os.path.abspath(self.directory),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at)),
+            "load_seconds": round(self.load_seconds, 2),
+            "max_frames": self.max_frames,
+            "classes": {"video": len(self.video_class_names), "image": len(self.image_class_names)},
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "model_p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            "model_p99_ms": round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+        }
+
+
+def _read_labels(path: str) -> List[str]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def fingerprint(directory: str) -> Tuple:
+    """Name, size and mtime of every model file present; changes whenever one is rewritten"""
+    parts = []
+    for filename in REQUIRED_FILES + OPTIONAL_FILES:
+        try:
+            stat = os.stat(os.path.join(directory, filename))
+        except FileNotFoundError:
+            continue
+        parts.append((filename, stat.st_size, stat.st_mtime_ns))
+    return tuple(parts)
+
+
+def is_complete(directory: str) -> bool:
+    return all(os.path.exists(os.path.join(directory, f)) for f in REQUIRED_FILES)
+
+
+def find_version(model_dir: str = MODEL_DIR, fallback_dir: str = ".") -> Optional[Tuple[str, str]]:
+    """(version, directory) to serve: the newest complete version directory, else the working directory"""
+    if os.path.isdir(model_dir):
+        names = sorted((n for n in os.listdir(model_dir) if not n.startswith((".", "_"))), reverse=True)
+        for name in names:
+            directory = os.path.join(model_dir, name)
+            if os.path.isdir(directory) and is_complete(directory):
+                return name, directory
+    if is_complete(fallback_dir):
+        # Unversioned files are named after their contents, so every rewrite is a new version
+        files = [os.path.join(fallback_dir, f) for f, _, _ in fingerprint(fallback_dir)]
+        return f"local-{model_version(*files)[:12]}", fallback_dir
+    return None
+
+
+# ------------------------
+# Registry
+# ------------------------
+class ModelRegistry:
+    """Serves one active SignModels (plus an optional canary) and swaps in new versions as they appear"""
+
+    def __init__(self, model_dir: str = MODEL_DIR, poll_seconds: float = MODEL_POLL_SECONDS,
+                 canary_percent: float = MODEL_CANARY_PERCENT, drain_seconds: float = MODEL_DRAIN_SECONDS):
+        # Resolved now: the watcher runs later, whatever the working directory is then
+        self.model_dir = os.path.abspath(model_dir)
+        self.fallback_dir = os.path.abspath(".")
+        self.poll_seconds = poll_seconds
+        self.canary_percent = canary_percent
+        self.drain_seconds = drain_seconds
+        self.lock = threading.Lock()
+        self.active: Optional[SignModels] = None
+        self.canary: Optional[SignModels] = None
+        self.loading: Optional[str] = None
+        # Fingerprint seen on the previous poll (a change must hold for two polls) and ones that failed to load
+        self.pending = None
+        self.failed: Dict[Tuple, str] = {}
+        self.events = deque(maxlen=20)
+        self.retiring: List[SignModels] = []
+
+    def start(self):
+        """Load the current version (errors propagate: the server cannot start without models), then watch"""
+        found = find_version(self.model_dir, self.fallback_dir)
+        if found is None:
+            raise FileNotFoundError(f"No sign models in {self.model_dir}/<version>/ or the working directory "
+                                    f"(need {', '.join(REQUIRED_FILES)})")
+        self.active = SignModels(*found)
+        self._event("loaded", self.active)
+        if self.poll_seconds > 0:
+            threading.Thread(target=self._watch, name="model-registry", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception(f"Model registry poll failed: {e}")
+
+    def _serving_fingerprints(self):
+        return {(m.version, m.fingerprint) for m in (self.active, self.canary) if m is not None}
+
+    def poll(self) -> Optional[SignModels]:
+        """Load and install the newest version if it changed and has settled; returns it when installed"""
+        found = find_version(self.model_dir, self.fallback_dir)
+        if found is None:
+            return None
+        version, directory = found
+        key = (version, fingerprint(directory))
+        if key in self._serving_fingerprints() or key in self.failed:
+            self.pending = None
+            return None
+        if key != self.pending:
+            self.pending = key  # wait one more poll for copies in progress to finish
+            return None
+        self.pending = None
+        return self.load(version, directory)
+
+    def reload(self) -> Optional[SignModels]:
+        """Load the newest version now, without waiting for the watcher; None if it is already served"""
+        found = find_version(self.model_dir, self.fallback_dir)
+        if found is None or (found[0], fingerprint(found[1])) in self._serving_fingerprints():
+            return None
+        self.pending = None
+        return self.load(*found)
+
+    def load(self, version: str, directory: str) -> Optional[SignModels]:
+        """Build and warm up a version off the request path, then install it"""
+        self.loading = version
+        logger.info(f"Loading sign models {version} from {directory}")
+        try:
+            models = SignModels(version, directory)
+        except Exception as e:
+            self.failed[(version, fingerprint(directory))] = str(e)
+            self.events.append({"event": "failed", "version": version, "error": str(e), "time": time.time()})
+            logger.error(f"Sign models {version} failed to load; still serving "
+                         f"{self.active.version if self.active else 'nothing'}: {e}")
+            return None
+        finally:
+            self.loading = None
+        self.install(models)
+        return models
+
+    def install(self, models: SignModels):
+        """Swap in a loaded version (or stage it as the canary); the replaced one drains in the background"""
+        with self.lock:
+            if self.canary_percent > 0 and self.active is not None:
+                replaced, self.canary = self.canary, models
+                self._event("canary", models)
+            else:
+                replaced, self.active = self.active, models
+                self._event("active", models)
+        if replaced is not None:
+            self.retire(replaced)
+
+    def promote(self) -> Optional[str]:
+        """Make the canary the active version"""
+        with self.lock:
+            if self.canary is None:
+                return None
+            replaced, self.active, self.canary = self.active, self.canary, None
+            self._event("promoted", self.active)
+        self.retire(replaced)
+        return self.active.version
+
+    def discard(self) -> Optional[str]:
+        """Stop serving the canary; it stays known so the watcher does not load it again"""
+        with self.lock:
+            canary, self.canary = self.canary, None
+        if canary is None:
+            return None
+        self.failed[(canary.version, canary.fingerprint)] = "discarded"
+        self._event("discarded", canary)
+        self.retire(canary)
+        return canary.version
+
+    def retire(self, models: SignModels):
+        """Free a replaced version after its in-flight requests finish"""
+        def drain():
+            if models.drain(self.drain_seconds):
+                models.close()
+                logger.info(f"Sign models {models.version} drained and released")
+            else:
+                logger.warning(f"Sign models {models.version} still has {models.inflight} requests after "
+                               f"{self.drain_seconds:g}s; leaving it to be collected when they finish")
+            self.retiring.remove(models)
+
+        self.retiring.append(models)
+        threading.Thread(target=drain, name=f"drain-{models.version}", daemon=True).start()
+
+    @contextmanager
+    def use(self):
+        """Hold one version (the canary for canary_percent of requests) for the duration of a request"""
+        with self.lock:
+            use_canary = self.canary is not None and random.random() * 100 < self.canary_percent
+            models = self.canary if use_canary else self.active
+            with models.condition:
+                models.inflight += 1
+                models.requests += 1
+        try:
+            yield models
+        finally:
+            with models.condition:
+                models.inflight -= 1
+                models.condition.notify_all()
+
+    def _event(self, event: str, models: SignModels):
+        self.events.append({"event": event, "version": models.version, "time": time.time()})
+        logger.info(f"Sign models {models.version}: {event} (loaded in {models.load_seconds:.1f}s)")
+
+    def stats(self) -> Dict:
+        return {
+            "model_dir": self.model_dir,
+            "poll_seconds": self.poll_seconds,
+            "canary_percent": self.canary_percent,
+            "active": self.active.stats() if self.active else None,
+            "canary": self.canary.stats() if self.canary else None,
+            "loading": self.loading,
+            "draining": [m.version for m in self.retiring],
+            "failed": [{"version": version, "error": error} for (version, _), error in self.failed.items()],
+            "events": [dict(e, time=time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(e["time"])))
+                       for e in self.events],
+        }
+
+
+def register_registry_gauges(registry: ModelRegistry):
+    metrics.register_gauge("chatterbridge_model_inflight", "Requests holding a model version",
+                           lambda: registry.active.inflight, role="active")
+    metrics.register_gauge("chatterbridge_model_inflight", "Requests holding a model version",
+                           lambda: registry.canary.inflight if registry.canary else 0, role="canary")
+    metrics.register_gauge("chatterbridge_model_draining", "Replaced versions waiting for requests to finish",
+                           lambda: len(registry.retiring))
+
+
+# ------------------------
+# CLI
+# ------------------------
+def publish(source: str, model_dir: str, version: str) -> str:
+    """Copy the model files in source into model_dir/version, appearing all at once"""
+    if not is_complete(source):
+        raise FileNotFoundError(f"{source} is missing one of {', '.join(REQUIRED_FILES)}")
+    target = os.path.join(model_dir, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"{target} already exists")
+    staging = os.path.join(model_dir, f".{version}.tmp")
+    os.makedirs(staging)
+    for filename in REQUIRED_FILES + OPTIONAL_FILES:
+        if os.path.exists(os.path.join(source, filename)):
+            shutil.copy2(os.path.join(source, filename), staging)
+    # The watcher skips dot-directories, so it only ever sees the finished copy
+    os.rename(staging, target)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage versioned sign models for main.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+    publish_parser = sub.add_parser("publish", help="copy the current artifacts into a new version directory")
+    publish_parser.add_argument("--version", default=time.strftime("%Y%m%d-%H%M%S"))
+    publish_parser.add_argument("--source", default=".", help="directory with the trained artifacts")
+    sub.add_parser("list", help="show versions and which one would be served")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        print(f"Published {publish(args.source, args.model_dir, args.version)}")
+        return 0
+    found = find_version(args.model_dir)
+    if os.path.isdir(args.model_dir):
+        for name in sorted(os.listdir(args.model_dir)):
+            directory = os.path.join(args.model_dir, name)
+            if os.path.isdir(directory) and not name.startswith((".", "_")):
+                state = "complete" if is_complete(directory) else "incomplete"
+                print(f"{'*' if found and found[1] == directory else ' '} {name:<24} {state}")
+    if found and found[1] != os.path.join(args.model_dir, found[0]):
+        print(f"* {found[0]:<24} (working directory)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
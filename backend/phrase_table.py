@@ -0,0 +1,425 @@
+"""
+Local phrase-table translation tier for app.py's TranslationEngine.
+
+Tables live in PHRASE_TABLE_DIR as tab-separated files, one phrase per line:
+
+    phrase_tables/en-hi.tsv           general phrases for English -> Hindi
+    phrase_tables/en-hi.medical.tsv   a domain glossary, used when context="medical"
+
+Each line is `source phrase<TAB>target phrase`; blank lines and lines starting
+with "#" are skipped. Domain entries override general ones for the same phrase.
+
+Per language pair and domain the phrases are compiled into a word-level
+Aho-Corasick automaton, so one left-to-right pass over the tokens finds every
+phrase in the text, however many there are. Matches are taken leftmost-longest
+and never overlap. Then:
+
+- if each punctuation-delimited segment is exactly one phrase ("Hello, thank
+  you!"), the translation is assembled locally, with the original punctuation
+  between them, and nothing goes upstream. Phrases strung together in one
+  segment ("no water") would come out in English word order, so such text goes
+  upstream with only the domain glossary's terms pinned;
+- otherwise each phrase is replaced by a numbered placeholder ([0], [1], ...)
+  and only the rest of the text is translated upstream, in one call so the
+  engine still sees the sentence. The placeholders are then replaced with the
+  table's targets, which is how glossary terms are enforced in the output. If
+  the engine drops or mangles a placeholder, each unmatched gap is translated
+  on its own instead.
+
+Matching is case-insensitive on word tokens. Files are re-read when they
+change (checked at most every PHRASE_TABLE_POLL_SECONDS, on lookup).
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+PHRASE_TABLE_DIR = os.environ.get("PHRASE_TABLE_DIR", "phrase_tables")
+PHRASE_TABLE_POLL_SECONDS = float(os.environ.get("PHRASE_TABLE_POLL_SECONDS", 30))  # 0 = load once
+# Words, including Indic vowel signs and viramas (which \w does not match) and inner apostrophes
+TOKEN_PATTERN = re.compile(r"[\w\u0900-\u0DFF]+(?:['’][\w\u0900-\u0DFF]+)*")
+TABLE_NAME = re.compile(r"^([a-z]{2,3}(?:-[A-Za-z]+)?)-([a-z]{2,3})(?:\.([\w-]+))?\.tsv$")
+PLACEHOLDER = "[{}]"
+PLACEHOLDER_PATTERN = re.compile(r"\[\s*(\d+)\s*\]")
+# Latest upstream call times, for the latency-saved estimate
+UPSTREAM_WINDOW = 256
+
+Phrase = Tuple[str, ...]
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """(casefolded token, start, end) for every word in text"""
+    return [(m.group().casefold(), m.start(), m.end()) for m in TOKEN_PATTERN.finditer(text)]
+
+
+def read_table(path: str) -> Dict[Phrase, str]:
+    phrases = {}
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            parts = line.split("\t")
+            if len(parts) < 2 or not parts[1].strip():
+                logger.warning(f"{path}:{number}: expected 'source<TAB>target', skipped")
+                continue
+            key = tuple(token for token, _, _ in tokenize(parts[0]))
+            if key:
+                phrases[key] = parts[1].strip()
+    return phrases
+
+
+class PhraseMatcher:
+    """Word-level Aho-Corasick automaton over a phrase table"""
+
+    def __init__(self, phrases: Dict[Phrase, str]):
+        self.phrases = phrases
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail = [0]
+        # Lengths of the phrases ending at each state, own first, then those reached by failure links
+        self.output: List[List[int]] = [[]]
+        for phrase in phrases:
+            state = 0
+            for token in phrase:
+                if token not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][token] = len(self.goto) - 1
+                state = self.goto[state][token]
+            self.output[state].append(len(phrase))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(token, 0)
+                self.fail[child] = target if target != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+                queue.append(child)
+
+    def find(self, tokens: List[str]) -> List[Tuple[int, int]]:
+        """Non-overlapping (start, end) token spans of phrases, leftmost-longest"""
+        found = []
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            for length in self.output[state]:
+                found.append((i + 1 - length, i + 1))
+        found.sort(key=lambda span: (span[0], span[0] - span[1]))
+        chosen, end = [], 0
+        for start, stop in found:
+            if start >= end:
+                chosen.append((start, stop))
+                end = stop
+        return chosen
+
+    def __len__(self):
+        return len(self.phrases)
+
+
+class Plan:
+    """Text split into table matches and the unmatched gaps between them"""
+
+    def __init__(self, text: str, pieces: List[Tuple[str, str]], matched_tokens: int, total_tokens: int, pair):
+        self.text = text
+        # ("phrase", target) or ("gap", source text) in order; gaps keep the original spacing and punctuation
+        self.pieces = pieces
+        self.matched_tokens = matched_tokens
+        self.total_tokens = total_tokens
+        self.pair = pair
+
+    @property
+    def covered(self) -> bool:
+        """Every word is covered by a phrase (gaps hold only spaces and punctuation)"""
+        return self.matched_tokens == self.total_tokens
+
+    @property
+    def complete(self) -> bool:
+        """Covered, with no two phrases in one segment, so the targets can be joined as they are"""
+        if not self.covered:
+            return False
+        previous = None
+        for kind, value in self.pieces:
+            if kind == "gap" and not value.strip():
+                continue
+            if kind == "phrase" and previous == "phrase":
+                return False
+            previous = kind
+        return True
+
+    @property
+    def phrases(self) -> List[str]:
+        return [value for kind, value in self.pieces if kind == "phrase"]
+
+    def assemble(self, gaps: Optional[List[str]] = None) -> str:
+        """Join targets with the gaps (original text, or their translations in order)"""
+        gaps = iter(gaps) if gaps is not None else None
+        out = []
+        for kind, value in self.pieces:
+            if kind == "phrase":
+                out.append(value)
+            elif gaps is not None and TOKEN_PATTERN.search(value):
+                # Keep the spacing around the gap; its translation replaces the stripped text
+                stripped = value.strip()
+                start = value.index(stripped)
+                out.append(value[:start] + next(gaps) + value[start + len(stripped):])
+            else:
+                out.append(value)
+        return re.sub(r"\s+", " ", "".join(out)).strip()
+
+    def gap_texts(self) -> List[str]:
+        return [value.strip() for kind, value in self.pieces if kind == "gap" and TOKEN_PATTERN.search(value)]
+
+    def protected(self) -> Optional[str]:
+        """The text with each phrase replaced by a numbered placeholder; None if the text has its own"""
+        if PLACEHOLDER_PATTERN.search(self.text):
+            return None
+        out, n = [], 0
+        for kind, value in self.pieces:
+            if kind == "phrase":
+                out.append(PLACEHOLDER.format(n))
+                n += 1
+            else:
+                out.append(value)
+        return "".join(out)
+
+    def restore(self, translated: str) -> Optional[str]:
+        """Put the targets back into an upstream translation; None if a placeholder went missing"""
+        phrases = self.phrases
+        seen = set()
+
+        def replace(m):
+            index = int(m.group(1))
+            if index >= len(phrases):
+                return m.group()
+            seen.add(index)
+            return phrases[index]
+
+        restored = PLACEHOLDER_PATTERN.sub(replace, translated)
+        return restored if len(seen) == len(phrases) else None
+
+
+def build_plan(text: str, tokens: List[Tuple[str, int, int]], spans: List[Tuple[int, int]],
+               phrases: Dict[Phrase, str], pair: Tuple[str, str]) -> Plan:
+    pieces, position = [], 0
+    for start, stop in spans:
+        begin, end = tokens[start][1], tokens[stop - 1][2]
+        if begin > position:
+            pieces.append(("gap", text[position:begin]))
+        pieces.append(("phrase", phrases[tuple(token for token, _, _ in tokens[start:stop])]))
+        position = end
+    if position < len(text):
+        pieces.append(("gap", text[position:]))
+    return Plan(text, pieces, sum(stop - start for start, stop in spans), len(tokens), pair)
+
+
+class PhraseTables:
+    """Phrase tables and domain glossaries under root, compiled per (source, target, domain)"""
+
+    def __init__(self, root: str = PHRASE_TABLE_DIR, poll_seconds: float = PHRASE_TABLE_POLL_SECONDS):
+        self.root = root
+        self.poll_seconds = poll_seconds
+        self.lock = threading.Lock()
+        self.tables: Dict[Tuple[str, str, Optional[str]], Dict[Phrase, str]] = {}
+        self.matchers: Dict[Tuple[str, str, Optional[str]], PhraseMatcher] = {}
+        self.signature = None
+        self.checked = 0.0
+        self.load()
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        if not os.path.isdir(self.root):
+            return {}
+        files = {}
+        for name in os.listdir(self.root):
+            if TABLE_NAME.match(name):
+                stat = os.stat(os.path.join(self.root, name))
+                files[name] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def load(self):
+        signature = self.scan()
+        tables = {}
+        for name in sorted(signature):
+            source, target, domain = TABLE_NAME.match(name).groups()
+            try:
+                tables[(source, target, domain)] = read_table(os.path.join(self.root, name))
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Could not read phrase table {name}: {e}")
+        with self.lock:
+            self.tables, self.matchers, self.signature = tables, {}, signature
+            self.checked = time.monotonic()
+        if tables:
+            logger.info(f"Loaded {sum(len(t) for t in tables.values())} phrases in {len(tables)} tables "
+                        f"from {self.root}")
+
+    def _maybe_reload(self):
+        if self.poll_seconds <= 0 or time.monotonic() - self.checked < self.poll_seconds:
+            return
+        self.checked = time.monotonic()
+        if self.scan() != self.signature:
+            self.load()
+
+    def matcher(self, source: str, target: str, domain: Optional[str]) -> Optional[PhraseMatcher]:
+        """General phrases for the pair plus the domain's glossary (which wins on conflicts); None if empty"""
+        with self.lock:
+            # Keys come from requests, so only ones backed by a table file are cached
+            if (source, target, domain) not in self.tables:
+                domain = None
+            key = (source, target, domain)
+            if key not in self.tables:
+                return None
+            if key not in self.matchers:
+                phrases = dict(self.tables.get((source, target, None), {}))
+                if domain:
+                    phrases.update(self.tables.get((source, target, domain), {}))
+                self.matchers[key] = PhraseMatcher(phrases) if phrases else None
+            return self.matchers[key]
+
+    def sources_for(self, target: str) -> List[str]:
+        return sorted({s for s, t, _ in self.tables if t == target})
+
+    def plan(self, text: str, target: str, source: str = "auto", domain: Optional[str] = None) -> Optional[Plan]:
+        """Split text into table matches and gaps; None when no table phrase occurs in it.
+
+        With source "auto" every table into the target language is tried and
+        the one covering the most words is used.
+        """
+        self._maybe_reload()
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        best = None
+        for src in (self.sources_for(target) if source == "auto" else [source]):
+            matcher = self.matcher(src, target, domain)
+            if matcher is None:
+                continue
+            spans = matcher.find([token for token, _, _ in tokens])
+            covered = sum(stop - start for start, stop in spans)
+            if spans and (best is None or covered > best[0]):
+                best = (covered, src, matcher, spans)
+        if best is None:
+            return None
+
+        _, src, matcher, spans = best
+        plan = build_plan(text, tokens, spans, matcher.phrases, (src, target))
+        if plan.covered and not plan.complete:
+            # Every word is an entry, but several share a segment: only glossary terms stay pinned and
+            # the engine translates the rest as a sentence
+            glossary = self.tables.get((src, target, domain), {}) if domain else {}
+            spans = [(start, stop) for start, stop in spans
+                     if tuple(token for token, _, _ in tokens[start:stop]) in glossary]
+            if not spans:
+                return None
+            plan = build_plan(text, tokens, spans, matcher.phrases, (src, target))
+        return plan
+
+    def stats(self) -> Dict:
+        return {
+            "directory": os.path.abspath(self.root),
+            "tables": {f"{s}-{t}" + (f".{d}" if d else ""): len(p) for (s, t, d), p in sorted(
+                self.tables.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or ""))},
+        }
+
+
+class PhraseTranslator:
+    """Runs the phrase-table tier in front of an upstream translate function and counts what it saved"""
+
+    def __init__(self, tables: PhraseTables):
+        self.tables = tables
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "local": 0, "partial": 0, "upstream": 0, "gap_fallbacks": 0}
+        self.tokens = {"total": 0, "matched": 0}
+        self.local_seconds = 0.0
+        self.upstream_times = deque(maxlen=UPSTREAM_WINDOW)
+
+    def _upstream(self, remote: Callable[[str, str], Dict], text: str, source: str) -> Dict:
+        start = time.perf_counter()
+        result = remote(text, source)
+        with self.lock:
+            self.upstream_times.append(time.perf_counter() - start)
+        return result
+
+    def _count(self, tier: str, plan: Optional[Plan], tokens: int):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts[tier] += 1
+            self.tokens["total"] += tokens
+            self.tokens["matched"] += plan.matched_tokens if plan else 0
+
+    def translate(self, text: str, target: str, source: str, domain: Optional[str],
+                  remote: Callable[[str, str], Dict]) -> Dict:
+        """Translate with the tables first; remote(text, source) is the upstream engine chain.
+
+        Returns the upstream result shape (success, translated_text, source_language,
+        target_language, translation_method, ...) plus "phrase_table" details when a table was used.
+        """
+        start = time.perf_counter()
+        plan = self.tables.plan(text, target, source, domain)
+        if plan is None:
+            self._count("upstream", None, len(tokenize(text)))
+            return self._upstream(remote, text, source)
+
+        details = {"pair": "-".join(plan.pair), "domain": domain, "phrases": len(plan.phrases),
+                   "coverage": round(plan.matched_tokens / plan.total_tokens, 3)}
+        if plan.complete:
+            translated = plan.assemble()
+            with self.lock:
+                self.local_seconds += time.perf_counter() - start
+            self._count("local", plan, plan.total_tokens)
+            return {"success": True, "translated_text": translated, "source_language": plan.pair[0],
+                    "target_language": target, "translation_method": "phrase_table", "context_used": domain,
+                    "phrase_table": details}
+
+        self._count("partial", plan, plan.total_tokens)
+        protected = plan.protected()
+        result = self._upstream(remote, protected, source) if protected is not None else None
+        translated = plan.restore(result["translated_text"]) if result and result["success"] else None
+        if translated is None:
+            # The engine lost a placeholder (or there was a failure): translate each gap on its own
+            with self.lock:
+                self.counts["gap_fallbacks"] += 1
+            gaps = [self._upstream(remote, gap, source) for gap in plan.gap_texts()]
+            failed = next((g for g in gaps if not g["success"]), None)
+            if failed is not None:
+                return failed
+            result = gaps[0]
+            translated = plan.assemble([g["translated_text"] for g in gaps])
+            details["mode"] = "gaps"
+        else:
+            details["mode"] = "placeholders"
+        return dict(result, translated_text=translated,
+                    translation_method=f"phrase_table+{result['translation_method']}", phrase_table=details)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            counts = dict(self.counts)
+            upstream = sorted(self.upstream_times)
+            local_seconds = self.local_seconds
+            tokens = dict(self.tokens)
+        mean_upstream = sum(upstream) / len(upstream) if upstream else 0.0
+        return dict(
+            self.tables.stats(),
+            **counts,
+            local_share=round(counts["local"] / counts["requests"], 3) if counts["requests"] else 0.0,
+            token_coverage=round(tokens["matched"] / tokens["total"], 3) if tokens["total"] else 0.0,
+            local_mean_ms=round(local_seconds / counts["local"] * 1000, 3) if counts["local"] else None,
+            upstream_mean_ms=round(mean_upstream * 1000, 1) if upstream else None,
+            # Each locally served request skipped one upstream round-trip of typical length
+            latency_saved_seconds=round(counts["local"] * max(0.0, mean_upstream) - local_seconds, 2)
+            if upstream else None,
+        )
@@ -0,0 +1,211 @@
+"""
+Frame preprocessing shared by the sign server (main.py) and the training scripts.
+
+Frames are resized *before* colour conversion (BGR->RGB is a per-pixel channel
+swap, so the result is identical to converting first, on ~50x fewer pixels at
+720p) and written straight into a preallocated contiguous (T, H, W, 3) uint8
+clip buffer. Normalization to [0, 1] is either left to the model graph
+(with_uint8_input, used for serving) or done as one fused in-place op over the
+whole clip (normalize, used for training so augmentation can run in float).
+"""
+
+import os
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+logger = logging.getLogger(__name__)
+
+IMG_SIZE = 128
+SCALE = 1.0 / 255.0
+# Raw (T, IMG_SIZE, IMG_SIZE, 3) uint8 RGB frames, row-major, no header
+TENSOR_CONTENT_TYPE = "application/x-sign-tensor"
+
+
+# ------------------------
+# Frame kernel
+# ------------------------
+def allocate_clip(n_frames: int, size: int = IMG_SIZE) -> np.ndarray:
+    """One contiguous uint8 buffer for a clip of n_frames RGB frames"""
+    return np.empty((n_frames, size, size, 3), dtype=np.uint8)
+
+
+def preprocess_frame(frame: np.ndarray, out: Optional[np.ndarray] = None, size: int = IMG_SIZE) -> np.ndarray:
+    """Resize a BGR frame to (size, size) and convert it to RGB uint8, in place in `out` if given.
+
+    With `out` (e.g. one slot of an allocate_clip buffer) no intermediate
+    arrays are allocated: the resize writes into `out` and the channel swap
+    runs in place on it.
+    """
+    if out is None:
+        out = np.empty((size, size, 3), dtype=np.uint8)
+    cv2.resize(frame, (size, size), dst=out, interpolation=cv2.INTER_LINEAR)
+    cv2.cvtColor(out, cv2.COLOR_BGR2RGB, dst=out)
+    return out
+
+
+def normalize(clip: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """uint8 -> float32 in [0, 1] as a single fused pass (no float64 temporary)"""
+    if out is None:
+        out = np.empty(clip.shape, dtype=np.float32)
+    np.multiply(clip, np.float32(SCALE), out=out, dtype=np.float32)
+    return out
+
+
+def augment(clip: np.ndarray, rng: np.random.Generator, brightness: float = 0.2,
+            contrast: Tuple[float, float] = (0.8, 1.2)) -> np.ndarray:
+    """Random flip / brightness / contrast per frame, in place on a normalized float32 clip.
+
+    Same distributions as tf.image.random_flip_left_right, random_brightness and
+    random_contrast, applied to the whole clip at once instead of frame by frame.
+    """
+    n = len(clip)
+    flips = rng.random(n) < 0.5
+    if flips.any():
+        clip[flips] = clip[flips, :, ::-1]
+    clip += rng.uniform(-brightness, brightness, (n, 1, 1, 1)).astype(np.float32)
+    means = clip.mean(axis=(1, 2), keepdims=True)
+    factors = rng.uniform(contrast[0], contrast[1], (n, 1, 1, 1)).astype(np.float32)
+    clip -= means
+    clip *= factors
+    clip += means
+    return clip
+
+
+# ------------------------
+# Clips and images
+# ------------------------
+def read_clip(video_path: str, max_frames: int, out: Optional[np.ndarray] = None,
+              size: int = IMG_SIZE) -> np.ndarray:
+    """Sample up to max_frames evenly spaced frames of a video into a (T, size, size, 3) uint8 array.
+
+    Returns a view of `out` (allocated if not given) holding the frames read;
+    a single black frame if the video has no readable frames.
+    """
+    if out is None:
+        out = allocate_clip(max_frames, size)
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    n = 0
+    if total_frames > 0:
+        step = max(1, total_frames // max_frames)
+        for i in range(0, total_frames, step):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, i)
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            preprocess_frame(frame, out[n], size)
+            n += 1
+            if n >= max_frames:
+                break
+    cap.release()
+    if n == 0:
+        out[0] = 0
+        n = 1
+    return out[:n]
+
+
+def sample_indices(total_frames: int, max_frames: int) -> List[int]:
+    """Evenly spaced frame indices, the same spacing read_clip uses for videos"""
+    step = max(1, total_frames // max_frames)
+    return list(range(0, total_frames, step))[:max_frames]
+
+
+def decode_frame_bundle(frames: List[bytes], max_frames: int, size: int = IMG_SIZE) -> np.ndarray:
+    """Decode a bundle of encoded still frames (JPEG/PNG) into a (T, size, size, 3) uint8 clip.
+
+    Frames already at size x size only pay for the image decode; larger ones
+    are resized like video frames. More than max_frames are sampled evenly.
+    """
+    if not frames:
+        raise ValueError("Empty frame bundle")
+    indices = sample_indices(len(frames), max_frames)
+    out = allocate_clip(len(indices), size)
+    for slot, i in enumerate(indices):
+        frame = cv2.imdecode(np.frombuffer(frames[i], dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"Could not decode frame {i}")
+        preprocess_frame(frame, out[slot], size)
+    return out
+
+
+def decode_tensor_blob(data: bytes, max_frames: int, size: int = IMG_SIZE) -> np.ndarray:
+    """View a raw uint8 RGB tensor upload as a (T, size, size, 3) clip without copying"""
+    frame_bytes = size * size * 3
+    if not data or len(data) % frame_bytes:
+        raise ValueError(f"Tensor upload must be a whole number of {size}x{size}x3 uint8 frames "
+                         f"({frame_bytes} bytes each), got {len(data)} bytes")
+    clip = np.frombuffer(data, dtype=np.uint8).reshape(-1, size, size, 3)
+    if len(clip) > max_frames:
+        clip = clip[sample_indices(len(clip), max_frames)]
+    return clip
+
+
+def load_image(path: str, out: Optional[np.ndarray] = None, size: int = IMG_SIZE) -> np.ndarray:
+    frame = cv2.imread(path, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError(f"Could not read image: {path}")
+    return preprocess_frame(frame, out, size)
+
+
+def load_image_dir(root: str, size: int = IMG_SIZE,
+                   extensions=(".jpg", ".jpeg", ".png", ".bmp")) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Load a class-per-subfolder image tree into one (N, size, size, 3) uint8 array.
+
+    Classes are the sorted subfolder names, as with flow_from_directory.
+    """
+    class_names = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    paths, labels = [], []
+    for idx, name in enumerate(class_names):
+        folder = os.path.join(root, name)
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith(extensions):
+                paths.append(os.path.join(folder, filename))
+                labels.append(idx)
+
+    images = allocate_clip(len(paths), size)
+    keep = np.ones(len(paths), dtype=bool)
+    for i, path in enumerate(paths):
+        try:
+            load_image(path, images[i], size)
+        except ValueError as e:
+            logger.warning(f"Skipping {path}: {e}")
+            keep[i] = False
+    return images[keep], np.asarray(labels, dtype=np.int64)[keep], class_names
+
+
+def validation_mask(labels: np.ndarray, n_classes: int, fraction: float = 0.2) -> np.ndarray:
+    """Boolean mask holding out the first `fraction` of each class, as flow_from_directory's validation_split"""
+    mask = np.zeros(len(labels), dtype=bool)
+    for idx in range(n_classes):
+        members = np.flatnonzero(labels == idx)
+        mask[members[:int(len(members) * fraction)]] = True
+    return mask
+
+
+# ------------------------
+# Features and models
+# ------------------------
+def pad_features(features: np.ndarray, max_frames: int) -> np.ndarray:
+    """Truncate to max_frames or pad by repeating the last frame's features"""
+    features = np.asarray(features)
+    n = len(features)
+    if n >= max_frames:
+        return features[:max_frames]
+    pad = np.repeat(features[-1:], max_frames - n, axis=0)
+    return np.concatenate([features, pad])
+
+
+def with_uint8_input(model):
+    """Wrap a model that expects [0, 1] floats so it takes uint8 frames directly.
+
+    The cast and 1/255 scale run inside the graph, so the host only moves a
+    quarter of the bytes and never materializes a float copy of the clip.
+    """
+    import tensorflow as tf
+
+    inputs = tf.keras.Input(shape=model.input_shape[1:], dtype="uint8")
+    x = tf.keras.layers.Rescaling(SCALE)(inputs)
+    return tf.keras.Model(inputs, model(x), name=f"{model.name}_uint8")
@@ -0,0 +1,56 @@
+"""
+Timing and provenance helpers shared by the training tools (distill.py,
+sweep.py) and the benchmark scripts (benchmarks/common.py).
+"""
+
+import os
+import math
+import time
+import subprocess
+import statistics
+from typing import Callable, Dict, List
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_ms(samples: List[float]) -> Dict[str, float]:
+    """Summary statistics of a list of durations in seconds, reported in milliseconds"""
+    ms = [s * 1000 for s in samples]
+    return {
+        "n": len(ms),
+        "min_ms": round(min(ms), 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+        "max_ms": round(max(ms), 4)
+    }
+
+
+def measure(fn: Callable, repeats: int = 20, warmup: int = 2) -> Dict[str, float]:
+    """Call fn() warmup + repeats times and summarize the timed calls"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize_ms(samples)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
@@ -0,0 +1,183 @@
+"""
+Temporal segmentation of continuous signing videos for the sign server (main.py).
+
+The LSTM head was trained on MAX_FRAMES frames spread over one sign, so a
+window of `window_seconds` corresponds to MAX_FRAMES frames sampled at
+MAX_FRAMES / window_seconds fps. Instead of decoding and embedding every
+window separately:
+
+1. the video is decoded once, sequentially, keeping frames at that rate, and
+   each kept frame goes through the backbone once (in chunks, so memory stays
+   flat);
+2. windows of MAX_FRAMES consecutive embeddings start every `hop` frames and
+   are zero-copy views of the embedding sequence, batched through the head;
+3. every frame gets the average calibrated probabilities of the windows that
+   cover it, and runs of the same confident label become timestamped segments.
+
+Each frame is embedded once however many windows overlap it, so the cost is
+linear in video length: one backbone pass per sampled frame plus one head
+pass per `hop` frames.
+"""
+
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import cv2
+from numpy.lib.stride_tricks import sliding_window_view
+
+from preprocessing import IMG_SIZE, allocate_clip, preprocess_frame, pad_features
+from calibration import UNKNOWN_LABEL, apply_temperature
+
+# ------------------------
+# Config
+# ------------------------
+# Typical length of one sign; the head sees MAX_FRAMES frames spread over it
+SEGMENT_WINDOW_SECONDS = float(os.environ.get("SEGMENT_WINDOW_SECONDS", 2.0))
+# Sampled frames between window starts (1 = a window at every frame)
+SEGMENT_HOP = int(os.environ.get("SEGMENT_HOP", 2))
+# Frames whose averaged confidence is below this are treated as transitions between signs
+SEGMENT_THRESHOLD = float(os.environ.get("SEGMENT_THRESHOLD", 0.5))
+SEGMENT_MIN_SECONDS = float(os.environ.get("SEGMENT_MIN_SECONDS", 0.4))
+# Windows per head call
+SEGMENT_BATCH = 32
+
+
+def stream_frames(video_path: str, rate: float, chunk: int,
+                  size: int = IMG_SIZE) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Decode a video once and yield (timestamps, frames) chunks sampled at `rate` fps.
+
+    Frames are preprocessed into one reused (chunk, size, size, 3) buffer, so
+    consume each chunk before asking for the next.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = allocate_clip(chunk, size)
+    times = np.empty(chunk)
+    n = kept = index = 0
+    # grab() demuxes and decodes; only kept frames pay for retrieve()'s conversion and copy
+    while cap.grab():
+        timestamp = index / fps
+        index += 1
+        if timestamp * rate + 1e-6 < kept:
+            continue
+        ok, frame = cap.retrieve()
+        if not ok:
+            continue
+        preprocess_frame(frame, frames[n], size)
+        times[n] = timestamp
+        n += 1
+        kept += 1
+        if n == chunk:
+            yield times.copy(), frames
+            n = 0
+    cap.release()
+    if n:
+        yield times[:n].copy(), frames[:n]
+
+
+def window_starts(n_frames: int, window: int, hop: int) -> np.ndarray:
+    """Start index of every window; the last window always ends at the last frame"""
+    if n_frames <= window:
+        return np.zeros(1, dtype=np.int64)
+    starts = np.arange(0, n_frames - window + 1, hop)
+    if starts[-1] != n_frames - window:
+        starts = np.append(starts, n_frames - window)
+    return starts
+
+
+def window_probabilities(embeddings: np.ndarray, head: Callable[[np.ndarray], np.ndarray], window: int,
+                         hop: int, batch: int = SEGMENT_BATCH) -> Tuple[np.ndarray, np.ndarray]:
+    """Run the head over sliding windows of the embedding sequence; returns (starts, (W, C) probabilities)"""
+    if len(embeddings) < window:
+        embeddings = pad_features(embeddings, window)
+    starts = window_starts(len(embeddings), window, hop)
+    # (n - window + 1, window, dim) view; no window is copied until it is batched
+    windows = sliding_window_view(embeddings, window, axis=0).transpose(0, 2, 1)
+    probs = [head(np.ascontiguousarray(windows[starts[i:i + batch]])) for i in range(0, len(starts), batch)]
+    return starts, np.concatenate(probs)
+
+
+def frame_posteriors(n_frames: int, starts: np.ndarray, window: int, probs: np.ndarray) -> np.ndarray:
+    """Average the probabilities of all windows covering each frame; (n_frames, C)"""
+    total = np.zeros((max(n_frames, window), probs.shape[-1]))
+    counts = np.zeros(len(total))
+    # Starts are unique, so each offset's indices are too and plain fancy-index += is safe
+    for offset in range(window):
+        total[starts + offset] += probs
+        counts[starts + offset] += 1
+    return (total / counts[:, None])[:n_frames]
+
+
+def video_posteriors(video_path: str, embed: Callable[[np.ndarray], np.ndarray],
+                     head: Callable[[np.ndarray], np.ndarray], max_frames: int, temperature: float = 1.0,
+                     window_seconds: float = SEGMENT_WINDOW_SECONDS, hop: int = SEGMENT_HOP) -> Dict:
+    """Per-frame calibrated class probabilities of a continuous signing video.
+
+    `embed` maps a (T, H, W, 3) uint8 chunk to (T, D) backbone embeddings and
+    `head` maps (B, max_frames, D) windows to (B, C) softmax outputs.
+    """
+    rate = max_frames / window_seconds
+    times, embeddings = [], []
+    for chunk_times, frames in stream_frames(video_path, rate, max_frames):
+        times.append(chunk_times)
+        embeddings.append(embed(frames))
+    if not embeddings:
+        raise ValueError("No readable frames in video")
+    times, embeddings = np.concatenate(times), np.concatenate(embeddings)
+
+    starts, probs = window_probabilities(embeddings, head, max_frames, hop)
+    probs = apply_temperature(probs, temperature)
+    return {
+        "times": times,
+        "posteriors": frame_posteriors(len(times), starts, max_frames, probs),
+        "frame_period": 1.0 / rate,
+        "windows": len(starts),
+    }
+
+
+def label_segments(times: np.ndarray, posteriors: np.ndarray, class_names: List[str], frame_period: float,
+                   threshold: Optional[float] = None, min_seconds: float = SEGMENT_MIN_SECONDS) -> List[Dict]:
+    """Turn per-frame posteriors into [{"label", "confidence", "start", "end"}] (seconds)"""
+    threshold = SEGMENT_THRESHOLD if threshold is None else threshold
+    labels = posteriors.argmax(axis=-1)
+    confidence = posteriors.max(axis=-1)
+    labels[confidence < threshold] = -1
+
+    boundaries = np.flatnonzero(np.diff(labels)) + 1
+    segments = []
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(labels)]):
+        label = labels[start]
+        begin, finish = float(times[start]), float(times[end - 1] + frame_period)
+        if label < 0 or finish - begin < min_seconds:
+            continue
+        if (segments and segments[-1]["label"] == class_names[label]
+                and begin - segments[-1]["end"] < min_seconds):
+            # Same sign on both sides of a dropped blip: extend instead of repeating it.
+            # A longer gap is a pause between two signs, so the repeat stays separate.
+            previous = segments[-1]
+            frames = previous["frames"] + end - start
+            previous["confidence"] = (previous["confidence"] * previous["frames"]
+                                      + float(confidence[start:end].sum())) / frames
+            previous.update({"end": finish, "frames": frames})
+            continue
+        segments.append({"label": class_names[label], "confidence": float(confidence[start:end].mean()),
+                         "start": begin, "end": finish, "frames": int(end - start)})
+    for segment in segments:
+        del segment["frames"]
+        segment.update({k: round(segment[k], 3) for k in ("start", "end")})
+    return segments
+
+
+def segmentation_response(result: Dict, class_names: List[str], threshold: Optional[float] = None,
+                          min_seconds: float = SEGMENT_MIN_SECONDS) -> Dict:
+    """Response body for /detect-video?mode=segment"""
+    segments = label_segments(result["times"], result["posteriors"], class_names, result["frame_period"],
+                              threshold, min_seconds)
+    return {
+        "label": " ".join(s["label"] for s in segments) or UNKNOWN_LABEL,
+        "segments": segments,
+        "duration": round(float(result["times"][-1] + result["frame_period"]), 3),
+        "frames": int(len(result["times"])),
+        "windows": int(result["windows"]),
+    }
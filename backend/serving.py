@@ -0,0 +1,184 @@
+"""
+CPU inference settings for the sign server (main.py).
+
+Keras `predict()` builds a data pipeline and dispatches through its generic
+step function on every call, which costs ~100 ms per call on a small CPU before
+any math runs. In "graph" mode (the default) each model is instead wrapped in
+one concrete tf.function per batch size, traced once at startup with a fixed
+input signature. Requests are padded up to the nearest size, so nothing is
+retraced while serving. Optional extras:
+
+- SIGN_JIT_COMPILE lists the models (backbone, head, image, or "all") to
+  compile with XLA. It speeds up the LSTM head, but on x86 oneDNN's
+  convolutions are usually faster than XLA's; measure with
+  benchmarks/bench_inference.py
+- SIGN_BFLOAT16 lists the models to run with a mixed_bfloat16 policy (weights
+  and outputs stay float32). Ignored unless the CPU reports avx512_bf16 /
+  amx_bf16, since emulated bfloat16 is slower than float32
+- TF_INTRA_OP_THREADS / TF_INTER_OP_THREADS size TensorFlow's thread pools
+  (0 = TensorFlow's default: all cores)
+
+oneDNN itself is toggled with TF_ENABLE_ONEDNN_OPTS, which TensorFlow reads
+at import time (on by default for x86 Linux builds).
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Iterable, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+SIGN_INFERENCE = os.environ.get("SIGN_INFERENCE", "graph")  # "graph" or "predict"
+SIGN_JIT_COMPILE = os.environ.get("SIGN_JIT_COMPILE", "")  # e.g. "head"
+SIGN_BFLOAT16 = os.environ.get("SIGN_BFLOAT16", "")  # e.g. "head"
+TF_INTRA_OP_THREADS = int(os.environ.get("TF_INTRA_OP_THREADS", 0))
+TF_INTER_OP_THREADS = int(os.environ.get("TF_INTER_OP_THREADS", 0))
+INFERENCE_MODES = ("predict", "graph")
+MODEL_NAMES = ("backbone", "head", "image")
+
+
+def configure_threads(intra: int = TF_INTRA_OP_THREADS, inter: int = TF_INTER_OP_THREADS):
+    """Size TensorFlow's thread pools; must run before the first op executes"""
+    import tensorflow as tf
+
+    if intra:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+    if inter:
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+
+
+def cpu_supports_bf16() -> bool:
+    """Whether the CPU has native bfloat16 math (AVX512-BF16 or AMX)"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    flags = set(line.split(":", 1)[1].split())
+                    return bool(flags & {"avx512_bf16", "amx_bf16"})
+    except OSError:
+        pass
+    return False
+
+
+def model_set(value: str, variable: str) -> Set[str]:
+    """Parse a comma-separated list of model names ("all" for every model)"""
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    if "all" in names:
+        return set(MODEL_NAMES)
+    unknown = names - set(MODEL_NAMES)
+    if unknown:
+        raise ValueError(f"{variable}: unknown models {sorted(unknown)}; expected {', '.join(MODEL_NAMES)} or all")
+    return names
+
+
+JIT_MODELS = model_set(SIGN_JIT_COMPILE, "SIGN_JIT_COMPILE")
+BF16_MODELS = model_set(SIGN_BFLOAT16, "SIGN_BFLOAT16")
+if BF16_MODELS and not cpu_supports_bf16():
+    logger.warning(f"SIGN_BFLOAT16={SIGN_BFLOAT16} ignored: no native bfloat16 support on this CPU")
+    BF16_MODELS = set()
+
+
+def precision(name: str) -> str:
+    """Compute precision the named model is served with (part of the cache keys)"""
+    return "bfloat16" if SIGN_INFERENCE == "graph" and name in BF16_MODELS else "float32"
+
+
+def to_mixed_bfloat16(model):
+    """Clone a Keras model (recursing into nested models) with the mixed_bfloat16 policy"""
+    import keras
+
+    def clone(layer):
+        if isinstance(layer, keras.Model):
+            return keras.models.clone_model(layer, clone_function=clone)
+        config = layer.get_config()
+        if not isinstance(layer, keras.layers.InputLayer) and "dtype" in config:
+            config["dtype"] = "mixed_bfloat16"
+        return layer.__class__.from_config(config)
+
+    copy = keras.models.clone_model(model, clone_function=clone)
+    copy.set_weights(model.get_weights())
+    return copy
+
+
+class CompiledModel:
+    """A Keras model behind fixed-shape concrete functions, one per batch size.
+
+    predict() mirrors Keras' signature so callers do not change: batches are
+    zero-padded up to the nearest compiled size, and batches larger than the
+    biggest size run in chunks of it.
+    """
+
+    def __init__(self, model, batch_sizes: Iterable[int], precision: str = "float32", jit_compile: bool = False):
+        import tensorflow as tf
+
+        self.model = model
+        self.precision = precision
+        self.jit_compile = jit_compile
+        self.batch_sizes = tuple(sorted(set(int(b) for b in batch_sizes)))
+        self.input_shape = model.input_shape
+        self.dtype = tf.as_dtype(model.inputs[0].dtype)
+        runner = to_mixed_bfloat16(model) if precision == "bfloat16" else model
+
+        def forward(x):
+            return tf.cast(runner(x, training=False), tf.float32)
+
+        function = tf.function(forward, jit_compile=jit_compile)
+        self.functions = {
+            size: function.get_concrete_function(tf.TensorSpec((size,) + tuple(self.input_shape[1:]), self.dtype))
+            for size in self.batch_sizes
+        }
+
+    def warmup(self) -> Dict[int, float]:
+        """Run every batch size once (this is when XLA compiles); returns seconds per size"""
+        timings = {}
+        for size, function in self.functions.items():
+            start = time.perf_counter()
+            function(np.zeros((size,) + tuple(self.input_shape[1:]), self.dtype.as_numpy_dtype))
+            timings[size] = time.perf_counter() - start
+        return timings
+
+    def predict(self, x, verbose=0) -> np.ndarray:
+        x = np.asarray(x)
+        n = len(x)
+        largest = self.batch_sizes[-1]
+        if n > largest:
+            return np.concatenate([self.predict(x[i:i + largest]) for i in range(0, n, largest)])
+        size = next(b for b in self.batch_sizes if b >= n)
+        if size != n:
+            padded = np.zeros((size,) + x.shape[1:], x.dtype)
+            padded[:n] = x
+            x = padded
+        return self.functions[size](x).numpy()[:n]
+
+
+def serving_model(model, name: str, batch_sizes: Tuple[int, ...]):
+    """The named model as configured for serving, compiled and warmed up at startup in graph mode"""
+    if SIGN_INFERENCE not in INFERENCE_MODES:
+        raise ValueError(f"SIGN_INFERENCE must be one of {', '.join(INFERENCE_MODES)}, got {SIGN_INFERENCE!r}")
+    if SIGN_INFERENCE == "predict":
+        return model
+    start = time.perf_counter()
+    compiled = CompiledModel(model, batch_sizes, precision(name), name in JIT_MODELS)
+    warmup = compiled.warmup()
+    logger.info(f"Compiled {name} for batch sizes {compiled.batch_sizes} ({compiled.precision}, "
+                f"jit_compile={compiled.jit_compile}) in {time.perf_counter() - start:.1f}s; "
+                f"first runs {', '.join(f'{b}: {s * 1000:.0f} ms' for b, s in warmup.items())}")
+    return compiled
+
+
+def describe() -> Dict:
+    """Serving settings for /capabilities"""
+    return {
+        "mode": SIGN_INFERENCE,
+        "models": {name: {"precision": precision(name),
+                          "jit_compile": SIGN_INFERENCE == "graph" and name in JIT_MODELS}
+                   for name in MODEL_NAMES},
+        "intra_op_threads": TF_INTRA_OP_THREADS,
+        "inter_op_threads": TF_INTER_OP_THREADS,
+    }
@@ -0,0 +1,308 @@
+"""
+Text-to-sign lookup over the local ISL clip store (sign_videos/, filled by
+download_sign_videos in app.py) for /text-to-sign and /sign-clips.
+
+The index maps normalized clip names ("Thank_You (2).mp4" -> "thank you") to
+clips and lives in memory; lookups never touch the disk. Text is tokenized,
+matched longest phrase first, lemmatized with a few suffix rules checked
+against the index (so "going" finds "go" only if there is a clip for "go"),
+and fingerspelled from single-letter / digit clips when no sign exists.
+Function words ISL does not sign ("the", "is", ...) are dropped.
+
+A background thread polls the tree every SIGN_INDEX_POLL_SECONDS and only
+re-indexes files whose size or mtime changed. Another transcodes each clip
+once into a small H.264 rendition (SIGN_RENDITION_HEIGHT lines, CRF
+SIGN_RENDITION_CRF, moov atom first) under sign_videos/.renditions/, which is
+what /sign-clips serves once it exists; the original is served until then.
+"""
+
+import os
+import re
+import time
+import queue
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import av
+except ImportError:
+    av = None
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+SIGN_VIDEOS_DIR = os.environ.get("SIGN_VIDEOS_DIR", "sign_videos")
+SIGN_INDEX_POLL_SECONDS = float(os.environ.get("SIGN_INDEX_POLL_SECONDS", 10))  # 0 = index once at startup
+SIGN_RENDITION_HEIGHT = int(os.environ.get("SIGN_RENDITION_HEIGHT", 240))  # 0 = serve originals
+SIGN_RENDITION_CRF = int(os.environ.get("SIGN_RENDITION_CRF", 30))
+RENDITION_DIR = ".renditions"
+VIDEO_EXTENSIONS = (".mp4", ".m4v", ".mov", ".webm", ".mkv", ".avi")
+
+# Articles, copulas and auxiliaries have no sign of their own in ISL
+SKIP_WORDS = {"a", "an", "the", "is", "am", "are", "was", "were", "be", "been", "being", "to", "of", "do", "does",
+              "did", "will", "shall", "would", "should", "can", "could", "may", "might", "must", "has", "have", "had"}
+IRREGULAR = {
+    "went": "go", "gone": "go", "ate": "eat", "eaten": "eat", "saw": "see", "seen": "see", "came": "come",
+    "took": "take", "taken": "take", "gave": "give", "given": "give", "knew": "know", "known": "know",
+    "thought": "think", "told": "tell", "said": "say", "made": "make", "felt": "feel", "left": "leave",
+    "got": "get", "bought": "buy", "brought": "bring", "wrote": "write", "written": "write", "ran": "run",
+    "sat": "sit", "stood": "stand", "slept": "sleep", "drank": "drink", "drunk": "drink", "spoke": "speak",
+    "children": "child", "men": "man", "women": "woman", "people": "person", "feet": "foot",
+    "teeth": "tooth", "mice": "mouse", "better": "good", "best": "good", "worse": "bad", "worst": "bad",
+    "i'm": "i", "i've": "i", "don't": "not", "can't": "not", "won't": "not", "didn't": "not", "isn't": "not",
+}
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+# "Hello (2)", "hello_2", "hello-copy" -> "hello"
+VARIANT_SUFFIX = re.compile(r"(\s*\(\d+\)|\s+copy|\s+\d+)+$")
+
+
+def normalize_key(name: str) -> str:
+    key = re.sub(r"[_\-.]+", " ", name.lower()).strip()
+    stripped = VARIANT_SUFFIX.sub("", key).strip()
+    return re.sub(r"\s+", " ", stripped or key)
+
+
+def is_variant(path: str) -> bool:
+    """True for numbered or copied variants of a clip ("Hello (2).mp4", "hello copy.mp4")"""
+    key = re.sub(r"[_\-.]+", " ", os.path.splitext(os.path.basename(path))[0].lower()).strip()
+    return VARIANT_SUFFIX.sub("", key).strip() not in ("", key)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def lemma_candidates(word: str) -> List[str]:
+    """The word and its plausible base forms, most likely first; callers keep the first one in the index"""
+    candidates = [word]
+    if word in IRREGULAR:
+        candidates.append(IRREGULAR[word])
+    if word.endswith("'s"):
+        word = word[:-2]
+        candidates.append(word)
+    if word.endswith("ies") and len(word) > 4:
+        candidates.append(word[:-3] + "y")
+    if word.endswith("es") and len(word) > 3:
+        candidates.append(word[:-2])
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 2:
+        candidates.append(word[:-1])
+    for suffix in ("ing", "ed", "er", "est", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            stem = word[:-len(suffix)]
+            candidates += [stem, stem + "e"]
+            if len(stem) > 2 and stem[-1] == stem[-2]:
+                candidates.append(stem[:-1])  # running -> run
+            if stem.endswith("i"):
+                candidates.append(stem[:-1] + "y")  # tried -> try, happily -> happy
+    return candidates
+
+
+def clip_id(relpath: str, size: int, mtime_ns: int) -> str:
+    """Changes whenever the file does, so clip URLs can be cached"""
+    return hashlib.blake2b(f"{relpath}:{size}:{mtime_ns}".encode(), digest_size=8).hexdigest()
+
+
+def probe_duration(path: str) -> Optional[float]:
+    if av is None:
+        return None
+    try:
+        with av.open(path) as container:
+            return round(container.duration / 1_000_000, 3) if container.duration else None
+    except Exception:
+        return None
+
+
+def transcode(source: str, target: str, height: int, crf: int):
+    """Re-encode to a low-bitrate H.264 rendition (no audio, even dimensions, faststart)"""
+    # Per process, so two servers sharing the tree (reloader, several workers) never write the same file
+    partial = f"{target}.{os.getpid()}.partial"
+    with av.open(source) as src, av.open(partial, "w", format="mp4", options={"movflags": "+faststart"}) as dst:
+        in_stream = src.streams.video[0]
+        rate = in_stream.average_rate or 25
+        scale = min(1.0, height / in_stream.codec_context.height)
+        width = int(in_stream.codec_context.width * scale) // 2 * 2
+        out_stream = dst.add_stream("libx264", rate=rate)
+        out_stream.width, out_stream.height = width, int(in_stream.codec_context.height * scale) // 2 * 2
+        out_stream.pix_fmt = "yuv420p"
+        out_stream.options = {"crf": str(crf), "preset": "veryfast"}
+        for frame in src.decode(in_stream):
+            frame = frame.reformat(width=out_stream.width, height=out_stream.height, format="yuv420p")
+            frame.pts = None
+            for packet in out_stream.encode(frame):
+                dst.mux(packet)
+        for packet in out_stream.encode(None):
+            dst.mux(packet)
+    os.replace(partial, target)
+
+
+class SignIndex:
+    """Immutable snapshot of the clip store; replaced as a whole on every rebuild"""
+
+    def __init__(self, clips: Dict[str, Dict]):
+        self.clips = clips
+        self.words: Dict[str, Dict] = {}
+        # Single letters and digits are only used to fingerspell, so "a" never plays the letter A
+        self.letters: Dict[str, Dict] = {}
+        # The plain clip ("hello.mp4") is primary over variants ("Hello (2).mp4"); ties sort case-insensitively
+        for entry in sorted(clips.values(), key=lambda e: (is_variant(e["path"]), e["path"].casefold(), e["path"])):
+            (self.letters if len(entry["key"]) == 1 else self.words).setdefault(entry["key"], entry)
+        self.max_phrase = max((len(key.split()) for key in self.words), default=1)
+
+
+class SignDictionary:
+    """Clip index for text-to-sign, kept in sync with the files under root"""
+
+    def __init__(self, root: str = SIGN_VIDEOS_DIR, rendition_height: int = SIGN_RENDITION_HEIGHT,
+                 crf: int = SIGN_RENDITION_CRF):
+        self.root = root
+        self.rendition_height = rendition_height if av is not None else 0
+        self.crf = crf
+        self.rendition_dir = os.path.join(root, RENDITION_DIR)
+        self.index = SignIndex({})
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self.refresh_lock = threading.Lock()
+        self.transcode_queue = queue.Queue()
+        self.rebuilds = 0
+        self.last_refresh_ms = 0.0
+
+    def start(self, poll_seconds: float = SIGN_INDEX_POLL_SECONDS):
+        self.refresh()
+        if poll_seconds > 0:
+            threading.Thread(target=self._poll, args=(poll_seconds,), daemon=True, name="sign-index").start()
+        threading.Thread(target=self._transcode_worker, daemon=True, name="sign-renditions").start()
+
+    # ------------------------
+    # Index maintenance
+    # ------------------------
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """relative path -> (size, mtime_ns) for every video under root"""
+        files = {}
+        for folder, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d != RENDITION_DIR]
+            for name in names:
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    path = os.path.join(folder, name)
+                    stat = os.stat(path)
+                    files[os.path.relpath(path, self.root)] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def refresh(self) -> Dict[str, int]:
+        """Re-index only the files added, changed or removed since the last scan"""
+        with self.refresh_lock:
+            start = time.perf_counter()
+            current = self.scan()
+            changed = [p for p, sig in current.items() if self.files.get(p) != sig]
+            removed = [p for p in self.files if p not in current]
+            if changed or removed:
+                gone = set(changed) | set(removed)
+                clips = {cid: e for cid, e in self.index.clips.items() if e["relpath"] not in gone}
+                for entry in self.index.clips.values():
+                    if entry["relpath"] in gone:
+                        self._remove_rendition(entry["id"])
+                for relpath in changed:
+                    size, mtime_ns = current[relpath]
+                    entry = {
+                        "id": clip_id(relpath, size, mtime_ns),
+                        "key": normalize_key(os.path.splitext(os.path.basename(relpath))[0]),
+                        "label": os.path.splitext(os.path.basename(relpath))[0],
+                        "relpath": relpath,
+                        "path": os.path.join(self.root, relpath),
+                        "size": size,
+                        "duration": None,
+                    }
+                    clips[entry["id"]] = entry
+                    self.transcode_queue.put(entry)
+                self.index = SignIndex(clips)
+                self.files = current
+                self.rebuilds += 1
+            self.last_refresh_ms = (time.perf_counter() - start) * 1000
+            if changed or removed:
+                logger.info(f"Sign index: {len(changed)} added/changed, {len(removed)} removed, "
+                            f"{len(self.index.words)} words in {self.last_refresh_ms:.1f} ms")
+            return {"changed": len(changed), "removed": len(removed), "words": len(self.index.words)}
+
+    def _poll(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Sign index refresh failed: {e}")
+
+    def rendition_path(self, cid: str) -> str:
+        return os.path.join(self.rendition_dir, f"{cid}.mp4")
+
+    def _remove_rendition(self, cid: str):
+        try:
+            os.unlink(self.rendition_path(cid))
+        except OSError:
+            pass
+
+    def _transcode_worker(self):
+        while True:
+            entry = self.transcode_queue.get()
+            try:
+                entry["duration"] = probe_duration(entry["path"])
+                target = self.rendition_path(entry["id"])
+                if self.rendition_height and not os.path.exists(target):
+                    os.makedirs(self.rendition_dir, exist_ok=True)
+                    transcode(entry["path"], target, self.rendition_height, self.crf)
+            except Exception as e:
+                logger.warning(f"Could not transcode {entry['relpath']}: {e}")
+
+    # ------------------------
+    # Lookup
+    # ------------------------
+    @staticmethod
+    def _item(entry: Dict, text: str, kind: str) -> Dict:
+        return {"text": text, "sign": entry["label"], "type": kind, "clip": entry["id"],
+                "url": f"/sign-clips/{entry['id']}.mp4", "duration": entry["duration"]}
+
+    def lookup(self, text: str) -> Dict:
+        """Playlist of clips for a sentence: signs, then fingerspelling, for each token"""
+        index = self.index  # one snapshot per request, even if a rebuild swaps it mid-lookup
+        words = index.words
+        tokens = tokenize(text)
+        playlist, missing, skipped = [], [], []
+        i = 0
+        while i < len(tokens):
+            for n in range(min(index.max_phrase, len(tokens) - i), 1, -1):
+                phrase = " ".join(tokens[i:i + n])
+                if phrase in words:
+                    playlist.append(self._item(words[phrase], phrase, "phrase"))
+                    i += n
+                    break
+            else:
+                token = tokens[i]
+                i += 1
+                lemma = next((c for c in lemma_candidates(token) if c in words), None)
+                if lemma is not None:
+                    playlist.append(self._item(words[lemma], token, "word"))
+                elif token in SKIP_WORDS:
+                    skipped.append(token)
+                else:
+                    chars = [ch for ch in token if ch.isalnum()]
+                    if all(ch in index.letters for ch in chars):
+                        playlist += [self._item(index.letters[ch], ch, "letter") for ch in chars]
+                    else:
+                        missing.append(token)
+        return {"text": text, "playlist": playlist, "missing": missing, "skipped": skipped}
+
+    def clip_file(self, cid: str) -> Optional[str]:
+        """Path to serve for a clip id: the rendition once transcoded, else the original"""
+        entry = self.index.clips.get(cid)
+        if entry is None:
+            return None
+        rendition = self.rendition_path(cid)
+        return rendition if os.path.exists(rendition) else entry["path"]
+
+    def stats(self) -> Dict:
+        index = self.index
+        return {"root": self.root, "clips": len(index.clips), "words": len(index.words),
+                "letters": len(index.letters),
+                "renditions_pending": self.transcode_queue.qsize(), "rebuilds": self.rebuilds,
+                "last_refresh_ms": round(self.last_refresh_ms, 2)}
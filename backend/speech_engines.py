@@ -0,0 +1,255 @@
+"""
+Pluggable speech recognition engines for the /transcribe endpoint.
+
+Engines are tried in the order given by SPEECH_ENGINES; the first one that is
+installed and has a model for the requested language handles the request.
+Local engines (Vosk, faster-whisper) load their models once and keep them in
+memory, and all recognition runs on a worker pool sized to the CPU count.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import speech_recognition as sr
+
+import metrics
+
+try:
+    from vosk import Model as VoskModel, KaldiRecognizer, SetLogLevel
+    SetLogLevel(-1)
+except ImportError:
+    VoskModel = None
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+try:
+    from faster_whisper.tokenizer import _LANGUAGE_CODES as WHISPER_LANGUAGES
+except ImportError:
+    WHISPER_LANGUAGES = ()
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+TARGET_SAMPLE_RATE = 16000
+TARGET_SAMPLE_WIDTH = 2  # int16
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VOSK_MODEL_DIR = os.environ.get("VOSK_MODEL_DIR", os.path.join(BASE_DIR, "models", "vosk"))
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "small")
+SPEECH_ENGINES = os.environ.get("SPEECH_ENGINES", "vosk,whisper,google")
+RECOGNIZER_WORKERS = int(os.environ.get("RECOGNIZER_WORKERS", os.cpu_count() or 1))
+PRELOAD_LANGUAGES = os.environ.get("SPEECH_PRELOAD_LANGUAGES", "en")
+
+# Google's recognizer wants a region tag; everything else takes the bare code
+GOOGLE_LANGUAGE_TAGS = {
+    'en': 'en-US', 'hi': 'hi-IN', 'bn': 'bn-IN', 'ta': 'ta-IN', 'te': 'te-IN',
+    'kn': 'kn-IN', 'gu': 'gu-IN', 'ml': 'ml-IN', 'mr': 'mr-IN', 'pa': 'pa-Guru-IN',
+    'ur': 'ur-IN', 'ne': 'ne-NP', 'si': 'si-LK'
+}
+
+
+def base_language(language: str) -> str:
+    """Bare lowercase language code: 'en-US', 'en_us' and 'EN' are all 'en'"""
+    return language.replace("_", "-").split("-")[0].lower()
+
+
+def audio_duration(audio: sr.AudioData) -> float:
+    """Length of an AudioData clip in seconds"""
+    return len(audio.frame_data) / float(audio.sample_rate * audio.sample_width)
+
+
+class RecognizerEngine:
+    """Base class for a speech recognition engine"""
+
+    name = "base"
+    local = False
+
+    def is_available(self) -> bool:
+        return True
+
+    def supports(self, language: str) -> bool:
+        return True
+
+    def preload(self, languages: List[str]):
+        """Load models ahead of the first request"""
+
+    def recognize(self, audio: sr.AudioData, language: str) -> str:
+        """Return the recognized text, or an empty string if nothing was heard"""
+        raise NotImplementedError
+
+
+class GoogleEngine(RecognizerEngine):
+    """Google Web Speech API through speech_recognition (needs network)"""
+
+    name = "google"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio: sr.AudioData, language: str) -> str:
+        tag = GOOGLE_LANGUAGE_TAGS.get(language, language)
+        try:
+            return self.recognizer.recognize_google(audio, language=tag)
+        except sr.UnknownValueError:
+            return ""
+
+
+class VoskEngine(RecognizerEngine):
+    """Offline Kaldi recognizer with one model directory per language code"""
+
+    name = "vosk"
+    local = True
+
+    def __init__(self, model_dir: str = VOSK_MODEL_DIR):
+        self.model_dir = model_dir
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return VoskModel is not None and os.path.isdir(self.model_dir)
+
+    def supports(self, language: str) -> bool:
+        return self.is_available() and os.path.isdir(os.path.join(self.model_dir, language))
+
+    def get_model(self, language: str):
+        model = self.models.get(language)
+        if model is None:
+            with self.lock:
+                model = self.models.get(language)
+                if model is None:
+                    path = os.path.join(self.model_dir, language)
+                    logger.info(f"Loading Vosk model for '{language}' from {path}")
+                    model = VoskModel(path)
+                    self.models[language] = model
+        return model
+
+    def preload(self, languages: List[str]):
+        for language in languages:
+            if self.supports(language):
+                self.get_model(language)
+
+    def recognize(self, audio: sr.AudioData, language: str) -> str:
+        # Models are shared between threads; recognizers are per call
+        recognizer = KaldiRecognizer(self.get_model(language), TARGET_SAMPLE_RATE)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=TARGET_SAMPLE_RATE,
+                                                     convert_width=TARGET_SAMPLE_WIDTH))
+        return json.loads(recognizer.FinalResult()).get("text", "")
+
+
+class WhisperEngine(RecognizerEngine):
+    """Offline multilingual faster-whisper model, int8 quantized on CPU"""
+
+    name = "whisper"
+    local = True
+
+    def __init__(self, model_name: str = WHISPER_MODEL, workers: int = RECOGNIZER_WORKERS):
+        self.model_name = model_name
+        self.workers = workers
+        self.model = None
+        self.lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return WhisperModel is not None
+
+    def languages(self):
+        # English-only checkpoints (small.en, distil-small.en, ...) are named for it
+        return ("en",) if self.model_name.endswith(".en") else WHISPER_LANGUAGES
+
+    def supports(self, language: str) -> bool:
+        return self.is_available() and base_language(language) in self.languages()
+
+    def get_model(self):
+        if self.model is None:
+            with self.lock:
+                if self.model is None:
+                    logger.info(f"Loading faster-whisper model '{self.model_name}' (int8)")
+                    # One intra-op thread per call; concurrency comes from the worker pool
+                    self.model = WhisperModel(self.model_name, device="cpu", compute_type="int8",
+                                              cpu_threads=1, num_workers=self.workers)
+        return self.model
+
+    def preload(self, languages: List[str]):
+        if self.is_available():
+            self.get_model()
+
+    def recognize(self, audio: sr.AudioData, language: str) -> str:
+        import numpy as np
+
+        raw = audio.get_raw_data(convert_rate=TARGET_SAMPLE_RATE, convert_width=TARGET_SAMPLE_WIDTH)
+        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self.get_model().transcribe(samples, language=base_language(language), beam_size=1)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+ENGINE_CLASSES = {
+    GoogleEngine.name: GoogleEngine,
+    VoskEngine.name: VoskEngine,
+    WhisperEngine.name: WhisperEngine,
+}
+
+
+class RecognitionService:
+    """Routes recognition requests to an engine and runs them on a worker pool"""
+
+    def __init__(self, engine_names: Optional[List[str]] = None, max_workers: int = RECOGNIZER_WORKERS):
+        if engine_names is None:
+            engine_names = [name.strip() for name in SPEECH_ENGINES.split(",") if name.strip()]
+        self.engines = [ENGINE_CLASSES[name]() for name in engine_names if name in ENGINE_CLASSES]
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                           thread_name_prefix="recognizer")
+
+    def available_engines(self) -> List[str]:
+        return [engine.name for engine in self.engines if engine.is_available()]
+
+    def select_engine(self, language: str, engine_name: Optional[str] = None) -> Optional[RecognizerEngine]:
+        """Pick the requested engine, or the first configured one that supports the language"""
+        for engine in self.engines:
+            if engine_name and engine.name != engine_name:
+                continue
+            if engine.supports(language):
+                return engine
+        return None
+
+    def preload(self, languages: Optional[List[str]] = None):
+        if languages is None:
+            languages = [code.strip() for code in PRELOAD_LANGUAGES.split(",") if code.strip()]
+        for engine in self.engines:
+            if engine.local and engine.is_available():
+                engine.preload(languages)
+
+    def _run(self, engine: RecognizerEngine, audio: sr.AudioData, language: str) -> Dict[str, any]:
+        start = time.perf_counter()
+        text = engine.recognize(audio, language)
+        elapsed = time.perf_counter() - start
+        metrics.record_stage(f"recognize_{engine.name}", elapsed)
+        duration = audio_duration(audio)
+        return {
+            "text": text,
+            "engine": engine.name,
+            "language": language,
+            "audio_duration": duration,
+            "processing_time": elapsed,
+            "real_time_factor": elapsed / duration if duration else 0.0
+        }
+
+    def submit(self, audio: sr.AudioData, language: str = 'en', engine_name: Optional[str] = None):
+        """Queue a recognition job and return its Future"""
+        engine = self.select_engine(language, engine_name)
+        if engine is None:
+            raise ValueError(f"No speech engine available for language '{language}'"
+                             + (f" (requested: {engine_name})" if engine_name else ""))
+        return self.executor.submit(self._run, engine, audio, language)
+
+    def recognize(self, audio: sr.AudioData, language: str = 'en', engine_name: Optional[str] = None,
+                  timeout: Optional[float] = None) -> Dict[str, any]:
+        return self.submit(audio, language, engine_name).result(timeout=timeout)
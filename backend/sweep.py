@@ -0,0 +1,435 @@
+"""
+Hyperparameter sweeps for the sign model heads over cached backbone features.
+
+1. Features - MobileNetV2 embeddings are extracted once per dataset (video:
+   (N, MAX_FRAMES, 1280) clips, image: (N, 1280) with optional augmented
+   copies) and cached as .npy under sweeps/features/<key>/; later sweeps with
+   the same data and settings reuse them. Trials memory-map the arrays.
+2. Trials - configurations sampled from the search space train only the head,
+   in parallel worker processes, each limited to --threads CPU threads.
+3. Successive halving - every trial trains for --min-epochs; the best 1/eta by
+   validation loss continue (resuming from their saved weights) to eta times
+   the budget, and so on up to --max-epochs.
+4. Results - every rung of every trial is logged to sweeps/sweeps.db (SQLite).
+   The best trial is exported to sweeps/<sweep_id>/best/ as a servable .keras
+   model (the image head is joined to the backbone) with labels, calibration
+   and a manifest; --install copies it over the serving artifacts.
+
+    python sweep.py video --trials 27 --min-epochs 5 --max-epochs 45 --eta 3 --threads 2
+    python sweep.py image --trials 16 --install
+    python sweep.py show                      # best trials of past sweeps
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import shutil
+import sqlite3
+import hashlib
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from preprocessing import IMG_SIZE, load_image_dir, normalize, augment, read_clip, pad_features, validation_mask
+from profiling import git_commit
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+logger = logging.getLogger(__name__)
+
+SWEEP_DIR = "sweeps"
+DB_PATH = os.path.join(SWEEP_DIR, "sweeps.db")
+BACKBONE_WEIGHTS = os.environ.get("BACKBONE_WEIGHTS", "imagenet")
+
+SEARCH_SPACES = {
+    "video": {
+        "lstm_units_1": [64, 128, 256],
+        "lstm_units_2": [32, 64, 128],
+        "dense_units": [32, 64, 128],
+        "dropout": [0.2, 0.3, 0.5],
+        "recurrent_dropout": [0.0, 0.2],
+        "learning_rate": [3e-4, 1e-3, 3e-3],
+        "batch_size": [2, 4, 8, 16],
+    },
+    "image": {
+        "dense_units": [64, 128, 256, 512],
+        "dropout": [0.2, 0.3, 0.5],
+        "learning_rate": [3e-4, 1e-3, 3e-3],
+        "batch_size": [8, 16, 32, 64],
+    },
+}
+# The configurations train_video_model.py / train_image_model.py use today, always trial 0
+BASELINES = {
+    "video": {"lstm_units_1": 128, "lstm_units_2": 64, "dense_units": 64, "dropout": 0.3,
+              "recurrent_dropout": 0.2, "learning_rate": 1e-3, "batch_size": 2},
+    "image": {"dense_units": 128, "dropout": 0.3, "learning_rate": 1e-3, "batch_size": 16},
+}
+ARTIFACTS = {
+    "video": ("sign_model_weights.keras", "labels.json"),
+    "image": ("sign_image_model.keras", "labels_image.json"),
+}
+# Distilled student backbone (distill.py); video heads here are trained on MobileNetV2 features
+STUDENT_BACKBONE_FILE = "sign_backbone.keras"
+# train_video_model.MAX_FRAMES, used when there is no trained video head to read it from
+DEFAULT_MAX_FRAMES = 10
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+# ------------------------
+# Feature cache
+# ------------------------
+def build_backbone():
+    import tensorflow as tf
+    backbone = tf.keras.applications.MobileNetV2(
+        input_shape=(IMG_SIZE, IMG_SIZE, 3), include_top=False, pooling="avg",
+        weights=None if BACKBONE_WEIGHTS.lower() == "none" else BACKBONE_WEIGHTS)
+    backbone.trainable = False
+    return backbone
+
+
+def dataset_key(task: str, root: str, settings: Dict) -> str:
+    """Hash of every input file's path/size/mtime plus the extraction settings"""
+    digest = hashlib.blake2b(json.dumps([task, settings, BACKBONE_WEIGHTS, IMG_SIZE]).encode(), digest_size=10)
+    for folder, _, files in sorted(os.walk(root)):
+        for filename in sorted(files):
+            stat = os.stat(os.path.join(folder, filename))
+            digest.update(f"{folder}/{filename}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def extract_video_features(video_dir: str, max_frames: int, augment_clips: bool, seed: int):
+    from sklearn.model_selection import train_test_split
+
+    backbone = build_backbone()
+    rng = np.random.default_rng(seed)
+    class_folders = [f for f in sorted(os.listdir(video_dir)) if os.path.isdir(os.path.join(video_dir, f))]
+    X, y, class_names = [], [], []
+    for folder in class_folders:
+        videos = [f for f in sorted(os.listdir(os.path.join(video_dir, folder))) if f.endswith(".mp4")]
+        if not videos:
+            continue
+        class_names.append(folder)
+        for vid in videos:
+            clip = normalize(read_clip(os.path.join(video_dir, folder, vid), max_frames))
+            if augment_clips:
+                augment(clip, rng)
+            X.append(pad_features(backbone.predict(clip, verbose=0), max_frames))
+            y.append(len(class_names) - 1)
+    X, y = np.stack(X).astype(np.float32), np.asarray(y)
+    # Same split as train_video_model.py
+    if len(class_names) > 1:
+        X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    else:
+        X_train, X_val, y_train, y_val = X, X, y, y
+    return X_train, y_train, X_val, y_val, class_names
+
+
+def extract_image_features(image_dir: str, augment_copies: int, seed: int):
+    backbone = build_backbone()
+    rng = np.random.default_rng(seed)
+    images, labels, class_names = load_image_dir(image_dir, IMG_SIZE)
+    val_mask = validation_mask(labels, len(class_names), 0.2)
+
+    def embed(batch):
+        return backbone.predict(batch, batch_size=64, verbose=0)
+
+    train_images = images[~val_mask]
+    X_train = [embed(normalize(train_images))]
+    for _ in range(augment_copies):
+        X_train.append(embed(augment(normalize(train_images), rng)))
+    y_train = np.tile(labels[~val_mask], augment_copies + 1)
+    X_val = embed(normalize(images[val_mask]))
+    return np.concatenate(X_train), y_train, X_val, labels[val_mask], class_names
+
+
+def cached_features(task: str, data_dir: str, max_frames: int, augment_copies: int, seed: int) -> str:
+    settings = {"max_frames": max_frames, "augment": augment_copies, "seed": seed}
+    directory = os.path.join(SWEEP_DIR, "features", f"{task}-{dataset_key(task, data_dir, settings)}")
+    if os.path.exists(os.path.join(directory, "meta.json")):
+        logger.info(f"Reusing cached features in {directory}")
+        return directory
+
+    start = time.perf_counter()
+    if task == "video":
+        arrays = extract_video_features(data_dir, max_frames, augment_copies > 0, seed)
+    else:
+        arrays = extract_image_features(data_dir, augment_copies, seed)
+    X_train, y_train, X_val, y_val, class_names = arrays
+    os.makedirs(directory, exist_ok=True)
+    for name, array in (("X_train", X_train), ("y_train", y_train), ("X_val", X_val), ("y_val", y_val)):
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({"task": task, "class_names": class_names, "settings": settings,
+                   "backbone_weights": BACKBONE_WEIGHTS, "train": len(y_train), "val": len(y_val),
+                   "extract_seconds": round(time.perf_counter() - start, 1)}, f, indent=2)
+    logger.info(f"Extracted {len(y_train)} train / {len(y_val)} val features in "
+                f"{time.perf_counter() - start:.1f}s -> {directory}")
+    return directory
+
+
+# ------------------------
+# Trials (run in worker processes)
+# ------------------------
+def init_worker(threads: int):
+    """Pin each worker's TF pools to `threads` CPU threads (BLAS limits come from the inherited environment)"""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def build_head(task: str, params: Dict, input_shape: Tuple[int, ...], n_classes: int):
+    import tensorflow as tf
+    from tensorflow.keras import layers, models  # type: ignore
+
+    if task == "video":
+        model = models.Sequential([
+            layers.Input(shape=input_shape),
+            layers.LSTM(params["lstm_units_1"], return_sequences=True, dropout=params["dropout"],
+                        recurrent_dropout=params["recurrent_dropout"]),
+            layers.LSTM(params["lstm_units_2"], dropout=params["dropout"],
+                        recurrent_dropout=params["recurrent_dropout"]),
+            layers.Dense(params["dense_units"], activation="relu"),
+            layers.Dropout(params["dropout"]),
+            layers.Dense(n_classes, activation="softmax")
+        ])
+    else:
+        model = models.Sequential([
+            layers.Input(shape=input_shape),
+            layers.Dense(params["dense_units"], activation="relu"),
+            layers.Dropout(params["dropout"]),
+            layers.Dense(n_classes, activation="softmax")
+        ])
+    model.compile(optimizer=tf.keras.optimizers.Adam(params["learning_rate"]),
+                  loss="sparse_categorical_crossentropy", metrics=["accuracy"])
+    return model
+
+
+def run_trial(task: str, params: Dict, features_dir: str, trial_dir: str, start_epoch: int, end_epoch: int,
+              seed: int) -> Dict:
+    """Train one trial from start_epoch to end_epoch (resuming its saved model) and evaluate it"""
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    load = lambda name: np.load(os.path.join(features_dir, f"{name}.npy"), mmap_mode="r")  # noqa: E731
+    X_train, y_train, X_val, y_val = load("X_train"), load("y_train"), load("X_val"), load("y_val")
+    with open(os.path.join(features_dir, "meta.json")) as f:
+        n_classes = len(json.load(f)["class_names"])
+
+    model_path = os.path.join(trial_dir, "model.keras")
+    if start_epoch > 0 and os.path.exists(model_path):
+        model = tf.keras.models.load_model(model_path)
+    else:
+        os.makedirs(trial_dir, exist_ok=True)
+        model = build_head(task, params, X_train.shape[1:], n_classes)
+
+    start = time.perf_counter()
+    model.fit(np.asarray(X_train), np.asarray(y_train), initial_epoch=start_epoch, epochs=end_epoch,
+              batch_size=params["batch_size"], shuffle=True, verbose=0)
+    val_loss, val_accuracy = model.evaluate(np.asarray(X_val), np.asarray(y_val), verbose=0)
+    model.save(model_path)
+    return {"val_loss": float(val_loss), "val_accuracy": float(val_accuracy), "epochs": end_epoch,
+            "seconds": round(time.perf_counter() - start, 2)}
+
+
+# ------------------------
+# Results store
+# ------------------------
+def open_db(path: str = DB_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("""CREATE TABLE IF NOT EXISTS trials (
+        sweep_id TEXT, trial_id INTEGER, task TEXT, params TEXT, rung INTEGER, epochs INTEGER,
+        val_loss REAL, val_accuracy REAL, seconds REAL, features TEXT, created REAL,
+        PRIMARY KEY (sweep_id, trial_id, rung))""")
+    return db
+
+
+def log_result(db, sweep_id, trial_id, task, params, rung, result, features_dir):
+    db.execute("INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+               (sweep_id, trial_id, task, json.dumps(params), rung, result["epochs"], result["val_loss"],
+                result["val_accuracy"], result["seconds"], features_dir, time.time()))
+    db.commit()
+
+
+# ------------------------
+# Sweep
+# ------------------------
+def sample_configs(task: str, n: int, seed: int) -> List[Dict]:
+    rng = np.random.default_rng(seed)
+    space = SEARCH_SPACES[task]
+    configs, seen = [dict(BASELINES[task])], {json.dumps(BASELINES[task], sort_keys=True)}
+    attempts = 0
+    while len(configs) < n and attempts < n * 50:
+        attempts += 1
+        config = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        config = {k: v.item() if hasattr(v, "item") else v for k, v in config.items()}
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def rung_budgets(min_epochs: int, max_epochs: int, eta: int) -> List[int]:
+    budgets = [min_epochs]
+    while budgets[-1] * eta <= max_epochs:
+        budgets.append(budgets[-1] * eta)
+    if budgets[-1] < max_epochs:
+        budgets.append(max_epochs)
+    return budgets
+
+
+def successive_halving(args, features_dir: str, sweep_id: str, db) -> Tuple[int, Dict, Dict]:
+    configs = sample_configs(args.task, args.trials, args.seed)
+    budgets = rung_budgets(args.min_epochs, args.max_epochs, args.eta)
+    sweep_dir = os.path.join(SWEEP_DIR, sweep_id)
+    workers = max(1, args.workers or (os.cpu_count() or 1) // args.threads)
+    logger.info(f"Sweep {sweep_id}: {len(configs)} trials, epoch budgets {budgets}, "
+                f"{workers} workers x {args.threads} threads")
+
+    alive = list(range(len(configs)))
+    trained = {i: 0 for i in alive}
+    results = {}
+    # spawn: TensorFlow must not be forked after initialization. Spawned children import numpy and cv2
+    # (through this module) before the initializer runs, so the BLAS thread limits must already be in
+    # the environment they inherit; the parent's own values are put back afterwards.
+    context = multiprocessing.get_context("spawn")
+    saved_env = {var: os.environ.get(var) for var in THREAD_ENV_VARS + ("TF_CPP_MIN_LOG_LEVEL",)}
+    os.environ.update({var: str(args.threads) for var in THREAD_ENV_VARS})
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                                 initargs=(args.threads,)) as pool:
+            for rung, budget in enumerate(budgets):
+                futures = {i: pool.submit(run_trial, args.task, configs[i], features_dir,
+                                          os.path.join(sweep_dir, f"trial_{i:03d}"), trained[i], budget,
+                                          args.seed + i)
+                           for i in alive}
+                for i, future in futures.items():
+                    results[i] = future.result()
+                    trained[i] = budget
+                    log_result(db, sweep_id, i, args.task, configs[i], rung, results[i], features_dir)
+                ranked = sorted(alive, key=lambda i: results[i]["val_loss"])
+                best = ranked[0]
+                logger.info(f"Rung {rung} ({budget} epochs): best trial {best} val_loss "
+                            f"{results[best]['val_loss']:.4f} acc {results[best]['val_accuracy']:.3f} "
+                            f"{configs[best]}")
+                if rung < len(budgets) - 1:
+                    alive = ranked[:max(1, math.ceil(len(ranked) / args.eta))]
+    finally:
+        for var, value in saved_env.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+    return best, configs[best], results[best]
+
+
+def export_best(args, sweep_id: str, trial: int, params: Dict, result: Dict, features_dir: str) -> str:
+    """Write the best trial as a servable model with labels, calibration and manifest"""
+    import tensorflow as tf
+    from calibration import save_calibration
+
+    with open(os.path.join(features_dir, "meta.json")) as f:
+        meta = json.load(f)
+    model_file, labels_file = ARTIFACTS[args.task]
+    best_dir = os.path.join(SWEEP_DIR, sweep_id, "best")
+    os.makedirs(best_dir, exist_ok=True)
+
+    head = tf.keras.models.load_model(os.path.join(SWEEP_DIR, sweep_id, f"trial_{trial:03d}", "model.keras"))
+    X_val, y_val = np.load(os.path.join(features_dir, "X_val.npy")), np.load(os.path.join(features_dir, "y_val.npy"))
+    if args.task == "image":
+        # Serving takes images, so join the head to the backbone it was trained on
+        model = tf.keras.Sequential([tf.keras.layers.Input(shape=(IMG_SIZE, IMG_SIZE, 3)), build_backbone()]
+                                    + head.layers)
+    else:
+        model = head
+    model_path = os.path.join(best_dir, model_file)
+    model.save(model_path)
+    calibration = save_calibration(model_path, head.predict(X_val, verbose=0), y_val)
+    with open(os.path.join(best_dir, labels_file), "w") as f:
+        json.dump(meta["class_names"], f)
+
+    manifest = {
+        "sweep_id": sweep_id, "trial": trial, "task": args.task, "params": params, "metrics": result,
+        "calibration": calibration, "features": meta, "backbone_weights": BACKBONE_WEIGHTS,
+        "commit": git_commit(), "files": [model_file, labels_file, os.path.basename(model_path).replace(
+            ".keras", ".calibration.json")],
+    }
+    with open(os.path.join(best_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if args.install:
+        for filename in manifest["files"]:
+            shutil.copy(os.path.join(best_dir, filename), filename)
+        if args.task == "video" and os.path.exists(STUDENT_BACKBONE_FILE):
+            # The installed head would otherwise be served on the student's features
+            os.remove(STUDENT_BACKBONE_FILE)
+            logger.info(f"Removed {STUDENT_BACKBONE_FILE}; the sweep head runs on MobileNetV2")
+        logger.info(f"Installed {', '.join(manifest['files'])} into {os.getcwd()}")
+    return best_dir
+
+
+def serving_max_frames() -> int:
+    """Frames per clip of the installed video head, so a sweep matches what main.py serves"""
+    model_file = ARTIFACTS["video"][0]
+    if not os.path.exists(model_file):
+        return DEFAULT_MAX_FRAMES
+    import tensorflow as tf
+    max_frames = tf.keras.models.load_model(model_file, compile=False).input_shape[1]
+    logger.info(f"Using {max_frames} frames per clip from {model_file}")
+    return max_frames
+
+
+def show(db, limit: int = 10):
+    rows = db.execute("""SELECT sweep_id, task, trial_id, epochs, val_loss, val_accuracy, params FROM trials t
+                         WHERE val_loss = (SELECT MIN(val_loss) FROM trials WHERE sweep_id = t.sweep_id
+                                           AND rung = (SELECT MAX(rung) FROM trials WHERE sweep_id = t.sweep_id))
+                         ORDER BY created DESC LIMIT ?""", (limit,)).fetchall()
+    for sweep_id, task, trial, epochs, loss, acc, params in rows:
+        print(f"{sweep_id}  {task:<5} trial {trial:>3}  {epochs:>3} epochs  val_loss {loss:.4f}  "
+              f"val_acc {acc:.3f}  {params}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("task", choices=["video", "image", "show"])
+    parser.add_argument("--data-dir", help="default: video/ or image/")
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--min-epochs", type=int, default=5)
+    parser.add_argument("--max-epochs", type=int, default=45)
+    parser.add_argument("--eta", type=int, default=3, help="keep the best 1/eta trials at each rung")
+    parser.add_argument("--threads", type=int, default=2, help="CPU threads per trial process")
+    parser.add_argument("--workers", type=int, help="parallel trials (default: CPU count / threads)")
+    parser.add_argument("--max-frames", type=int,
+                        help="frames per clip (video; default: what the trained video head takes, else 10)")
+    parser.add_argument("--augment-copies", type=int, default=1,
+                        help="augmented copies of the training set to embed (video: augment clips if > 0)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--install", action="store_true", help="copy the best model over the serving artifacts")
+    args = parser.parse_args()
+
+    db = open_db()
+    if args.task == "show":
+        show(db)
+        return
+
+    data_dir = args.data_dir or args.task
+    if args.task == "video" and args.max_frames is None:
+        args.max_frames = serving_max_frames()
+    features_dir = cached_features(args.task, data_dir, args.max_frames, args.augment_copies, args.seed)
+    sweep_id = time.strftime("%Y%m%d-%H%M%S") + f"-{args.task}"
+    start = time.perf_counter()
+    trial, params, result = successive_halving(args, features_dir, sweep_id, db)
+    best_dir = export_best(args, sweep_id, trial, params, result, features_dir)
+    logger.info(f"Sweep {sweep_id} finished in {time.perf_counter() - start:.1f}s; best trial {trial} "
+                f"({result}) exported to {best_dir}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""Phrase-table tier tests against small tables in a temporary directory"""
+
+import pytest
+
+from phrase_table import PhraseTables, PhraseTranslator
+
+
+@pytest.fixture
+def translator(tmp_path):
+    (tmp_path / "en-hi.tsv").write_text("hello\tनमस्ते\nthank you\tधन्यवाद\nno\tनहीं\nwater\tपानी\n"
+                                        "please\tकृपया\n", encoding="utf-8")
+    (tmp_path / "en-hi.medical.tsv").write_text("water\tजल\n", encoding="utf-8")
+    return PhraseTranslator(PhraseTables(str(tmp_path), poll_seconds=0))
+
+
+def upstream(calls):
+    def remote(text, source):
+        calls.append(text)
+        return {"success": True, "translated_text": f"<{text}>", "source_language": "en",
+                "target_language": "hi", "translation_method": "google_translate"}
+    return remote
+
+
+def test_one_phrase_per_segment_is_local(translator):
+    calls = []
+    result = translator.translate("Hello, thank you!", "hi", "en", None, upstream(calls))
+    assert result["translation_method"] == "phrase_table"
+    assert result["translated_text"] == "नमस्ते, धन्यवाद!"
+    assert calls == []
+
+
+def test_several_entries_in_one_segment_go_upstream(translator):
+    calls = []
+    result = translator.translate("please no water", "hi", "en", None, upstream(calls))
+    assert result["translation_method"] == "google_translate"
+    assert calls == ["please no water"]
+
+
+def test_several_entries_keep_glossary_terms_pinned(translator):
+    calls = []
+    result = translator.translate("no water", "hi", "en", "medical", upstream(calls))
+    assert calls == ["no [0]"]
+    assert result["translated_text"] == "<no जल>"
+    assert result["translation_method"] == "phrase_table+google_translate"
@@ -0,0 +1,34 @@
+"""label_segments tests on synthetic per-frame posteriors"""
+
+import numpy as np
+
+from segmentation import label_segments
+
+CLASSES = ["hello", "thanks"]
+PERIOD = 0.1
+
+
+def posteriors(runs):
+    """(label or -1 for low confidence, frames) runs -> (times, posteriors)"""
+    rows = []
+    for label, frames in runs:
+        row = [0.5, 0.5] if label < 0 else [0.05, 0.05]
+        if label >= 0:
+            row[label] = 0.95
+        rows += [row] * frames
+    return np.arange(len(rows)) * PERIOD, np.array(rows)
+
+
+def test_short_blip_is_bridged():
+    times, probs = posteriors([(0, 10), (1, 2), (0, 10)])
+    segments = label_segments(times, probs, CLASSES, PERIOD, threshold=0.6, min_seconds=0.4)
+    assert [s["label"] for s in segments] == ["hello"]
+    assert (segments[0]["start"], segments[0]["end"]) == (0.0, 2.2)
+
+
+def test_long_low_confidence_gap_splits_repeated_sign():
+    times, probs = posteriors([(0, 10), (-1, 15), (0, 10)])
+    segments = label_segments(times, probs, CLASSES, PERIOD, threshold=0.6, min_seconds=0.4)
+    assert [s["label"] for s in segments] == ["hello", "hello"]
+    assert (segments[0]["start"], segments[0]["end"]) == (0.0, 1.0)
+    assert (segments[1]["start"], segments[1]["end"]) == (2.5, 3.5)
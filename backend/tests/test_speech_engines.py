@@ -0,0 +1,29 @@
+"""Engine selection tests; no recognizer models are loaded"""
+
+import speech_engines
+from speech_engines import RecognitionService, WhisperEngine, base_language
+
+
+def test_base_language():
+    assert [base_language(code) for code in ("en", "en-US", "en_us", "EN", "pa-Guru-IN")] == \
+        ["en", "en", "en", "en", "pa"]
+
+
+def test_whisper_supports_only_listed_languages(monkeypatch):
+    monkeypatch.setattr(speech_engines, "WhisperModel", object)
+    monkeypatch.setattr(speech_engines, "WHISPER_LANGUAGES", ("en", "hi"))
+    engine = WhisperEngine("small")
+    assert engine.supports("en-US") and engine.supports("hi")
+    assert not engine.supports("xx") and not engine.supports("klingon")
+    assert not WhisperEngine("small.en").supports("hi")
+
+
+def test_unsupported_language_falls_back(monkeypatch):
+    monkeypatch.setattr(speech_engines, "WhisperModel", object)
+    monkeypatch.setattr(speech_engines, "WHISPER_LANGUAGES", ("en",))
+    service = RecognitionService(["whisper", "google"], max_workers=1)
+    try:
+        assert service.select_engine("en-US").name == "whisper"
+        assert service.select_engine("si").name == "google"
+    finally:
+        service.executor.shutdown()
@@ -0,0 +1,129 @@
+"""TTS service tests; headless, with the stub backend (and espeak when it is installed)"""
+
+import io
+import os
+import shutil
+import wave
+
+import pytest
+
+from tts_service import MIN_RATE, AudioCache, EspeakBackend, StubBackend, TTSService
+
+
+def read_wav(data: bytes):
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        return wav.getnchannels(), wav.getsampwidth(), wav.getframerate(), wav.getnframes()
+
+
+def test_stub_wav_format():
+    data = StubBackend().synthesize("hello there world", None, 150)
+    assert data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+    channels, width, rate, frames = read_wav(data)
+    assert (channels, width, rate) == (1, 2, StubBackend.sample_rate)
+    # Three words at 150 words per minute
+    assert frames == int(3 * 60 / 150 * StubBackend.sample_rate)
+
+
+def test_stub_length_follows_rate():
+    backend = StubBackend()
+    slow = read_wav(backend.synthesize("one two three four", None, 100))[3]
+    fast = read_wav(backend.synthesize("one two three four", None, 200))[3]
+    assert slow == 2 * fast
+
+
+@pytest.mark.skipif(not (shutil.which("espeak-ng") or shutil.which("espeak")), reason="espeak not installed")
+def test_espeak_wav_format():
+    backend = EspeakBackend(shutil.which("espeak-ng") or shutil.which("espeak"))
+    channels, width, _, frames = read_wav(backend.synthesize("hello world", None, 150))
+    assert (channels, width) == (1, 2) and frames > 0
+    assert backend.list_voices()
+
+
+def test_cache_hits_and_misses():
+    cache = AudioCache(max_bytes=100)
+    assert cache.get("a") is None
+    cache.put("a", b"x" * 10)
+    assert cache.get("a") == b"x" * 10
+    assert cache.stats() == {"entries": 1, "bytes": 10, "hits": 1, "misses": 1}
+
+
+def test_cache_evicts_least_recent_by_bytes():
+    cache = AudioCache(max_bytes=100)
+    cache.put("a", b"a" * 40)
+    cache.put("b", b"b" * 40)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", b"c" * 40)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size == 80
+
+
+def test_cache_skips_clips_larger_than_bound():
+    cache = AudioCache(max_bytes=100)
+    cache.put("a", b"a" * 50)
+    cache.put("big", b"x" * 101)
+    assert cache.get("big") is None
+    assert cache.size == 50
+
+
+def test_service_caches_by_text_voice_rate():
+    service = TTSService("stub", cache_bytes=1024 * 1024)
+    try:
+        audio, hit = service.synthesize("hello", None, 150)
+        assert not hit
+        assert service.synthesize("hello", None, 150) == (audio, True)
+        assert not service.synthesize("hello", None, 180)[1]
+        assert b"".join(service.stream(audio, chunk_size=1000)) == audio
+    finally:
+        service.shutdown()
+
+
+def test_service_clamps_rate():
+    service = TTSService("stub", cache_bytes=1024 * 1024)
+    try:
+        audio, _ = service.synthesize("hello there", None, 1)
+        assert service.synthesize("hello there", None, MIN_RATE) == (audio, True)
+        assert read_wav(audio)[3] == int(2 * 60 / MIN_RATE * StubBackend.sample_rate)
+    finally:
+        service.shutdown()
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    os.environ["TTS_ENGINE"] = "stub"
+    os.environ.setdefault("LANGID_INDEX_PATH", str(tmp_path_factory.mktemp("langid") / "index.npz"))
+    os.environ["SIGN_INDEX_POLL_SECONDS"] = "0"
+    import app
+    return app.app.test_client()
+
+
+def test_text_to_speech_endpoint(client):
+    response = client.post("/text-to-speech", json={"text": "good morning everyone", "rate": 150})
+    assert response.status_code == 200
+    assert response.mimetype == "audio/wav"
+    assert response.headers["X-TTS-Engine"] == "stub"
+    assert response.headers["X-TTS-Cache"] == "miss"
+    data = response.get_data()
+    assert int(response.headers["Content-Length"]) == len(data)
+    assert read_wav(data)[:3] == (1, 2, StubBackend.sample_rate)
+
+    again = client.post("/text-to-speech", json={"text": "good morning everyone", "rate": 150})
+    assert again.headers["X-TTS-Cache"] == "hit"
+    assert again.get_data() == data
+
+
+@pytest.mark.parametrize("body", [{}, {"text": ""}, {"text": "hi", "rate": "fast"}, {"text": ["hi"]},
+                                  {"text": "a" * 100000}, {"text": "hi", "rate": 1},
+                                  {"text": "hi", "rate": 10000}])
+def test_text_to_speech_rejects_bad_input(client, body):
+    response = client.post("/text-to-speech", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_get_voices_endpoint(client):
+    body = client.get("/get-voices").get_json()
+    assert body["success"] is True
+    assert body["engine"] == "stub"
+    assert body["voices"] == [{"id": "stub", "name": "Stub tone", "languages": ["en"]}]
+    assert set(body["cache"]) == {"entries", "bytes", "hits", "misses"}
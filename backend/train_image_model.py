@@ -1,4 +1,6 @@
 import os
+import sys
+import subprocess
 import json
 import numpy as np
 import tensorflow as tf
@@ -6,9 +8,10 @@ from tensorflow.keras import layers, models # type: ignore
 from tensorflow.keras.preprocessing.image import ImageDataGenerator # type: ignore
 from tensorflow.keras.callbacks import EarlyStopping # type: ignore
 from sklearn.utils.class_weight import compute_class_weight
+from preprocessing import IMG_SIZE, load_image_dir, normalize, validation_mask
+from calibration import save_calibration
 
 # Config
-IMG_SIZE = 128
 BATCH_SIZE = 16
 EPOCHS = 50
 IMAGE_DIR = "image"  # root folder containing subfolders per class
@@ -21,34 +24,25 @@ datagen = ImageDataGenerator(
     height_shift_range=0.2,
     shear_range=0.2,
     zoom_range=0.2,
-    horizontal_flip=True,
-    validation_split=0.2
+    horizontal_flip=True
 )
 
+# Decode + resize every image once with the same kernel the server uses,
+# into one uint8 array; the generators only augment and rescale per batch
+images, labels, class_names = load_image_dir(IMAGE_DIR, IMG_SIZE)
+print(f"Classes: {class_names}")
+
+# Hold out the first 20% of each class, as flow_from_directory's validation_split did
+val_mask = validation_mask(labels, len(class_names), 0.2)
+
 # Training set
-train_gen = datagen.flow_from_directory(
-    IMAGE_DIR,
-    target_size=(IMG_SIZE, IMG_SIZE),
-    batch_size=BATCH_SIZE,
-    class_mode="sparse",
-    subset="training"
-)
+train_gen = datagen.flow(images[~val_mask], labels[~val_mask], batch_size=BATCH_SIZE)
 
 # Validation set
-val_gen = datagen.flow_from_directory(
-    IMAGE_DIR,
-    target_size=(IMG_SIZE, IMG_SIZE),
-    batch_size=BATCH_SIZE,
-    class_mode="sparse",
-    subset="validation"
-)
-
-# Class names
-class_names = list(train_gen.class_indices.keys())
-print(f"Classes: {class_names}")
+val_gen = datagen.flow(images[val_mask], labels[val_mask], batch_size=BATCH_SIZE)
 
 # Compute class weights (to handle imbalance)
-y_train = train_gen.classes
+y_train = labels[~val_mask]
 class_weights = compute_class_weight("balanced", classes=np.unique(y_train), y=y_train)
 class_weight_dict = dict(enumerate(class_weights))
 print(f"Class weights: {class_weight_dict}")
@@ -89,4 +83,17 @@ model.save("sign_image_model.keras")
 with open("labels_image.json", "w") as f:
     json.dump(class_names, f)
 
+# Fit the softmax temperature on the un-augmented validation images (read by main.py)
+val_probs = model.predict(normalize(images[val_mask]), batch_size=BATCH_SIZE, verbose=0)
+calibration = save_calibration("sign_image_model.keras", val_probs, labels[val_mask])
+print(f"Calibration: {calibration}")
+
 print("✅ Image model training complete.")
+
+# Export the quantized TFLite model for the app's on-device mode and check it against Keras.
+# The .keras model is already saved, so a failed export is reported without failing the run.
+if os.environ.get("EXPORT_TFLITE", "1") == "1":
+    export = subprocess.run([sys.executable, "export_tflite.py", "--models", "image", "--verify"])
+    if export.returncode != 0:
+        print(f"⚠️ TFLite export failed (exit {export.returncode}); "
+              f"rerun with: python export_tflite.py --models image --verify")
@@ -1,5 +1,6 @@
 import os
-import cv2
+import sys
+import subprocess
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models # type: ignore
@@ -7,10 +8,12 @@ from tensorflow.keras.callbacks import EarlyStopping # type: ignore
 from sklearn.model_selection import train_test_split
 import json
 from tensorflow.keras.applications import MobileNetV2 # type: ignore
+from preprocessing import IMG_SIZE, read_clip, normalize, augment, pad_features
+from calibration import save_calibration
 
-IMG_SIZE = 128
 MAX_FRAMES = 10  # sample more frames per video
 AUGMENT = True
+rng = np.random.default_rng()
 
 # MobileNetV2 as feature extractor
 base_model = tf.keras.applications.MobileNetV2(
@@ -21,45 +24,6 @@ base_model = tf.keras.applications.MobileNetV2(
 )
 base_model.trainable = False
 
-def preprocess_frame(frame, augment=AUGMENT):
-    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    frame = cv2.resize(frame, (IMG_SIZE, IMG_SIZE))
-    frame = frame.astype("float32") / 255.0
-    if augment:
-        frame = tf.image.random_flip_left_right(frame)
-        frame = tf.image.random_brightness(frame, 0.2)
-        frame = tf.image.random_contrast(frame, 0.8, 1.2)
-    return frame.numpy()
-
-def sample_frames(video_path, max_frames=MAX_FRAMES):
-    cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    frames = []
-    if total_frames == 0:
-        cap.release()
-        return [np.zeros((IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)]
-    step = max(1, total_frames // max_frames)
-    for i in range(0, total_frames, step):
-        cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-        ret, frame = cap.read()
-        if not ret:
-            continue
-        frames.append(preprocess_frame(frame))
-        if len(frames) >= max_frames:
-            break
-    cap.release()
-    return frames
-
-def pad_features(features, max_frames=MAX_FRAMES):
-    n = len(features)
-    feature_dim = features[0].shape[0]
-    if n < max_frames:
-        pad = np.repeat(features[-1][np.newaxis, :], max_frames - n, axis=0)
-        features = np.vstack([features, pad])
-    else:
-        features = np.array(features[:max_frames])
-    return features
-
 # Load dataset
 video_dir = "video"
 class_folders = [f for f in os.listdir(video_dir) if os.path.isdir(os.path.join(video_dir, f))]
@@ -74,9 +38,11 @@ for idx, folder in enumerate(class_folders):
     class_names.append(folder)
     for vid in videos:
         path = os.path.join(folder_path, vid)
-        frames = sample_frames(path)
-        features = [base_model.predict(np.expand_dims(f, axis=0), verbose=0)[0] for f in frames]
-        features = pad_features(features)
+        clip = normalize(read_clip(path, MAX_FRAMES))
+        if AUGMENT:
+            augment(clip, rng)
+        features = base_model.predict(clip, verbose=0)
+        features = pad_features(features, MAX_FRAMES)
         X.append(features)
         y.append(idx)
 
@@ -110,7 +76,22 @@ model.fit(X_train, y_train, validation_data=(X_val, y_val),
 
 # Save model and labels
 model.save("sign_model_weights.keras")
+# A distilled student backbone (distill.py) would not match this MobileNetV2-feature head
+if os.path.exists("sign_backbone.keras"):
+    os.remove("sign_backbone.keras")
 with open("labels.json", "w") as f:
     json.dump(class_names, f)
 
-print(f"Training complete. Classes: {class_names}")
\ No newline at end of file
+# Fit the softmax temperature on the validation split (read by main.py)
+calibration = save_calibration("sign_model_weights.keras", model.predict(X_val, verbose=0), y_val)
+print(f"Calibration: {calibration}")
+
+print(f"Training complete. Classes: {class_names}")
+
+# Export the quantized TFLite model for the app's on-device mode and check it against Keras.
+# The .keras model is already saved, so a failed export is reported without failing the run.
+if os.environ.get("EXPORT_TFLITE", "1") == "1":
+    export = subprocess.run([sys.executable, "export_tflite.py", "--models", "video", "--verify"])
+    if export.returncode != 0:
+        print(f"⚠️ TFLite export failed (exit {export.returncode}); "
+              f"rerun with: python export_tflite.py --models video --verify")
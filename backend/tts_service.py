@@ -0,0 +1,248 @@
+"""
+Text-to-speech synthesis service for /text-to-speech and /get-voices.
+
+All synthesis happens on one dedicated worker thread that owns the TTS
+backend (pyttsx3 is not thread-safe), so request threads only enqueue jobs
+and wait on a Future. Output is WAV bytes held in memory; finished clips are
+cached by (text, voice, rate) in an LRU bounded by total bytes.
+
+Backends, chosen by TTS_ENGINE (default "auto"):
+- espeak  - espeak-ng/espeak binary writing WAV to stdout, fully in memory
+- pyttsx3 - the platform engine (SAPI5, NSSpeechSynthesizer, espeak)
+- stub    - a tone whose length follows the text; for headless CI boxes
+"""
+
+import io
+import os
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+import wave
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Config
+# ------------------------
+TTS_ENGINE = os.environ.get("TTS_ENGINE", "auto")
+TTS_CACHE_BYTES = int(os.environ.get("TTS_CACHE_BYTES", 64 * 1024 * 1024))
+DEFAULT_RATE = 150  # words per minute, same as the old voicespeed
+# Accepted speaking rates in words per minute; the stub's clip length and each cache key depend on it
+MIN_RATE, MAX_RATE = 80, 450
+TTS_MAX_CHARS = int(os.environ.get("TTS_MAX_CHARS", 5000))  # longer /text-to-speech text is rejected
+STREAM_CHUNK_SIZE = 32 * 1024
+
+
+class TTSBackend:
+    """Base class for a synthesis backend; only ever called from the worker thread"""
+
+    name = "base"
+
+    def list_voices(self) -> List[Dict[str, any]]:
+        return []
+
+    def synthesize(self, text: str, voice: Optional[str], rate: int) -> bytes:
+        """Return a complete WAV file as bytes"""
+        raise NotImplementedError
+
+
+class EspeakBackend(TTSBackend):
+    name = "espeak"
+
+    def __init__(self, binary: str):
+        self.binary = binary
+
+    def list_voices(self) -> List[Dict[str, any]]:
+        output = subprocess.run([self.binary, "--voices"], capture_output=True, text=True, check=True).stdout
+        voices = []
+        for line in output.splitlines()[1:]:
+            # Pty Language Age/Gender VoiceName File Other Languages
+            parts = line.split()
+            if len(parts) >= 5:
+                voices.append({"id": parts[4], "name": parts[3], "languages": [parts[1]]})
+        return voices
+
+    def synthesize(self, text: str, voice: Optional[str], rate: int) -> bytes:
+        command = [self.binary, "--stdout", "-s", str(rate)]
+        if voice:
+            command += ["-v", voice]
+        result = subprocess.run(command, input=text.encode("utf-8"), capture_output=True, check=True)
+        return result.stdout
+
+
+class Pyttsx3Backend(TTSBackend):
+    name = "pyttsx3"
+
+    def __init__(self):
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        # The engine keeps the last voice set, so requests without one go back to this
+        self.default_voice = self.engine.getProperty('voice')
+
+    def list_voices(self) -> List[Dict[str, any]]:
+        return [
+            {"id": v.id, "name": v.name, "languages": [str(lang) for lang in (v.languages or [])]}
+            for v in self.engine.getProperty('voices')
+        ]
+
+    def synthesize(self, text: str, voice: Optional[str], rate: int) -> bytes:
+        # pyttsx3 can only render to a file, so round-trip through a temp file
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self.engine.setProperty('voice', voice or self.default_voice)
+            self.engine.setProperty('rate', rate)
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.unlink(path)
+
+
+class StubBackend(TTSBackend):
+    """Deterministic tone output so the service runs where no TTS engine exists"""
+
+    name = "stub"
+    sample_rate = 16000
+
+    def list_voices(self) -> List[Dict[str, any]]:
+        return [{"id": "stub", "name": "Stub tone", "languages": ["en"]}]
+
+    def synthesize(self, text: str, voice: Optional[str], rate: int) -> bytes:
+        seconds = max(0.2, len(text.split()) * 60.0 / max(rate, 1))
+        t = np.arange(int(seconds * self.sample_rate)) / self.sample_rate
+        samples = (6000 * np.sin(2 * np.pi * 440 * t)).astype("<i2").tobytes()
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(samples)
+        return buf.getvalue()
+
+
+def create_backend(name: str = TTS_ENGINE) -> TTSBackend:
+    if name in ("auto", "espeak"):
+        binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        if binary:
+            return EspeakBackend(binary)
+        if name == "espeak":
+            raise RuntimeError("espeak-ng/espeak binary not found")
+    if name in ("auto", "pyttsx3"):
+        try:
+            return Pyttsx3Backend()
+        except Exception as e:
+            if name == "pyttsx3":
+                raise
+            logger.warning(f"pyttsx3 unavailable ({e}), falling back to stub TTS")
+    return StubBackend()
+
+
+class AudioCache:
+    """LRU cache of synthesized clips bounded by total size in bytes"""
+
+    def __init__(self, max_bytes: int = TTS_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.data = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[bytes]:
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, audio: bytes):
+        if len(audio) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.data:
+                self.size -= len(self.data.pop(key))
+            self.data[key] = audio
+            self.size += len(audio)
+            while self.size > self.max_bytes:
+                _, evicted = self.data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.data), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+class TTSService:
+    """Single-threaded synthesis worker with a clip cache and a warm voice list"""
+
+    def __init__(self, backend_name: str = TTS_ENGINE, cache_bytes: int = TTS_CACHE_BYTES):
+        self.cache = AudioCache(cache_bytes)
+        self.jobs = queue.Queue()
+        self.voices = []
+        self.backend_name = None
+        ready = Future()
+        self.worker = threading.Thread(target=self._run, args=(backend_name, ready),
+                                       name="tts-worker", daemon=True)
+        self.worker.start()
+        ready.result()
+
+    def _run(self, backend_name: str, ready: Future):
+        # The backend is created, used and destroyed on this thread only
+        try:
+            backend = create_backend(backend_name)
+            self.backend_name = backend.name
+            self.voices = backend.list_voices()
+            ready.set_result(None)
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        logger.info(f"TTS worker started with {backend.name} backend ({len(self.voices)} voices)")
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            (text, voice, rate), future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with metrics.stage("tts_synthesize"):
+                    future.set_result(backend.synthesize(text, voice, rate))
+            except Exception as e:
+                future.set_exception(e)
+
+    def synthesize(self, text: str, voice: Optional[str] = None, rate: int = DEFAULT_RATE,
+                   timeout: Optional[float] = 30.0) -> Tuple[bytes, bool]:
+        """Return (wav_bytes, cache_hit); rate is clamped to MIN_RATE..MAX_RATE"""
+        key = (text, voice, min(max(rate, MIN_RATE), MAX_RATE))
+        audio = self.cache.get(key)
+        if audio is not None:
+            return audio, True
+        future = Future()
+        self.jobs.put((key, future))
+        audio = future.result(timeout=timeout)
+        self.cache.put(key, audio)
+        return audio, False
+
+    def stream(self, audio: bytes, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Yield the clip in chunks for a streamed HTTP response"""
+        view = memoryview(audio)
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+
+    def shutdown(self):
+        self.jobs.put(None)
+        self.worker.join()
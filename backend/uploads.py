@@ -0,0 +1,298 @@
+"""
+Bounded uploads and admission control for app.py and main.py.
+
+Uploads are checked in three places, cheapest first:
+1. the Content-Length header against the endpoint's byte limit, before any of
+   the body is read;
+2. the byte count while the upload is copied in chunks (chunked transfers
+   carry no length), so at most `limit` bytes are ever held or written;
+3. the container header (duration, frame size) before a video is decoded.
+
+AdmissionController bounds the requests running inference at once plus the
+requests allowed to wait for a slot. When the wait list is full a request is
+turned away immediately with 429; one that waited longer than the configured
+time gets 503. Both carry a Retry-After estimated from recent service times,
+so bursts are shed in microseconds instead of piling up in worker memory.
+
+Any limit set to 0 is disabled.
+"""
+
+import os
+import json
+import math
+import time
+import threading
+from typing import BinaryIO, Dict, List, Optional
+
+import cv2
+
+import metrics
+
+# ------------------------
+# Config
+# ------------------------
+MB = 1024 * 1024
+MAX_VIDEO_UPLOAD_BYTES = int(float(os.environ.get("MAX_VIDEO_UPLOAD_MB", 64)) * MB)
+MAX_IMAGE_UPLOAD_BYTES = int(float(os.environ.get("MAX_IMAGE_UPLOAD_MB", 8)) * MB)
+# /detect-frames: a JPEG bundle or raw tensor of MAX_FRAMES frames
+MAX_FRAMES_UPLOAD_BYTES = int(float(os.environ.get("MAX_FRAMES_UPLOAD_MB", 16)) * MB)
+MAX_AUDIO_UPLOAD_BYTES = int(float(os.environ.get("MAX_AUDIO_UPLOAD_MB", 25)) * MB)
+# Duration caps read from the container header; segmentation accepts longer videos than clip mode
+MAX_VIDEO_SECONDS = float(os.environ.get("MAX_VIDEO_SECONDS", 30))
+MAX_SEGMENT_VIDEO_SECONDS = float(os.environ.get("MAX_SEGMENT_VIDEO_SECONDS", 600))
+MAX_AUDIO_SECONDS = float(os.environ.get("MAX_AUDIO_SECONDS", 300))
+MAX_VIDEO_PIXELS = int(os.environ.get("MAX_VIDEO_PIXELS", 3840 * 2160))
+# Wait list timeout for a free inference slot
+ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get("ADMISSION_MAX_WAIT_SECONDS", 10))
+CHUNK_BYTES = MB
+
+
+class Rejected(Exception):
+    """Request refused before doing the work; carries the HTTP status and headers"""
+
+    def __init__(self, message: str, status: int, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(self.retry_after)} if self.retry_after else {}
+
+
+class UploadRejected(Rejected):
+    """Upload over an endpoint's byte, duration or frame size limit (413)"""
+
+    def __init__(self, message: str):
+        super().__init__(message, 413)
+
+
+class Overloaded(Rejected):
+    """No inference slot: 429 when the wait list is full, 503 when the wait timed out"""
+
+
+def _megabytes(n: int) -> str:
+    return f"{n / MB:g} MB"
+
+
+def check_content_length(value: Optional[str], limit: int):
+    """Reject by the Content-Length header before the body is read"""
+    if limit and value and value.isdigit() and int(value) > limit:
+        raise UploadRejected(f"Upload is larger than the {_megabytes(limit)} limit")
+
+
+def read_uploads(srcs: List[BinaryIO], limit: int) -> List[bytes]:
+    """Read file-like uploads into memory, never holding more than limit + 1 bytes between them"""
+    parts, total = [], 0
+    for src in srcs:
+        data = src.read(limit - total + 1) if limit else src.read()
+        total += len(data)
+        if limit and total > limit:
+            raise UploadRejected(f"Upload is larger than the {_megabytes(limit)} limit")
+        parts.append(data)
+    return parts
+
+
+def read_upload(src: BinaryIO, limit: int) -> bytes:
+    return read_uploads([src], limit)[0]
+
+
+def copy_upload(src: BinaryIO, dst: BinaryIO, limit: int, hasher=None) -> int:
+    """Copy a file-like upload to dst in CHUNK_BYTES pieces, feeding hasher; returns the size"""
+    total = 0
+    while True:
+        chunk = src.read(CHUNK_BYTES)
+        if not chunk:
+            return total
+        total += len(chunk)
+        if limit and total > limit:
+            raise UploadRejected(f"Upload is larger than the {_megabytes(limit)} limit")
+        if hasher is not None:
+            hasher.update(chunk)
+        dst.write(chunk)
+
+
+def probe_video(path: str) -> Optional[Dict[str, float]]:
+    """Duration and frame size from the container header, without decoding; None if unreadable"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        return {
+            "seconds": frames / fps if fps > 0 and frames > 0 else 0.0,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def check_video(path: str, max_seconds: float, max_pixels: int = MAX_VIDEO_PIXELS):
+    """Reject a video by its header; unreadable files are left for the decoder to report"""
+    info = probe_video(path)
+    if info is None:
+        return
+    if max_seconds and info["seconds"] > max_seconds:
+        raise UploadRejected(f"Video is {info['seconds']:.1f} s long; the limit is {max_seconds:g} s")
+    if max_pixels and info["width"] * info["height"] > max_pixels:
+        raise UploadRejected(f"Video frames are {info['width']}x{info['height']}; "
+                             f"the limit is {max_pixels} pixels")
+
+
+def check_duration(seconds: Optional[float], max_seconds: float, what: str = "Audio"):
+    if max_seconds and seconds is not None and seconds > max_seconds:
+        raise UploadRejected(f"{what} is {seconds:.1f} s long; the limit is {max_seconds:g} s")
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware enforcing per-path byte limits (and admission fast-fail) before the app reads a body.
+
+    Declared lengths are checked against the header; chunked bodies are counted
+    as they arrive and reading stops at the limit, answering 413 in place of
+    whatever the app would have said about the cut-off body.
+    """
+
+    def __init__(self, app, limits: Dict[str, int], admission: "AdmissionController" = None):
+        self.app = app
+        self.limits = limits
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+        try:
+            check_content_length(dict(scope["headers"]).get(b"content-length", b"").decode(), limit)
+            if self.admission is not None:
+                self.admission.check()
+        except Rejected as e:
+            return await _send_rejection(send, e)
+
+        received, overflow = 0, None
+
+        async def limited_receive():
+            nonlocal received, overflow
+            message = await receive()
+            if limit and message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    overflow = UploadRejected(f"Upload is larger than the {_megabytes(limit)} limit")
+                    raise overflow
+            return message
+
+        async def guarded_send(message):
+            if overflow is None:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadRejected:
+            if overflow is None:
+                raise
+        if overflow is not None:
+            await _send_rejection(send, overflow)
+
+
+async def _send_rejection(send, e: Rejected):
+    body = json.dumps({"error": str(e)}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    headers += [(k.lower().encode(), v.encode()) for k, v in e.headers().items()]
+    await send({"type": "http.response.start", "status": e.status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+# ------------------------
+# Admission control
+# ------------------------
+class AdmissionController:
+    """At most max_concurrent requests run at once and at most max_queue wait for a slot.
+
+    acquire() blocks (threading.Condition), so it runs on request threads:
+    Flask's, or FastAPI's threadpool for plain `def` endpoints. check() never
+    blocks and lets middleware shed load before a body is read.
+    max_concurrent <= 0 admits everything.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int,
+                 max_wait: float = ADMISSION_MAX_WAIT_SECONDS):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        # Moving average of seconds per admitted request, for Retry-After
+        self.service_seconds = 1.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog has likely drained"""
+        backlog = self.active + self.waiting + 1
+        return max(1, math.ceil(self.service_seconds * backlog / max(1, self.max_concurrent)))
+
+    def check(self):
+        """Fail fast, without waiting, when the wait list is already full"""
+        if self.enabled and self.active >= self.max_concurrent and self.waiting >= self.max_queue:
+            with self.condition:
+                self.rejected["queue_full"] += 1
+            raise Overloaded(f"{self.name} is at capacity; retry later", 429, self.retry_after())
+
+    def acquire(self):
+        """Take a slot, waiting up to max_wait; raises Overloaded"""
+        if not self.enabled:
+            return
+        with self.condition:
+            if self.active >= self.max_concurrent or self.waiting:
+                if self.waiting >= self.max_queue:
+                    self.rejected["queue_full"] += 1
+                    raise Overloaded(f"{self.name} is at capacity; retry later", 429, self.retry_after())
+                self.waiting += 1
+                deadline = time.monotonic() + self.max_wait
+                try:
+                    while self.active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected["timeout"] += 1
+                            raise Overloaded(f"Timed out waiting for {self.name} capacity", 503,
+                                             self.retry_after())
+                        self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+
+    def release(self, seconds: float):
+        """Give back a slot held for `seconds`"""
+        if not self.enabled:
+            return
+        with self.condition:
+            self.active -= 1
+            self.service_seconds = 0.8 * self.service_seconds + 0.2 * seconds
+            self.condition.notify()
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+
+def register_admission_gauges(controller: AdmissionController):
+    metrics.register_gauge("chatterbridge_admission_active", "Requests holding an inference slot",
+                           lambda: controller.active, pool=controller.name)
+    metrics.register_gauge("chatterbridge_queue_depth", "Jobs waiting for a worker",
+                           lambda: controller.waiting, queue=f"{controller.name}_admission")
+    for reason in controller.rejected:
+        metrics.register_gauge("chatterbridge_admission_rejected", "Requests turned away by admission control",
+                               lambda r=reason: controller.rejected[r], pool=controller.name, reason=reason)
@@ -0,0 +1,123 @@
+/**
+ * On-device sign classification with the quantized TFLite model the sign
+ * server publishes under /mobile (see backend/export_tflite.py).
+ *
+ * The manifest gives the model file, input geometry, labels and calibration
+ * temperature. Images are resized to the model's input, decoded to raw RGB
+ * bytes and run locally; the caller decides whether to fall back to the server.
+ * If react-native-fast-tflite is not available (e.g. Expo Go) the hook simply
+ * reports `available: false`.
+ */
+
+import * as ImageManipulator from 'expo-image-manipulator';
+import jpeg from 'jpeg-js';
+import { useCallback, useEffect, useState } from 'react';
+
+type TfliteModule = typeof import('react-native-fast-tflite');
+type TensorflowModel = import('react-native-fast-tflite').TensorflowModel;
+
+let tflite: TfliteModule | null = null;
+try {
+  // Native module: missing in Expo Go and on web
+  tflite = require('react-native-fast-tflite');
+} catch {
+  tflite = null;
+}
+
+type ManifestEntry = {
+  file: string;
+  url: string;
+  sha256: string;
+  input: { shape: number[]; dtype: 'uint8'; color: 'RGB' };
+  labels: string[];
+  temperature: number;
+};
+
+type OnDeviceModel = {
+  model: TensorflowModel;
+  entry: ManifestEntry;
+};
+
+export type OnDevicePrediction = {
+  label: string;
+  confidence: number;
+  topK: { label: string; confidence: number }[];
+};
+
+const base64ToBytes = (base64: string) => {
+  const binary = atob(base64);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  return bytes;
+};
+
+// Resize to the model input and return packed RGB bytes (the model scales to [0, 1] itself)
+const imageToRgb = async (uri: string, width: number, height: number) => {
+  const resized = await ImageManipulator.manipulateAsync(uri, [{ resize: { width, height } }], {
+    base64: true,
+    compress: 1,
+    format: ImageManipulator.SaveFormat.JPEG,
+  });
+  const { data } = jpeg.decode(base64ToBytes(resized.base64 ?? ''), { useTArray: true });
+  const rgb = new Uint8Array(width * height * 3);
+  for (let src = 0, dst = 0; dst < rgb.length; src += 4, dst += 3) {
+    rgb[dst] = data[src];
+    rgb[dst + 1] = data[src + 1];
+    rgb[dst + 2] = data[src + 2];
+  }
+  return rgb;
+};
+
+// Same temperature scaling as backend/calibration.py: softmax(log(p) / T)
+const calibrate = (probs: ArrayLike<number>, temperature: number) => {
+  const logits = Array.from(probs, (p) => Math.log(Math.max(p, 1e-12)) / temperature);
+  const max = Math.max(...logits);
+  const exp = logits.map((l) => Math.exp(l - max));
+  const sum = exp.reduce((a, b) => a + b, 0);
+  return exp.map((e) => e / sum);
+};
+
+const loadModel = async (serverUrl: string): Promise<OnDeviceModel | null> => {
+  if (!tflite) return null;
+  const response = await fetch(`${serverUrl}/mobile/manifest.json`);
+  if (!response.ok) return null;
+  const manifest = await response.json();
+  const entry: ManifestEntry | undefined = manifest.models?.image;
+  if (!entry) return null;
+  const model = await tflite.loadTensorflowModel({ url: `${serverUrl}${entry.url}` });
+  return { model, entry };
+};
+
+export function useOnDeviceSign(serverUrl: string, topK = 3) {
+  const [loaded, setLoaded] = useState<OnDeviceModel | null>(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    loadModel(serverUrl)
+      .then((model) => {
+        if (!cancelled) setLoaded(model);
+      })
+      .catch((err) => console.warn('On-device sign model unavailable:', err));
+    return () => {
+      cancelled = true;
+    };
+  }, [serverUrl]);
+
+  const classify = useCallback(
+    async (uri: string): Promise<OnDevicePrediction | null> => {
+      if (!loaded) return null;
+      const [, height, width] = loaded.entry.input.shape;
+      const input = await imageToRgb(uri, width, height);
+      const [output] = await loaded.model.run([input]);
+      const probs = calibrate(output as Float32Array, loaded.entry.temperature);
+      const ranked = probs
+        .map((confidence, index) => ({ label: loaded.entry.labels[index], confidence }))
+        .sort((a, b) => b.confidence - a.confidence)
+        .slice(0, topK);
+      return { label: ranked[0].label, confidence: ranked[0].confidence, topK: ranked };
+    },
+    [loaded, topK]
+  );
+
+  return { available: loaded !== null, classify };
+}